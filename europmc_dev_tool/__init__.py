@@ -1,2 +1,4 @@
 # JATX2JSON Package
-from .xml_processor import XMLProcessor
\ No newline at end of file
+__version__ = "0.1.0"
+
+from .xml_processor import XMLProcessor
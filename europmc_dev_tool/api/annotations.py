@@ -1,4 +1,8 @@
+import requests
 from .client import BaseClient
+from .pagination import CursorPaginator
+from .concurrency import ordered_map
+from .jsonstream import JSONStream
 from urllib.parse import urlencode
 
 class AnnotationsClient(BaseClient):
@@ -23,6 +27,72 @@ class AnnotationsClient(BaseClient):
         params = self._build_params(params)
         return self._get(url, params)
 
+    MAX_IDS_PER_REQUEST = 8
+
+    @staticmethod
+    def _article_key(source, article_id):
+        # "PMC:11704132" and an extId of "PMC11704132" name the same article.
+        source = (source or "").upper()
+        article_id = str(article_id or "").upper()
+        if source == "PMC" and article_id.startswith("PMC"):
+            article_id = article_id[3:]
+        return source, article_id
+
+    def _get_chunk(self, article_ids: list, provider: str = None, on_error=None) -> list:
+        try:
+            results = self.get_by_article_ids(article_ids, provider)
+        except (requests.RequestException, ValueError) as e:
+            if len(article_ids) == 1:
+                if on_error is None:
+                    raise
+                on_error(article_ids[0], e)
+                return []
+            # Retry each ID on its own so one bad ID does not fail the chunk.
+            results = []
+            for article_id in article_ids:
+                results.extend(self._get_chunk([article_id], provider, on_error))
+            return results
+
+        return self._in_input_order(article_ids, results)
+
+    def _in_input_order(self, article_ids: list, results) -> list:
+        positions = {self._article_key(*i.split(":", 1)): n for n, i in enumerate(article_ids) if ":" in i}
+        return sorted(
+            results or [],
+            key=lambda r: positions.get(self._article_key(r.get("source"), r.get("extId")), len(positions))
+        )
+
+    @staticmethod
+    def _id_chunks(article_ids, chunk_size: int):
+        chunk = []
+        for article_id in article_ids:
+            chunk.append(article_id)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def get_by_article_ids_bulk(self, article_ids, provider: str = None, chunk_size: int = MAX_IDS_PER_REQUEST,
+                                max_workers: int = 4, on_error=None):
+        """
+        Yields annotations for any number of article IDs, in input order.
+
+        The IDs are read lazily and split into chunks of at most
+        ``chunk_size`` IDs, which are fetched concurrently through the
+        client's rate limiter. If a chunk fails, its IDs are retried one by
+        one; an ID that still fails is passed to ``on_error(article_id, exc)``,
+        or raised if no ``on_error`` is given. Articles without annotations
+        are omitted by the API.
+
+        :param article_ids: Iterable of IDs in the format SOURCE:ID, e.g. PMC:11704132.
+        """
+        for results in ordered_map(
+            lambda chunk: self._get_chunk(chunk, provider, on_error), self._id_chunks(article_ids, chunk_size),
+            max_workers=max_workers
+        ):
+            yield from results
+
     def get_by_entity(self, entity: str, provider: str = None) -> dict:
         """
         Find articles that cite a specific entity (e.g., gene, chemical).
@@ -33,11 +103,7 @@ class AnnotationsClient(BaseClient):
         params = self._build_params(params)
         return self._get(url, params)
 
-    def get_by_section_and_or_type(self, annotation_type: str, subtype: str = None, section: str = None, provider: str = None, filter: int = 1, page_size: int = 4, cursor_mark: str = "0.0") -> dict:
-        """
-        Get annotations of a specific type, optionally filtered by subtype and section.
-        """
-        
+    def _by_section_and_or_type_url(self, annotation_type, subtype, section, provider, filter, page_size, cursor_mark) -> str:
         params = {
             "type": annotation_type,
             "subtype": subtype,
@@ -51,6 +117,50 @@ class AnnotationsClient(BaseClient):
         # Filter out None values
         params = {k: v for k, v in params.items() if v is not None}
         
-        url = f"{self.BASE_URL}/annotationsBySectionAndOrType?{urlencode(params)}"
-        
-        return self._get(url)
+        return f"{self.BASE_URL}/annotationsBySectionAndOrType?{urlencode(params)}"
+
+    def get_by_section_and_or_type(self, annotation_type: str, subtype: str = None, section: str = None, provider: str = None, filter: int = 1, page_size: int = 4, cursor_mark: str = "0.0") -> dict:
+        """
+        Get annotations of a specific type, optionally filtered by subtype and section.
+        """
+        return self._get(self._by_section_and_or_type_url(
+            annotation_type, subtype, section, provider, filter, page_size, cursor_mark
+        ))
+
+    def stream_by_section_and_or_type(self, annotation_type: str, subtype: str = None, section: str = None, provider: str = None, filter: int = 1, page_size: int = 4, cursor_mark: str = "0.0") -> JSONStream:
+        """
+        Like :meth:`get_by_section_and_or_type`, but returns a
+        :class:`~europmc_dev_tool.api.jsonstream.JSONStream` that decodes the
+        page's articles one at a time as the response arrives.
+        """
+        return self._get_stream(self._by_section_and_or_type_url(
+            annotation_type, subtype, section, provider, filter, page_size, cursor_mark
+        ), path="articles")
+
+    MAX_PAGE_SIZE = 8
+
+    def paginate_by_section_and_or_type(self, annotation_type: str, subtype: str = None, section: str = None, provider: str = None, filter: int = 1, page_size: int = MAX_PAGE_SIZE, cursor_mark: str = "0.0") -> CursorPaginator:
+        """
+        Returns a paginator over all articles with annotations of a specific type.
+
+        The paginator follows ``nextCursorMark`` and requests the next page
+        while the current one is consumed. Pages are streamed, so articles are
+        decoded one at a time as they arrive. Its ``next_cursor``
+        attribute can be saved to resume an interrupted harvest.
+        """
+        return CursorPaginator(
+            lambda cursor: self.stream_by_section_and_or_type(
+                annotation_type, subtype, section, provider, filter, page_size, cursor
+            ),
+            items=lambda page: page,
+            next_cursor=lambda page: page.get("nextCursorMark"),
+            cursor=cursor_mark
+        )
+
+    def iter_by_section_and_or_type(self, annotation_type: str, subtype: str = None, section: str = None, provider: str = None, filter: int = 1, page_size: int = MAX_PAGE_SIZE, cursor_mark: str = "0.0"):
+        """
+        Yields every article with annotations of a specific type, following ``nextCursorMark``.
+        """
+        yield from self.paginate_by_section_and_or_type(
+            annotation_type, subtype, section, provider, filter, page_size, cursor_mark
+        )
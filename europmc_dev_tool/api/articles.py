@@ -1,4 +1,66 @@
+import os
+import gzip
+import requests
 from .client import BaseClient
+from .pagination import CursorPaginator, iter_numbered_pages
+from .concurrency import ordered_map
+from .jsonstream import JSONStream
+
+
+def split_article_id(value: str) -> tuple:
+    """
+    Splits an article identifier into a ``(source, id)`` pair.
+
+    Accepts ``SOURCE:ID`` (e.g. ``MED:12345``), PMCIDs (``PMC12345``) and
+    bare PMIDs (``12345``).
+    """
+    value = value.strip()
+    if ":" in value:
+        source, article_id = value.split(":", 1)
+        source = source.upper()
+        if source == "PMC" and not article_id.upper().startswith("PMC"):
+            article_id = f"PMC{article_id}"
+        return source, article_id
+    if value.upper().startswith("PMC"):
+        return "PMC", value.upper()
+    return "MED", value
+
+
+def id_query(value: str) -> tuple:
+    """
+    Returns the search field, normalised value and query term for an identifier.
+
+    DOIs (``10.1234/abc``, optionally prefixed with ``doi:`` or
+    ``https://doi.org/``) are searched with ``DOI``, PMCIDs with ``PMCID`` and
+    anything else with ``EXT_ID`` and ``SRC``, as split by
+    :func:`split_article_id`. The normalised value is what
+    :func:`result_keys` returns for the matching result.
+    """
+    value = value.strip()
+    lowered = value.lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "doi:"):
+        if lowered.startswith(prefix):
+            value, lowered = value[len(prefix):], lowered[len(prefix):]
+    if lowered.startswith("10."):
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+        return "DOI", lowered, f'DOI:"{escaped}"'
+    source, article_id = split_article_id(value)
+    if source == "PMC":
+        article_id = article_id.upper()
+        return "PMCID", article_id, f"PMCID:{article_id}"
+    return "EXT_ID", f"{source}:{article_id}", f"(EXT_ID:{article_id} AND SRC:{source})"
+
+
+def result_keys(result: dict) -> list:
+    """Returns the ``(field, value)`` pairs under which a search result can be looked up."""
+    keys = []
+    if result.get("doi"):
+        keys.append(("DOI", result["doi"].lower()))
+    if result.get("pmcid"):
+        keys.append(("PMCID", result["pmcid"].upper()))
+    if result.get("id") and result.get("source"):
+        keys.append(("EXT_ID", f"{result['source'].upper()}:{result['id']}"))
+    return keys
 
 class ArticlesClient(BaseClient):
     """
@@ -6,17 +68,60 @@ class ArticlesClient(BaseClient):
     """
     BASE_URL = "https://www.ebi.ac.uk/europepmc/webservices/rest"
 
-    def search(self, query: str, page: int = 1, page_size: int = 25, result_type: str = "core") -> dict:
-        """Search articles via /search endpoint."""
+    MAX_PAGE_SIZE = 1000
+    # Limits for the OR-joined queries built by resolve_ids(). The query
+    # travels in the URL, so it is kept well below common URL length limits,
+    # and every chunk's hits fit on one page.
+    MAX_IDS_PER_QUERY = 200
+    MAX_QUERY_LENGTH = 4000
+
+    def search(self, query: str, page: int = 1, page_size: int = 25, result_type: str = "core",
+               cursor_mark: str = None) -> dict:
+        """Search articles via /search endpoint. Pass ``cursor_mark`` instead of ``page`` for deep paging."""
         url = f"{self.BASE_URL}/search"
         params = self._build_params({
             "query": query,
-            "page": page,
+            "page": None if cursor_mark else page,
             "pageSize": page_size,
-            "resultType": result_type
+            "resultType": result_type,
+            "cursorMark": cursor_mark
         })
         return self._get(url, params)
 
+    def search_stream(self, query: str, page_size: int = 25, result_type: str = "core",
+                      cursor_mark: str = "*") -> JSONStream:
+        """
+        Like :meth:`search` with ``cursor_mark``, but returns a
+        :class:`~europmc_dev_tool.api.jsonstream.JSONStream` over the results
+        of the page; ``hitCount`` and ``nextCursorMark`` are available from
+        its ``get`` method before iterating.
+        """
+        url = f"{self.BASE_URL}/search"
+        params = self._build_params({
+            "query": query,
+            "pageSize": page_size,
+            "resultType": result_type,
+            "cursorMark": cursor_mark
+        })
+        return self._get_stream(url, params, "resultList.result")
+
+    def search_iter(self, query: str, page_size: int = MAX_PAGE_SIZE, result_type: str = "core",
+                    cursor_mark: str = "*"):
+        """
+        Yields every hit of a search, paging with ``cursorMark``.
+
+        Each page is requested while the previous one is consumed, and
+        results are decoded one at a time as the response arrives (see
+        :meth:`search_stream`), so memory use does not grow with the page size.
+        """
+        paginator = CursorPaginator(
+            lambda cursor: self.search_stream(query, page_size=page_size, result_type=result_type, cursor_mark=cursor),
+            items=lambda page: page,
+            next_cursor=lambda page: page.get("nextCursorMark"),
+            cursor=cursor_mark
+        )
+        yield from paginator
+
     def get_article(self, source: str, article_id: str, result_type: str = "core") -> dict:
         """Fetch metadata for a single article by ID."""
         url = f"{self.BASE_URL}/article/{source}/{article_id}"
@@ -25,6 +130,55 @@ class ArticlesClient(BaseClient):
         })
         return self._get(url, params)
 
+    def resolve_ids(self, article_ids, result_type: str = "lite", max_workers: int = 4):
+        """
+        Looks up metadata for many PMIDs, PMCIDs and DOIs with few requests.
+
+        IDs are packed into OR-joined search queries of at most
+        :attr:`MAX_IDS_PER_QUERY` IDs and :attr:`MAX_QUERY_LENGTH`
+        characters, which are fetched concurrently. Each search result
+        includes ``isOpenAccess``, ``inEPMC`` and ``hasPDF``.
+
+        :param article_ids: Iterable of IDs, as accepted by :func:`id_query`.
+        :return: A generator of ``(article_id, result, error)`` triples in
+                 input order. ``result`` is None if the ID was not found or
+                 its query failed, in which case ``error`` is set.
+        """
+        def fetch(chunk):
+            try:
+                data = self.search(self._ids_query(chunk), page_size=self.MAX_PAGE_SIZE, result_type=result_type)
+            except (requests.RequestException, ValueError) as e:
+                return [(article_id, None, e) for article_id, _, _ in chunk]
+            return self._match_ids(chunk, data)
+
+        for results in ordered_map(fetch, self._id_chunks(article_ids), max_workers=max_workers):
+            yield from results
+
+    def _id_chunks(self, article_ids):
+        """Groups IDs into ``(article_id, key, term)`` lists that fit in one query."""
+        chunk, length = [], 0
+        for article_id in article_ids:
+            field, value, term = id_query(article_id)
+            if chunk and (len(chunk) == self.MAX_IDS_PER_QUERY or length + len(term) + 4 > self.MAX_QUERY_LENGTH):
+                yield chunk
+                chunk, length = [], 0
+            chunk.append((article_id, (field, value), term))
+            length += len(term) + 4
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _ids_query(chunk) -> str:
+        return " OR ".join(dict.fromkeys(term for _, _, term in chunk))
+
+    @staticmethod
+    def _match_ids(chunk, data) -> list:
+        found = {}
+        for result in data.get("resultList", {}).get("result", []):
+            for key in result_keys(result):
+                found.setdefault(key, result)
+        return [(article_id, found.get(key), None) for article_id, key, _ in chunk]
+
     def get_references(self, source: str, article_id: str, page: int = 1, page_size: int = 25) -> dict:
         """Fetch references for a single article by ID."""
         url = f"{self.BASE_URL}/{source}/{article_id}/references"
@@ -34,7 +188,97 @@ class ArticlesClient(BaseClient):
         })
         return self._get(url, params)
 
+    def get_citations(self, source: str, article_id: str, page: int = 1, page_size: int = 25) -> dict:
+        """Fetch the articles citing a single article."""
+        url = f"{self.BASE_URL}/{source}/{article_id}/citations"
+        params = self._build_params({
+            "page": page,
+            "pageSize": page_size
+        })
+        return self._get(url, params)
+
+    @staticmethod
+    def _references(data: dict) -> list:
+        return (data.get("referenceList") or {}).get("reference", [])
+
+    @staticmethod
+    def _citations(data: dict) -> list:
+        return (data.get("citationList") or {}).get("citation", [])
+
+    @staticmethod
+    def _hit_count(data: dict) -> int:
+        return data.get("hitCount", 0)
+
+    def get_all_citations(self, source: str, article_id: str, page_size: int = MAX_PAGE_SIZE, max_workers: int = 4):
+        """Yields every article citing an article, fetching pages concurrently like :meth:`get_all_references`."""
+        yield from iter_numbered_pages(
+            lambda page: self.get_citations(source, article_id, page, page_size),
+            items=self._citations,
+            hit_count=self._hit_count,
+            max_workers=max_workers
+        )
+
+    def get_all_references(self, source: str, article_id: str, page_size: int = MAX_PAGE_SIZE, max_workers: int = 4):
+        """
+        Yields every reference of an article.
+
+        The ``hitCount`` of the first page gives the number of pages; the
+        remaining pages are fetched concurrently and merged in order.
+        """
+        yield from iter_numbered_pages(
+            lambda page: self.get_references(source, article_id, page, page_size),
+            items=self._references,
+            hit_count=self._hit_count,
+            max_workers=max_workers
+        )
+
+    def get_references_batch(self, articles, page_size: int = MAX_PAGE_SIZE, max_workers: int = 4):
+        """
+        Fetch all references of many articles concurrently.
+
+        :param articles: Iterable of ``(source, article_id)`` pairs.
+        :return: A generator of ``(source, article_id, references, error)``
+                 tuples in input order, where ``references`` is None if the
+                 article's references could not be fetched.
+        """
+        def fetch(article):
+            source, article_id = article
+            try:
+                # Articles are fetched in parallel, so each one pages sequentially.
+                return source, article_id, list(self.get_all_references(source, article_id, page_size, 1)), None
+            except (requests.RequestException, ValueError) as e:
+                return source, article_id, None, e
+
+        yield from ordered_map(fetch, articles, max_workers=max_workers)
+
     def get_fulltext_xml(self, article_id: str) -> str:
         """Fetch the full-text XML for an open-access article."""
         url = f"{self.BASE_URL}/{article_id}/fullTextXML"
         return self._get_text(url)
+
+    def download_fulltext_xml(self, article_id: str, path: str, chunk_size: int = 64 * 1024) -> int:
+        """
+        Stream the full-text XML for an open-access article to a gzip file.
+
+        The body is compressed chunk by chunk as it arrives, into
+        ``path.part``, which is renamed to ``path`` once complete, so ``path``
+        only ever holds a whole document. Responses are not cached.
+
+        :return: The number of uncompressed bytes written.
+        :raises requests.HTTPError: If there is no full text (404) or the request fails.
+        """
+        url = f"{self.BASE_URL}/{article_id}/fullTextXML"
+        part_path = f"{path}.part"
+        size = 0
+        try:
+            with self._request(url, stream=True) as response:
+                with gzip.open(part_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        size += len(chunk)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        os.replace(part_path, path)
+        return size
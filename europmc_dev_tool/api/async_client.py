@@ -0,0 +1,570 @@
+import io
+import os
+import gzip
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+from lxml import etree
+
+from .client import RetryPolicy, STREAM_CHUNK_SIZE
+from .cache import OfflineCacheMiss
+from .concurrency import AsyncSingleFlight
+from .jsonstream import AsyncJSONStream
+from .transport import USER_AGENT
+from .articles import ArticlesClient
+from .annotations import AnnotationsClient
+from .grants import GrantsClient
+from .oai import OAIClient, OAIError, RecordHarvester, parse_oai_response
+
+# Errors after which bulk methods report a failed item instead of raising.
+_ERRORS = ((httpx.HTTPError,) if httpx is not None else ()) + (ValueError,)
+
+
+async def ordered_gather(func, items, max_pending: int = 8):
+    """
+    Async counterpart of :func:`~europmc_dev_tool.api.concurrency.ordered_map`.
+
+    Runs the coroutine function ``func`` on ``items`` with at most
+    ``max_pending`` calls in flight and yields the results in input order.
+    """
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(asyncio.ensure_future(func(item)))
+            if len(pending) >= max_pending:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def iter_numbered_pages(fetch, items, hit_count, first_page: int = 1, max_workers: int = 4):
+    """Async counterpart of :func:`~europmc_dev_tool.api.pagination.iter_numbered_pages`."""
+    first = await fetch(first_page)
+    first_items = items(first)
+    for item in first_items:
+        yield item
+    if not first_items:
+        return
+    pages = -(-hit_count(first) // len(first_items))
+    remaining = range(first_page + 1, first_page + pages)
+    async for page in ordered_gather(fetch, remaining, max_pending=max_workers):
+        for item in items(page):
+            yield item
+
+
+async def _single(value):
+    yield value
+
+
+class AsyncCursorPaginator:
+    """
+    Async counterpart of :class:`~europmc_dev_tool.api.pagination.CursorPaginator`
+    for pages returned as :class:`~europmc_dev_tool.api.jsonstream.AsyncJSONStream`.
+
+    Each page's cursor field names the cursor of the following page, which
+    is requested while the current page is consumed. Iterate with
+    ``async for`` to get individual results, or over :meth:`pages`. After
+    each page, :attr:`next_cursor` is the cursor from which a later
+    paginator can resume.
+    """
+    def __init__(self, fetch, cursor: str = '*', cursor_field: str = 'nextCursorMark', prefetch: bool = True):
+        """
+        Initializes the paginator.
+
+        :param fetch: Coroutine function ``fetch(cursor)`` returning one page.
+        :param cursor: The cursor of the first page.
+        :param cursor_field: Top-level field holding the next cursor.
+        :param prefetch: If False, pages are fetched only when needed.
+        """
+        self.fetch = fetch
+        self.cursor = cursor
+        self.next_cursor = cursor
+        self.cursor_field = cursor_field
+        self.prefetch = prefetch
+
+    async def pages(self):
+        """Yields pages until the cursor stops advancing."""
+        cursor = self.cursor
+        pending = asyncio.ensure_future(self.fetch(cursor))
+        try:
+            while pending is not None:
+                page = await pending
+                pending = None
+                next_cursor = await page.get(self.cursor_field)
+                # Europe PMC returns the same cursor again once the results run out.
+                if not await page.has_items() or not next_cursor or next_cursor == cursor:
+                    next_cursor = None
+                elif self.prefetch:
+                    pending = asyncio.ensure_future(self.fetch(next_cursor))
+                self.cursor = cursor
+                self.next_cursor = next_cursor
+                yield page
+                if next_cursor is not None and pending is None:
+                    pending = asyncio.ensure_future(self.fetch(next_cursor))
+                cursor = next_cursor
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def __aiter__(self):
+        async for page in self.pages():
+            async for item in page:
+                yield item
+
+
+class AsyncRateLimiter:
+    """
+    Token-bucket rate limiter for coroutines.
+
+    A single instance can be shared by several async clients so that they
+    draw from one request budget. Like
+    :class:`~europmc_dev_tool.api.client.RateLimiter`, the rate backs off
+    multiplicatively on :meth:`throttle` and recovers additively on
+    :meth:`recover`.
+    """
+    def __init__(self, rate: float, per: float = 1.0, min_rate: float = None):
+        self._capacity = rate
+        self._tokens = rate
+        self._fill_rate = rate / per
+        self._max_fill_rate = self._fill_rate
+        self._min_fill_rate = min_rate if min_rate is not None else self._max_fill_rate / 20
+        self._increase = self._max_fill_rate / 100
+        self._timestamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """The current rate in requests per second."""
+        return self._fill_rate
+
+    def _reserve(self) -> float:
+        """Takes one token and returns how long the caller must wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._timestamp
+            self._timestamp = now
+            self._tokens = min(self._capacity, self._tokens + elapsed * self._fill_rate) - 1
+            tokens = self._tokens
+        return -tokens / self._fill_rate if tokens < 0 else 0.0
+
+    async def acquire(self) -> float:
+        """
+        Waits until a request may be made. Returns the time spent waiting.
+
+        The token is reserved under the lock and the wait happens outside it,
+        so waiting callers sleep concurrently, each until its own slot.
+        """
+        to_wait = self._reserve()
+        if to_wait > 0:
+            await asyncio.sleep(to_wait)
+        return to_wait
+
+    def throttle(self, factor: float = 0.5):
+        """Multiplicatively decreases the rate after the server throttled us."""
+        with self._lock:
+            self._fill_rate = max(self._min_fill_rate, self._fill_rate * factor)
+            self._tokens = min(self._tokens, 0)
+
+    def recover(self):
+        """Additively increases the rate after a successful request."""
+        with self._lock:
+            self._fill_rate = min(self._max_fill_rate, self._fill_rate + self._increase)
+
+
+class AsyncClientMixin:
+    """
+    Replaces the synchronous transport of a client with an async one.
+
+    The endpoint methods of the synchronous clients only build a URL and
+    parameters and return ``self._get(...)``. Mixed in front of one of those
+    clients, this class makes ``_get`` and ``_get_text`` coroutines, so the
+    inherited endpoint methods return awaitables and the endpoint and
+    parameter logic is shared rather than duplicated. Methods that iterate
+    or fan out (``search_iter``, the ``*_batch``/``*_bulk`` methods and so
+    on) are overridden by each async client as async generators. As on the
+    synchronous clients, responses can be cached in a
+    :class:`~europmc_dev_tool.api.cache.ResponseCache`, identical concurrent
+    requests are sent once, and the ``*_stream`` methods decode a page as it
+    arrives, returning an :class:`~europmc_dev_tool.api.jsonstream.AsyncJSONStream`.
+
+    Requires the optional ``httpx`` dependency.
+    """
+    def __init__(self, email: str = None, tool: str = None, rate_limit: float = 10.0,
+                 max_concurrency: int = 10, rate_limiter: AsyncRateLimiter = None,
+                 retry_policy: RetryPolicy = None, http_client=None, timeout: float = 10.0, metrics=None,
+                 cache=None, flight: AsyncSingleFlight = None):
+        """
+        Initializes the client.
+
+        :param email: Contact email for API identification.
+        :param tool: Tool name for API identification.
+        :param rate_limit: Requests per second, used when no ``rate_limiter`` is given.
+        :param max_concurrency: Maximum number of requests in flight at once.
+        :param rate_limiter: A rate limiter shared with other async clients.
+        :param retry_policy: Retry policy; defaults to the same policy as the
+                             synchronous clients.
+        :param http_client: An existing ``httpx.AsyncClient`` to use.
+        :param timeout: Request timeout in seconds.
+        :param metrics: Optional :class:`~europmc_dev_tool.api.metrics.RequestMetrics`.
+        :param cache: Optional :class:`~europmc_dev_tool.api.cache.ResponseCache`.
+        :param flight: An :class:`~europmc_dev_tool.api.concurrency.AsyncSingleFlight`
+                       shared with other async clients, to coalesce identical
+                       requests across them.
+        """
+        if httpx is None:
+            raise ImportError("The async clients require httpx. Install it with: pip install httpx")
+        self.email = email
+        self.tool = tool
+        self.rate_limiter = rate_limiter or AsyncRateLimiter(rate_limit, 1)
+        self.retry_policy = retry_policy or RetryPolicy(transient_exceptions=(httpx.TransportError,))
+        self.metrics = metrics
+        self.cache = cache
+        self.flight = flight or AsyncSingleFlight()
+        # Only the synchronous transport uses a requests session.
+        self.session = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._owns_http = http_client is None
+        self.http = http_client or httpx.AsyncClient(
+            headers={'User-Agent': USER_AGENT},
+            limits=httpx.Limits(max_connections=max_concurrency),
+            timeout=timeout,
+        )
+
+    @staticmethod
+    def _clean_params(params):
+        # requests drops None values; httpx would send them as empty strings.
+        if params is None:
+            return None
+        return {k: v for k, v in params.items() if v is not None}
+
+    async def _send(self, url: str, params: dict = None, headers: dict = None, stream: bool = False):
+        if self.cache is not None and self.cache.offline:
+            raise OfflineCacheMiss(f"Offline mode: not requesting {url}")
+        async with self._semaphore:
+            start = time.monotonic()
+            await self.rate_limiter.acquire()
+            waited = time.monotonic() - start
+            start = time.monotonic()
+            request = self.http.build_request("GET", url, params=self._clean_params(params), headers=headers)
+            try:
+                response = await self.http.send(request, stream=stream)
+            except httpx.HTTPError as e:
+                if self.metrics is not None:
+                    self.metrics.record_request(url, type(e).__name__, time.monotonic() - start, waited)
+                raise
+            if self.metrics is not None:
+                size = 0
+                if stream:
+                    self._count_streamed(url, response)
+                else:
+                    size = len(response.content)
+                self.metrics.record_request(url, response.status_code, time.monotonic() - start, waited, size)
+            # Unlike requests, httpx raises for 304, which revalidation expects.
+            if response.is_error:
+                if stream:
+                    await response.aclose()
+                response.raise_for_status()
+            self.rate_limiter.recover()
+            return response
+
+    def _count_streamed(self, url: str, response):
+        """Counts the decoded body of a streamed response as it is read and records it on ``aclose``."""
+        aiter_bytes, aclose = response.aiter_bytes, response.aclose
+        read = recorded = 0
+
+        async def counting(*args, **kwargs):
+            nonlocal read
+            async for chunk in aiter_bytes(*args, **kwargs):
+                read += len(chunk)
+                yield chunk
+
+        async def closing():
+            nonlocal recorded
+            await aclose()
+            self.metrics.record_bytes(url, read - recorded)
+            recorded = read
+
+        response.aiter_bytes = counting
+        response.aclose = closing
+
+    def _on_error(self, exc):
+        if self.retry_policy.is_throttled(exc):
+            self.rate_limiter.throttle()
+
+    async def _request(self, url: str, params: dict = None, **kwargs):
+        attempts = 0
+
+        async def send(url, params, **kw):
+            nonlocal attempts
+            attempts += 1
+            if attempts > 1 and self.metrics is not None:
+                self.metrics.record_retry(url)
+            return await self._send(url, params, **kw)
+
+        return await self.retry_policy.acall(send, url, params, on_error=self._on_error, **kwargs)
+
+    async def _fetch_text(self, url: str, params: dict = None) -> str:
+        key = (url, tuple(sorted((params or {}).items())))
+        return await self.flight.do(key, self._fetch_text_once, url, params)
+
+    async def _fetch_text_once(self, url: str, params: dict = None) -> str:
+        if self.cache is not None:
+            return await self.cache.afetch(url, params, self._request)
+        return (await self._request(url, params)).text
+
+    async def _get(self, url: str, params: dict = None) -> dict:
+        return json.loads(await self._fetch_text(url, params))
+
+    async def _get_text(self, url: str, params: dict = None) -> str:
+        return await self._fetch_text(url, params)
+
+    async def _get_stream(self, url: str, params: dict = None, path: str = "") -> AsyncJSONStream:
+        """Async counterpart of :meth:`~europmc_dev_tool.api.client.BaseClient._get_stream`."""
+        if self.cache is not None:
+            return AsyncJSONStream(_single(await self._fetch_text(url, params)), path)
+        attempt = 1
+
+        async def reopen(exc):
+            nonlocal attempt
+            self._on_error(exc)
+            to_wait = self.retry_policy._next_delay(attempt, exc)
+            if to_wait is None:
+                return None
+            attempt += 1
+            if self.metrics is not None:
+                self.metrics.record_retry(url)
+            await asyncio.sleep(to_wait)
+            response = await self._request(url, params, stream=True)
+            return response.aiter_bytes(STREAM_CHUNK_SIZE), response.aclose
+
+        response = await self._request(url, params, stream=True)
+        stream = AsyncJSONStream(
+            response.aiter_bytes(STREAM_CHUNK_SIZE), path, close=response.aclose, reopen=reopen
+        )
+        await stream.has_items()
+        return stream
+
+    async def aclose(self):
+        """Closes the underlying HTTP client if this client created it."""
+        if self._owns_http:
+            await self.http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+
+class AsyncArticlesClient(AsyncClientMixin, ArticlesClient):
+    """
+    Async client for the Europe PMC Articles RESTful API.
+
+    Has the same methods as :class:`~europmc_dev_tool.api.articles.ArticlesClient`,
+    returning awaitables or async generators.
+    """
+    async def search_iter(self, query: str, page_size: int = ArticlesClient.MAX_PAGE_SIZE,
+                          result_type: str = "core", cursor_mark: str = "*"):
+        """Yields every hit of a search, paging with ``cursorMark`` and decoding each page as it arrives."""
+        paginator = AsyncCursorPaginator(
+            lambda cursor: self.search_stream(query, page_size=page_size, result_type=result_type, cursor_mark=cursor),
+            cursor=cursor_mark
+        )
+        async for result in paginator:
+            yield result
+
+    async def resolve_ids(self, article_ids, result_type: str = "lite", max_workers: int = 4):
+        """Yields ``(article_id, result, error)`` triples in input order, like the synchronous method."""
+        async def fetch(chunk):
+            try:
+                data = await self.search(self._ids_query(chunk), page_size=self.MAX_PAGE_SIZE, result_type=result_type)
+            except _ERRORS as e:
+                return [(article_id, None, e) for article_id, _, _ in chunk]
+            return self._match_ids(chunk, data)
+
+        async for results in ordered_gather(fetch, self._id_chunks(article_ids), max_pending=max_workers):
+            for result in results:
+                yield result
+
+    def get_all_citations(self, source: str, article_id: str, page_size: int = ArticlesClient.MAX_PAGE_SIZE,
+                          max_workers: int = 4):
+        """Yields every article citing an article."""
+        return iter_numbered_pages(
+            lambda page: self.get_citations(source, article_id, page, page_size),
+            self._citations, self._hit_count, max_workers=max_workers
+        )
+
+    def get_all_references(self, source: str, article_id: str, page_size: int = ArticlesClient.MAX_PAGE_SIZE,
+                           max_workers: int = 4):
+        """Yields every reference of an article."""
+        return iter_numbered_pages(
+            lambda page: self.get_references(source, article_id, page, page_size),
+            self._references, self._hit_count, max_workers=max_workers
+        )
+
+    async def get_references_batch(self, articles, page_size: int = ArticlesClient.MAX_PAGE_SIZE,
+                                   max_workers: int = 4):
+        """Yields ``(source, article_id, references, error)`` tuples in input order."""
+        async def fetch(article):
+            source, article_id = article
+            try:
+                references = [r async for r in self.get_all_references(source, article_id, page_size, 1)]
+                return source, article_id, references, None
+            except _ERRORS as e:
+                return source, article_id, None, e
+
+        async for result in ordered_gather(fetch, articles, max_pending=max_workers):
+            yield result
+
+    async def download_fulltext_xml(self, article_id: str, path: str, chunk_size: int = 64 * 1024) -> int:
+        """Streams the full-text XML for an article to a gzip file, like the synchronous method."""
+        url = f"{self.BASE_URL}/{article_id}/fullTextXML"
+        part_path = f"{path}.part"
+
+        async def download():
+            size = 0
+            response = await self._send(url, stream=True)
+            try:
+                with gzip.open(part_path, "wb") as f:
+                    async for chunk in response.aiter_bytes(chunk_size):
+                        f.write(chunk)
+                        size += len(chunk)
+            finally:
+                await response.aclose()
+            return size
+
+        try:
+            size = await self.retry_policy.acall(download, on_error=self._on_error)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        os.replace(part_path, path)
+        return size
+
+
+class AsyncAnnotationsClient(AsyncClientMixin, AnnotationsClient):
+    """
+    Async client for the Europe PMC Annotations API.
+
+    Has the same methods as :class:`~europmc_dev_tool.api.annotations.AnnotationsClient`,
+    returning awaitables or async generators.
+    """
+    async def _get_chunk(self, article_ids: list, provider: str = None, on_error=None) -> list:
+        try:
+            results = await self.get_by_article_ids(article_ids, provider)
+        except _ERRORS as e:
+            if len(article_ids) == 1:
+                if on_error is None:
+                    raise
+                on_error(article_ids[0], e)
+                return []
+            results = []
+            for article_id in article_ids:
+                results.extend(await self._get_chunk([article_id], provider, on_error))
+            return results
+        return self._in_input_order(article_ids, results)
+
+    async def get_by_article_ids_bulk(self, article_ids, provider: str = None,
+                                      chunk_size: int = AnnotationsClient.MAX_IDS_PER_REQUEST,
+                                      max_workers: int = 4, on_error=None):
+        """Yields annotations for any number of article IDs, in input order."""
+        async for results in ordered_gather(
+            lambda chunk: self._get_chunk(chunk, provider, on_error), self._id_chunks(article_ids, chunk_size),
+            max_pending=max_workers
+        ):
+            for result in results:
+                yield result
+
+    def paginate_by_section_and_or_type(self, annotation_type: str, subtype: str = None, section: str = None,
+                                        provider: str = None, filter: int = 1,
+                                        page_size: int = AnnotationsClient.MAX_PAGE_SIZE,
+                                        cursor_mark: str = "0.0") -> AsyncCursorPaginator:
+        """
+        Returns an :class:`AsyncCursorPaginator` over all articles with
+        annotations of a specific type, like the synchronous method.
+        """
+        return AsyncCursorPaginator(
+            lambda cursor: self.stream_by_section_and_or_type(
+                annotation_type, subtype, section, provider, filter, page_size, cursor
+            ),
+            cursor=cursor_mark
+        )
+
+    async def iter_by_section_and_or_type(self, annotation_type: str, subtype: str = None, section: str = None,
+                                          provider: str = None, filter: int = 1,
+                                          page_size: int = AnnotationsClient.MAX_PAGE_SIZE, cursor_mark: str = "0.0"):
+        """Yields every article with annotations of a specific type, following ``nextCursorMark``."""
+        async for article in self.paginate_by_section_and_or_type(
+            annotation_type, subtype, section, provider, filter, page_size, cursor_mark
+        ):
+            yield article
+
+
+class AsyncGrantsClient(AsyncClientMixin, GrantsClient):
+    """
+    Async client for the Europe PMC Grants RESTful API.
+
+    Has the same methods as :class:`~europmc_dev_tool.api.grants.GrantsClient`,
+    returning awaitables or async generators.
+    """
+    def search_iter(self, query: str, page_size: int = 25, max_workers: int = 4):
+        """Yields every grant matching a query, in page order."""
+        return iter_numbered_pages(
+            lambda page: self.search(query, page, page_size),
+            self._records, lambda data: int(data.get("HitCount") or 0), max_workers=max_workers
+        )
+
+
+class AsyncOAIClient(AsyncClientMixin, OAIClient):
+    """
+    Async client for the Europe PMC OAI-PMH service.
+
+    Has the same methods as :class:`~europmc_dev_tool.api.oai.OAIClient`,
+    returning awaitables or async generators. Each ListRecords response is
+    read in full before its records are parsed.
+    """
+    async def iter_records(self, metadata_prefix: str = "oai_dc", from_date: str = None, until: str = None,
+                           set_spec: str = None, resumption_token: str = None):
+        """Yields every record of a ListRecords request, following resumption tokens."""
+        params = RecordHarvester(self, metadata_prefix, from_date, until, set_spec).params
+        if resumption_token:
+            params = {"verb": "ListRecords", "resumptionToken": resumption_token}
+        while True:
+            xml = await self._get_text(self.BASE_URL, params)
+            token = None
+            for kind, value in parse_oai_response(io.BytesIO(xml.encode("utf8"))):
+                if kind == "record":
+                    yield value
+                elif kind == "resumptionToken":
+                    token = value
+            if not token:
+                return
+            params = {"verb": "ListRecords", "resumptionToken": token}
+
+    async def get_record(self, identifier: str, metadata_prefix: str = "pmc"):
+        """Fetch a single record with GetRecord."""
+        params = self._get_record_params(identifier, metadata_prefix)
+        return self._parse_record(await self._get_text(self.BASE_URL, params), params["identifier"])
+
+    async def get_records(self, pmcids, metadata_prefix: str = "pmc", max_workers: int = 4):
+        """Yields ``(pmcid, record, error)`` triples in input order."""
+        async def fetch(pmcid):
+            try:
+                return pmcid, await self.get_record(pmcid, metadata_prefix), None
+            except (OAIError, etree.XMLSyntaxError) + _ERRORS as e:
+                return pmcid, None, e
+
+        async for result in ordered_gather(fetch, pmcids, max_pending=max_workers):
+            yield result
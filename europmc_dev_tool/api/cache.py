@@ -0,0 +1,156 @@
+import time
+import hashlib
+from urllib.parse import urlencode, urlsplit
+
+import requests
+
+from ..cache import DiskCache
+
+DAY = 24 * 60 * 60
+
+
+class OfflineCacheMiss(requests.RequestException):
+    """Raised in offline mode when a response is not in the cache."""
+
+
+class ResponseCache:
+    """
+    On-disk cache of API responses with conditional revalidation.
+
+    Responses are keyed on the URL and the sorted request parameters
+    (ignoring the ``email`` and ``tool`` identification parameters) and
+    stored gzip-compressed in a :class:`~europmc_dev_tool.cache.DiskCache`.
+    Each endpoint can have its own time-to-live. Once an entry is stale it
+    is revalidated with ``If-None-Match``/``If-Modified-Since`` when the
+    server sent an ``ETag`` or ``Last-Modified`` header, so unchanged
+    responses cost a ``304 Not Modified`` instead of a full download. In
+    offline mode, only cached responses are served, however old.
+    """
+    DEFAULT_TTLS = {
+        'search': DAY,
+        'article': 7 * DAY,
+        'references': 7 * DAY,
+        'citations': 7 * DAY,
+        'fullTextXML': 30 * DAY,
+        'annotationsByArticleIds': 7 * DAY,
+        'annotationsByEntity': DAY,
+        'annotationsBySectionAndOrType': DAY,
+    }
+    IGNORED_PARAMS = ('email', 'tool')
+
+    def __init__(self, directory: str, ttl: float = DAY, ttls: dict = None, offline: bool = False, max_size: int = None):
+        """
+        Initializes the cache.
+
+        :param directory: Directory in which to store responses.
+        :param ttl: Time-to-live in seconds for endpoints without their own TTL.
+        :param ttls: Per-endpoint TTLs in seconds, keyed by endpoint name
+                     (e.g. ``search``, ``references``). Merged over
+                     :attr:`DEFAULT_TTLS`.
+        :param offline: If True, never contact the server.
+        :param max_size: Maximum size of the cache in bytes.
+        """
+        self.store = DiskCache(directory, max_size=max_size)
+        self.ttl = ttl
+        self.ttls = dict(self.DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.offline = offline
+
+    def endpoint(self, url: str) -> str:
+        """Returns the name of the endpoint a URL belongs to, or None if unknown."""
+        for segment in reversed(urlsplit(url).path.split('/')):
+            if segment in self.ttls:
+                return segment
+        return None
+
+    def ttl_for(self, url: str) -> float:
+        """Returns the time-to-live for responses from ``url``."""
+        return self.ttls.get(self.endpoint(url), self.ttl)
+
+    def key(self, url: str, params: dict = None) -> str:
+        """Returns the cache key for a request."""
+        items = sorted(
+            (k, str(v)) for k, v in (params or {}).items()
+            if v is not None and k not in self.IGNORED_PARAMS
+        )
+        normalized = f"{url}?{urlencode(items)}"
+        return hashlib.sha256(normalized.encode('utf8')).hexdigest()
+
+    def _lookup(self, url: str, params: dict):
+        """
+        Returns ``(key, entry, body)`` for a request. ``body`` is set when the
+        cached entry can be served without contacting the server.
+        """
+        key = self.key(url, params)
+        entry = self.store.get(key)
+        if self.offline:
+            if entry is None:
+                raise OfflineCacheMiss(f"Offline mode: no cached response for {url}")
+            return key, entry, entry['body']
+        if entry is not None and time.time() - entry['stored_at'] < self.ttl_for(url):
+            return key, entry, entry['body']
+        return key, entry, None
+
+    @staticmethod
+    def _validators(entry) -> dict:
+        """Returns the conditional request headers for revalidating ``entry``."""
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _store(self, key: str, url: str, entry, response) -> str:
+        """Stores a response, or refreshes ``entry`` on 304, and returns the body."""
+        now = time.time()
+        if response.status_code == 304 and entry is not None:
+            entry['stored_at'] = now
+            self.store.set(key, entry)
+            return entry['body']
+
+        body = response.text
+        self.store.set(key, {
+            'url': url,
+            'stored_at': now,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body': body,
+        })
+        return body
+
+    def fetch(self, url: str, params: dict, send) -> str:
+        """
+        Returns the body of a GET request, from the cache where possible.
+
+        :param send: Callable ``send(url, params, headers=...)`` that performs
+                     the request and returns a ``requests.Response``.
+        """
+        key, entry, body = self._lookup(url, params)
+        if body is not None:
+            return body
+        return self._store(key, url, entry, send(url, params, headers=self._validators(entry)))
+
+    async def afetch(self, url: str, params: dict, send) -> str:
+        """
+        Coroutine counterpart of :meth:`fetch`, for the async clients.
+
+        :param send: Coroutine function ``send(url, params, headers=...)``
+                     returning an ``httpx.Response``.
+        """
+        key, entry, body = self._lookup(url, params)
+        if body is not None:
+            return body
+        return self._store(key, url, entry, await send(url, params, headers=self._validators(entry)))
+
+    def close(self):
+        """Closes the underlying :class:`~europmc_dev_tool.cache.DiskCache`."""
+        self.store.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,57 +1,364 @@
+import os
+import json
 import time
+import random
+import struct
+import asyncio
+import threading
 import requests
-from functools import wraps
+from email.utils import parsedate_to_datetime
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from .transport import get_session
+from .jsonstream import JSONStream
+from .cache import OfflineCacheMiss
+from .concurrency import SingleFlight
+from .metrics import RequestMetrics
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class RateLimiter:
     """
     Token-bucket rate limiter to throttle requests.
+
+    Safe to share between threads: each caller reserves a token under a lock
+    and then sleeps, outside the lock, until its reservation is due.
+
+    The rate adapts to server feedback AIMD-style: :meth:`throttle` cuts it
+    multiplicatively when the server pushes back, and :meth:`recover` raises
+    it additively after each success, up to the configured rate.
     """
-    def __init__(self, rate: float, per: float):
+    def __init__(self, rate: float, per: float, min_rate: float = None):
         self._capacity = rate
         self._tokens = rate
         self._fill_rate = rate / per
+        self._max_fill_rate = self._fill_rate
+        self._min_fill_rate = min_rate if min_rate is not None else self._max_fill_rate / 20
+        self._increase = self._max_fill_rate / 100
         self._timestamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """The current rate in requests per second."""
+        return self._fill_rate
+
+    def _reserve(self) -> float:
+        """Takes one token and returns how long the caller must wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._timestamp
+            self._timestamp = now
+            self._tokens = min(self._capacity, self._tokens + elapsed * self._fill_rate) - 1
+            tokens = self._tokens
+        return -tokens / self._fill_rate if tokens < 0 else 0.0
 
-    def acquire(self):
-        now = time.monotonic()
-        elapsed = now - self._timestamp
-        self._timestamp = now
-        self._tokens = min(self._capacity, self._tokens + elapsed * self._fill_rate)
-        if self._tokens < 1:
-            to_wait = (1 - self._tokens) / self._fill_rate
+    def acquire(self) -> float:
+        """Blocks until a request may be made. Returns the time spent waiting."""
+        to_wait = self._reserve()
+        if to_wait > 0:
             time.sleep(to_wait)
-            self._tokens = 0
-        else:
-            self._tokens -= 1
-
-def retry_on_failure(max_attempts: int = 3, backoff: float = 1.0):
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            delay = backoff
-            for attempt in range(1, max_attempts + 1):
-                try:
-                    return func(*args, **kwargs)
-                except requests.RequestException as e:
-                    if attempt == max_attempts:
-                        raise
-                    time.sleep(delay)
-                    delay *= 2
-        return wrapper
-    return decorator
+        return to_wait
+
+    def throttle(self, factor: float = 0.5):
+        """Multiplicatively decreases the rate after the server throttled us."""
+        with self._lock:
+            self._fill_rate = max(self._min_fill_rate, self._fill_rate * factor)
+            # Drop any saved-up burst so the lower rate applies immediately.
+            self._tokens = min(self._tokens, 0)
+
+    def recover(self):
+        """Additively increases the rate after a successful request."""
+        if self._fill_rate >= self._max_fill_rate:
+            return
+        with self._lock:
+            self._fill_rate = min(self._max_fill_rate, self._fill_rate + self._increase)
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    Token-bucket rate limiter shared by every process on a host.
+
+    The bucket state, including the current adaptive rate, is kept in a small
+    file guarded by an exclusive ``flock``, so all processes (and threads)
+    that use the same ``path`` draw from one request budget instead of one
+    budget each, and throttling seen by one process slows them all. Only
+    available on platforms with ``fcntl``.
+    """
+    _STATE = struct.Struct('<ddd')
+
+    def __init__(self, rate: float, per: float, path: str, min_rate: float = None):
+        if fcntl is None:
+            raise RuntimeError("SharedRateLimiter requires fcntl, which is not available on this platform.")
+        super().__init__(rate, per, min_rate)
+        self.path = path
+        self._fd = None
+        self._pid = None
+
+    def _file(self):
+        # flock locks belong to the open file, which a forked child would
+        # share with its parent, so each process opens its own.
+        if self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _update(self, func):
+        """Applies ``func(tokens, timestamp, rate, now)`` to the shared state under the lock."""
+        with self._lock:
+            fd = self._file()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                data = os.pread(fd, self._STATE.size, 0)
+                if len(data) == self._STATE.size:
+                    tokens, timestamp, rate = self._STATE.unpack(data)
+                    # The file may have been left by a run with other limits;
+                    # this process never goes faster than its own.
+                    rate = min(self._max_fill_rate, max(self._min_fill_rate, rate))
+                else:
+                    tokens, timestamp, rate = self._capacity, now, self._max_fill_rate
+                tokens, rate = func(tokens, timestamp, rate, now)
+                os.pwrite(fd, self._STATE.pack(tokens, now, rate), 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._fill_rate = rate
+        return tokens, rate
+
+    def _reserve(self) -> float:
+        def take(tokens, timestamp, rate, now):
+            elapsed = max(0.0, now - timestamp)
+            return min(self._capacity, tokens + elapsed * rate) - 1, rate
+
+        tokens, rate = self._update(take)
+        return -tokens / rate if tokens < 0 else 0.0
+
+    def throttle(self, factor: float = 0.5):
+        def decrease(tokens, timestamp, rate, now):
+            tokens = min(self._capacity, tokens + max(0.0, now - timestamp) * rate)
+            return min(tokens, 0), max(self._min_fill_rate, rate * factor)
+
+        self._update(decrease)
+
+    def recover(self):
+        if self._fill_rate >= self._max_fill_rate:
+            return
+
+        def increase(tokens, timestamp, rate, now):
+            tokens = min(self._capacity, tokens + max(0.0, now - timestamp) * rate)
+            return tokens, min(self._max_fill_rate, rate + self._increase)
+
+        self._update(increase)
+
+
+def retry_after_seconds(response) -> float:
+    """
+    Returns the delay requested by a response's ``Retry-After`` header, in
+    seconds, or None if it has none. Both delta-seconds and HTTP-date forms
+    are understood.
+    """
+    if response is None:
+        return None
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryBudgetExhausted(requests.RequestException):
+    """Raised when a run has used up its retry budget."""
+
+
+class RetryPolicy:
+    """
+    Decides which failed requests are retried and how long to wait.
+
+    Only transient failures are retried: connection errors, timeouts,
+    responses cut off or corrupted while being read, 5xx responses and 429
+    (Too Many Requests). Other 4xx responses are raised immediately. A
+    ``Retry-After`` header is obeyed when present, up to ``max_backoff``;
+    otherwise the delay is exponential backoff with full jitter. An optional budget
+    caps the number of retries across every request that shares the policy,
+    so a run against a failing server gives up instead of retrying forever.
+    """
+    transient_exceptions = (
+        requests.ConnectionError, requests.Timeout,
+        requests.exceptions.ChunkedEncodingError, requests.exceptions.ContentDecodingError,
+    )
+
+    def __init__(self, max_attempts: int = 5, backoff: float = 1.0, max_backoff: float = 60.0,
+                 budget: int = None, jitter: bool = True, transient_exceptions: tuple = None):
+        """
+        Initializes the policy.
+
+        :param max_attempts: Maximum attempts per request, including the first.
+        :param backoff: Base delay in seconds, doubled after each attempt.
+        :param max_backoff: Upper bound for the backoff delay in seconds.
+        :param budget: Maximum number of retries for the whole run. None means unlimited.
+        :param jitter: If True, randomise the backoff delay.
+        :param transient_exceptions: Extra exception types to treat as
+                                     transient network errors.
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.jitter = jitter
+        if transient_exceptions:
+            self.transient_exceptions = self.transient_exceptions + tuple(transient_exceptions)
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _status(exc):
+        response = getattr(exc, 'response', None)
+        return getattr(response, 'status_code', None)
+
+    def is_transient(self, exc) -> bool:
+        """Returns True if the request that raised ``exc`` may succeed on retry."""
+        if isinstance(exc, self.transient_exceptions):
+            return True
+        status = self._status(exc)
+        return status is not None and (status == 429 or status >= 500)
+
+    def is_throttled(self, exc) -> bool:
+        """Returns True if ``exc`` means the server asked us to slow down."""
+        status = self._status(exc)
+        if status == 429:
+            return True
+        return status == 503 and retry_after_seconds(getattr(exc, 'response', None)) is not None
+
+    def delay(self, attempt: int, exc=None) -> float:
+        """Returns how long to wait before retrying after failed ``attempt``."""
+        retry_after = retry_after_seconds(getattr(exc, 'response', None))
+        if retry_after is not None:
+            # A server asking for a very long wait is capped like backoff.
+            return min(retry_after, self.max_backoff)
+        ceiling = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling) if self.jitter else ceiling
+
+    def _take_retry(self) -> bool:
+        with self._lock:
+            if self.budget is not None and self.retries >= self.budget:
+                return False
+            self.retries += 1
+            return True
+
+    def _next_delay(self, attempt, exc):
+        if attempt >= self.max_attempts or not self.is_transient(exc):
+            return None
+        if not self._take_retry():
+            raise RetryBudgetExhausted(f"Retry budget of {self.budget} exhausted") from exc
+        return self.delay(attempt, exc)
+
+    def call(self, func, *args, on_error=None, **kwargs):
+        """
+        Calls ``func`` and retries it according to the policy.
+
+        :param on_error: Optional callback invoked with every exception
+                         before deciding whether to retry.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if on_error:
+                    on_error(e)
+                to_wait = self._next_delay(attempt, e)
+                if to_wait is None:
+                    raise
+                time.sleep(to_wait)
+
+    async def acall(self, func, *args, on_error=None, **kwargs):
+        """Coroutine counterpart of :meth:`call` for async ``func``."""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                if on_error:
+                    on_error(e)
+                to_wait = self._next_delay(attempt, e)
+                if to_wait is None:
+                    raise
+                await asyncio.sleep(to_wait)
+
+
+class _CountingRaw:
+    """
+    Wraps the ``raw`` body of a streamed response and counts the bytes read.
+
+    ``iter_content`` reads through :meth:`stream` and parsers that take the
+    raw body through :meth:`read`, so both are counted, after content
+    decoding. Other attributes, including ones set such as
+    ``decode_content``, are those of the wrapped object.
+    """
+    def __init__(self, raw):
+        object.__setattr__(self, '_raw', raw)
+        object.__setattr__(self, 'bytes_read', 0)
+
+    def _count(self, data):
+        object.__setattr__(self, 'bytes_read', self.bytes_read + len(data or b''))
+        return data
+
+    def read(self, *args, **kwargs):
+        return self._count(self._raw.read(*args, **kwargs))
+
+    def stream(self, amt=STREAM_CHUNK_SIZE, decode_content=None):
+        if hasattr(self._raw, 'stream'):
+            for chunk in self._raw.stream(amt, decode_content=decode_content):
+                yield self._count(chunk)
+            return
+        while True:
+            chunk = self.read(amt)
+            if not chunk:
+                return
+            yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._raw, name, value)
+
 
 class BaseClient:
     """
     Base client for Europe PMC APIs.
     """
-    def __init__(self, email: str = None, tool: str = None, rate_limit: float = 10.0):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
-        })
+    def __init__(self, email: str = None, tool: str = None, rate_limit: float = 10.0, rate_limiter: RateLimiter = None,
+                 retry_policy: RetryPolicy = None, cache=None, session: requests.Session = None,
+                 flight: SingleFlight = None, metrics: RequestMetrics = None):
+        # By default all clients share one pooled session per process.
+        self.session = session or get_session()
         self.email = email
         self.tool = tool
-        self.rate_limiter = RateLimiter(rate_limit, 1)
+        # Pass a shared rate_limiter to make several clients (or threads)
+        # draw from one request budget.
+        self.rate_limiter = rate_limiter or RateLimiter(rate_limit, 1)
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Optional europmc_dev_tool.api.cache.ResponseCache.
+        self.cache = cache
+        # Identical requests made concurrently are sent once; share a
+        # SingleFlight between clients to coalesce across them too.
+        self.flight = flight or SingleFlight()
+        # Optional RequestMetrics; when set, every request sent is recorded.
+        self.metrics = metrics
 
     def _build_params(self, extra: dict = None) -> dict:
         params = {"format": "json"}
@@ -63,16 +370,110 @@ class BaseClient:
             params.update(extra)
         return params
 
-    @retry_on_failure(max_attempts=3, backoff=1)
-    def _get(self, url: str, params: dict = None) -> dict:
-        self.rate_limiter.acquire()
-        response = self.session.get(url, params=params, timeout=10)
+    def _send(self, url: str, params: dict = None, **kwargs) -> requests.Response:
+        # Checked here rather than only in the cache so that streamed
+        # requests, which bypass it, cannot reach the server either.
+        if self.cache is not None and self.cache.offline:
+            raise OfflineCacheMiss(f"Offline mode: not requesting {url}")
+        waited = self.rate_limiter.acquire()
+        if self.metrics is None:
+            response = self.session.get(url, params=params, timeout=10, **kwargs)
+        else:
+            start = time.monotonic()
+            try:
+                response = self.session.get(url, params=params, timeout=10, **kwargs)
+            except requests.RequestException as e:
+                self.metrics.record_request(url, type(e).__name__, time.monotonic() - start, waited)
+                raise
+            if kwargs.get('stream'):
+                size = 0
+                self._count_streamed(url, response)
+            else:
+                size = len(response.content)
+            self.metrics.record_request(url, response.status_code, time.monotonic() - start, waited, size)
         response.raise_for_status()
-        return response.json()
+        self.rate_limiter.recover()
+        return response
+
+    def _count_streamed(self, url: str, response: requests.Response):
+        """Counts the body of a streamed response as it is read and records it when the response is closed."""
+        if response.raw is None:
+            return
+        raw = response.raw = _CountingRaw(response.raw)
+        close = response.close
+        recorded = 0
+
+        def closing():
+            nonlocal recorded
+            close()
+            self.metrics.record_bytes(url, raw.bytes_read - recorded)
+            recorded = raw.bytes_read
+
+        response.close = closing
+
+    def _on_error(self, exc):
+        if self.retry_policy.is_throttled(exc):
+            self.rate_limiter.throttle()
+
+    def _request(self, url: str, params: dict = None, **kwargs) -> requests.Response:
+        """Performs a rate-limited GET, retried according to the retry policy."""
+        if self.metrics is None:
+            return self.retry_policy.call(self._send, url, params, on_error=self._on_error, **kwargs)
+        attempts = 0
+
+        def send(*args, **kw):
+            nonlocal attempts
+            attempts += 1
+            if attempts > 1:
+                self.metrics.record_retry(url)
+            return self._send(*args, **kw)
+
+        return self.retry_policy.call(send, url, params, on_error=self._on_error, **kwargs)
+
+    def _fetch_text(self, url: str, params: dict = None) -> str:
+        key = (url, tuple(sorted((params or {}).items())))
+        return self.flight.do(key, self._fetch_text_once, url, params)
+
+    def _fetch_text_once(self, url: str, params: dict = None) -> str:
+        if self.cache is not None:
+            return self.cache.fetch(url, params, self._request)
+        return self._request(url, params).text
+
+    def _get(self, url: str, params: dict = None) -> dict:
+        return json.loads(self._fetch_text(url, params))
 
-    @retry_on_failure(max_attempts=3, backoff=1)
     def _get_text(self, url: str, params: dict = None) -> str:
-        self.rate_limiter.acquire()
-        response = self.session.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        return response.text
+        return self._fetch_text(url, params)
+
+    def _get_stream(self, url: str, params: dict = None, path: str = "") -> JSONStream:
+        """
+        Performs a GET and decodes the array at ``path`` of the JSON response incrementally.
+
+        The request is retried like :meth:`_get`. The body is read as it is
+        consumed; if reading it fails with a transient error, the request is
+        sent again under the same retry policy and decoding resumes after
+        the items already returned. The first item is read before returning,
+        so a page fetched in the background has its body under way.
+        With a response cache the body is cached and decoded from the cache.
+        """
+        if self.cache is not None:
+            return JSONStream([self._fetch_text(url, params)], path)
+        attempt = 1
+
+        def reopen(exc):
+            nonlocal attempt
+            self._on_error(exc)
+            to_wait = self.retry_policy._next_delay(attempt, exc)
+            if to_wait is None:
+                return None
+            attempt += 1
+            if self.metrics is not None:
+                self.metrics.record_retry(url)
+            time.sleep(to_wait)
+            response = self._request(url, params, stream=True)
+            return response.iter_content(STREAM_CHUNK_SIZE), response.close
+
+        response = self._request(url, params, stream=True)
+        stream = JSONStream(response.iter_content(STREAM_CHUNK_SIZE), path, close=response.close, reopen=reopen)
+        bool(stream)
+        return stream
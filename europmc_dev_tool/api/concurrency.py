@@ -0,0 +1,177 @@
+import queue
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+def ordered_map(func, items, max_workers: int = 4, max_pending: int = None):
+    """
+    Applies ``func`` to ``items`` in a thread pool and yields the results in
+    input order.
+
+    Items are read lazily and at most ``max_pending`` calls (by default twice
+    ``max_workers``) are in flight or waiting to be yielded, so arbitrarily
+    long inputs use bounded memory. Requests made by ``func`` through a
+    client still pass through that client's rate limiter, so concurrency
+    only hides latency and never raises the request rate.
+
+    :param func: Callable applied to each item.
+    :param items: Iterable of items.
+    :param max_workers: Number of threads.
+    :param max_pending: Maximum number of submitted but not yet yielded calls.
+    """
+    max_pending = max_pending or 2 * max_workers
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(pool.submit(func, item))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def interleave(iterables, max_workers: int = 4, buffer: int = 1000):
+    """
+    Consumes several iterables concurrently and yields their items as they
+    arrive.
+
+    Each iterable is drained by its own worker thread, with at most
+    ``max_workers`` running at once. Items pass through a queue of ``buffer``
+    entries, so fast producers block rather than filling memory. An
+    exception in any producer is re-raised in the consumer, and closing the
+    generator stops the producers.
+
+    :param iterables: Iterable of iterables to consume.
+    :param max_workers: Maximum number of iterables consumed at once.
+    :param buffer: Maximum number of items waiting to be yielded.
+    """
+    iterables = list(iterables)
+    results = queue.Queue(maxsize=buffer)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def drain(iterable):
+        if stop.is_set():
+            return
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                close()
+            put(_DONE)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for iterable in iterables:
+            pool.submit(drain, iterable)
+        remaining = len(iterables)
+        try:
+            while remaining:
+                item = results.get()
+                if item is _DONE:
+                    remaining -= 1
+                elif isinstance(item, _Failure):
+                    raise item.exc
+                else:
+                    yield item
+        finally:
+            stop.set()
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls into one.
+
+    While a call for a key is in flight, later callers with the same key
+    wait for it and receive its result (or its exception) instead of making
+    the call again. Once it completes, the next call for the key runs anew,
+    so this saves duplicate work without caching results. :attr:`saved`
+    counts the calls that were coalesced.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.saved = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """Calls ``func(*args, **kwargs)``, or waits for the in-flight call with the same ``key``."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.saved += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """
+    Coroutine counterpart of :class:`SingleFlight`.
+
+    The first caller for a key runs ``func`` as a task; later callers with
+    the same key await that task instead of running ``func`` again.
+    Cancelling one caller does not cancel the call for the others.
+    """
+    def __init__(self):
+        self._calls = {}
+        self.saved = 0
+
+    async def do(self, key, func, *args, **kwargs):
+        """Awaits ``func(*args, **kwargs)``, or the in-flight call with the same ``key``."""
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(func(*args, **kwargs))
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.saved += 1
+        return await asyncio.shield(task)
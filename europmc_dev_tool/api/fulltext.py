@@ -0,0 +1,107 @@
+import os
+
+import requests
+
+from .concurrency import ordered_map
+
+STATUS_OK = "ok"
+STATUS_NOT_FOUND = "not_found"
+STATUS_EMPTY = "empty"
+STATUS_ERROR = "error"
+# Outcomes that will not change on a retry; anything else is tried again.
+FINAL_STATUSES = (STATUS_OK, STATUS_NOT_FOUND, STATUS_EMPTY)
+
+
+def fulltext_path(output_dir: str, article_id: str) -> str:
+    """Returns the path of the compressed full text of an article."""
+    return os.path.join(output_dir, f"{article_id}.xml.gz")
+
+
+class StatusLog:
+    """
+    Append-only tab-separated log of the outcome for each article.
+
+    Each line is ``article_id<TAB>status<TAB>detail``. When an article
+    appears more than once, the last line wins.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def load(self) -> dict:
+        """Returns the latest status of every logged article."""
+        statuses = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) >= 2:
+                        statuses[parts[0]] = parts[1]
+        return statuses
+
+    def record(self, article_id: str, status: str, detail: str = ""):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf8")
+        detail = " ".join(str(detail).split())
+        self._file.write(f"{article_id}\t{status}\t{detail}\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def fetch_fulltext_bulk(client, article_ids, output_dir: str, max_workers: int = 4, status_log: StatusLog = None):
+    """
+    Downloads the full text of many articles concurrently, with resume.
+
+    Articles are fetched through ``client`` and therefore within its rate
+    limit, and written to ``<output_dir>/<id>.xml.gz``. Outcomes are
+    appended to ``status_log`` (by default ``<output_dir>/status.tsv``).
+    Articles that already have a file, or a final status such as
+    ``not_found`` (no open-access full text), are skipped, so a re-run after
+    a crash only fetches what is missing. Transient failures are logged as
+    ``error`` and tried again on the next run. An ID that occurs more than
+    once in the input is fetched and reported once.
+
+    :param article_ids: Iterable of PMCIDs.
+    :return: A generator of ``(article_id, status)`` pairs, in input order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    status_log = status_log or StatusLog(os.path.join(output_dir, "status.tsv"))
+    done = {i for i, status in status_log.load().items() if status in FINAL_STATUSES}
+
+    def pending():
+        # Repeated IDs are submitted once, so two workers never write the
+        # same .part file.
+        submitted = set()
+        for article_id in article_ids:
+            if article_id in done or article_id in submitted:
+                continue
+            if os.path.exists(fulltext_path(output_dir, article_id)):
+                continue
+            submitted.add(article_id)
+            yield article_id
+
+    def fetch(article_id):
+        path = fulltext_path(output_dir, article_id)
+        try:
+            size = client.download_fulltext_xml(article_id, path)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return article_id, STATUS_NOT_FOUND, ""
+            return article_id, STATUS_ERROR, e
+        except requests.RequestException as e:
+            return article_id, STATUS_ERROR, e
+        if size == 0:
+            os.remove(path)
+            return article_id, STATUS_EMPTY, ""
+        return article_id, STATUS_OK, size
+
+    try:
+        for article_id, status, detail in ordered_map(fetch, pending(), max_workers=max_workers):
+            status_log.record(article_id, status, detail)
+            yield article_id, status
+    finally:
+        status_log.close()
@@ -1,4 +1,6 @@
+from urllib.parse import urlencode, quote
 from .client import BaseClient
+from .pagination import iter_numbered_pages
 
 class GrantsClient(BaseClient):
     """
@@ -8,6 +10,29 @@ class GrantsClient(BaseClient):
 
     def search(self, query: str, page: int = 1, page_size: int = 25) -> dict:
         """Search grants via /search endpoint."""
-        url = f"{self.BASE_URL}query={query}&format=json&page={page}&pageSize={page_size}"
+        # The Grist API takes its parameters in the path, so every value
+        # (including any '/' or '&' in the query) must be percent-encoded.
+        params = {"query": query, "format": "json", "page": page, "pageSize": page_size}
+        url = self.BASE_URL + urlencode(params, quote_via=quote, safe="")
         return self._get(url)
 
+    @staticmethod
+    def _records(data: dict) -> list:
+        records = (data.get("RecordList") or {}).get("Record") or []
+        # A page with a single grant holds a record rather than a list.
+        return [records] if isinstance(records, dict) else records
+
+    def search_iter(self, query: str, page_size: int = 25, max_workers: int = 4):
+        """
+        Yields every grant matching a query.
+
+        The remaining pages are fetched concurrently once the first page has
+        given the total, and grants are yielded in page order.
+        """
+        yield from iter_numbered_pages(
+            lambda page: self.search(query, page, page_size),
+            items=self._records,
+            hit_count=lambda data: int(data.get("HitCount") or 0),
+            max_workers=max_workers
+        )
+
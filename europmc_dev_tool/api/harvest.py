@@ -0,0 +1,197 @@
+import re
+import sqlite3
+from datetime import date, timedelta
+
+from .concurrency import ordered_map, interleave
+
+EARLIEST_DATE = date(1800, 1, 1)
+_NUMERIC_ID = re.compile(r'([A-Za-z]*)([1-9][0-9]*)')
+
+
+def date_range_query(query: str, start: date, end: date) -> str:
+    """Restricts a query to articles first published between ``start`` and ``end`` inclusive."""
+    return f"({query}) AND FIRST_PDATE:[{start.isoformat()} TO {end.isoformat()}]"
+
+
+def undated_query(query: str, start: date, end: date) -> str:
+    """Restricts a query to articles first published outside ``start``..``end`` or without a date."""
+    return f"({query}) NOT FIRST_PDATE:[{start.isoformat()} TO {end.isoformat()}]"
+
+
+class SeenKeys:
+    """
+    Exact set of ``(source, id)`` hit keys that stays compact as it grows.
+
+    Keys whose ID is a number, optionally after a letter prefix such as
+    ``PMC`` or ``PPR``, are packed into one int with their source and
+    prefix; other keys are kept as strings. Once more than
+    ``max_memory_keys`` keys have been added, they are moved to a temporary
+    on-disk SQLite database, which the set uses from then on, so memory
+    stays bounded however large the harvest is.
+    """
+    _SOURCE_BITS = 8
+    _COMMIT_EVERY = 10000
+
+    def __init__(self, max_memory_keys: int = 5000000):
+        self.max_memory_keys = max_memory_keys
+        self._memory = set()
+        self._sources = {}
+        self._db = None
+        self._pending = 0
+
+    def _encode(self, key):
+        source, article_id = key
+        article_id = str(article_id)
+        match = _NUMERIC_ID.fullmatch(article_id)
+        if match:
+            prefix = (source, match.group(1))
+            code = self._sources.get(prefix)
+            if code is None and len(self._sources) < 2 ** self._SOURCE_BITS:
+                code = self._sources[prefix] = len(self._sources)
+            number = int(match.group(2))
+            if code is not None and number < 2 ** (63 - self._SOURCE_BITS):
+                return (number << self._SOURCE_BITS) | code
+        return f"{source}:{article_id}"
+
+    def _spill(self):
+        # An empty name is a private temporary file, deleted on close.
+        self._db = sqlite3.connect('', check_same_thread=False)
+        self._db.execute("CREATE TABLE ids (key INTEGER PRIMARY KEY)")
+        self._db.execute("CREATE TABLE names (key TEXT PRIMARY KEY) WITHOUT ROWID")
+        self._db.executemany("INSERT INTO ids VALUES (?)", ((k,) for k in self._memory if isinstance(k, int)))
+        self._db.executemany("INSERT INTO names VALUES (?)", ((k,) for k in self._memory if isinstance(k, str)))
+        self._db.commit()
+        self._memory = set()
+
+    def add(self, key) -> bool:
+        """Adds ``key`` and returns True if it was not in the set already."""
+        key = self._encode(key)
+        if self._db is None:
+            if key in self._memory:
+                return False
+            self._memory.add(key)
+            if len(self._memory) > self.max_memory_keys:
+                self._spill()
+            return True
+        table = "ids" if isinstance(key, int) else "names"
+        added = self._db.execute(f"INSERT OR IGNORE INTO {table} VALUES (?)", (key,)).rowcount == 1
+        self._pending += 1
+        if self._pending >= self._COMMIT_EVERY:
+            self._db.commit()
+            self._pending = 0
+        return added
+
+    def close(self):
+        """Releases the on-disk database, if any."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+        self._memory = set()
+
+
+class Partition:
+    """A sub-query covering a disjoint part of a harvest."""
+    def __init__(self, query: str, hit_count: int, start: date = None, end: date = None):
+        self.query = query
+        self.hit_count = hit_count
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"Partition(start={self.start!r}, end={self.end!r}, hit_count={self.hit_count!r})"
+
+
+class HarvestPlanner:
+    """
+    Splits a search into publication-date partitions and harvests them in
+    parallel.
+
+    A single ``cursorMark`` stream is sequential. The planner instead asks
+    for the ``hitCount`` of the query restricted to ``FIRST_PDATE`` ranges,
+    bisecting every range with more than ``max_hits`` hits, so each
+    partition can be paged through independently. Hits outside the date
+    range, or without a publication date, form one extra partition, so the
+    partitions together cover the whole query.
+
+    All requests go through the given client, and therefore through its
+    shared rate limiter.
+    """
+    def __init__(self, client, max_hits: int = 100000, start: date = EARLIEST_DATE, end: date = None,
+                 max_workers: int = 4):
+        """
+        Initializes the planner.
+
+        :param client: An :class:`~europmc_dev_tool.api.articles.ArticlesClient`.
+        :param max_hits: Target maximum number of hits per partition. Ranges
+                         of a single day are not split further.
+        :param start: First publication date to partition.
+        :param end: Last publication date to partition; defaults to today.
+        :param max_workers: Number of concurrent requests.
+        """
+        self.client = client
+        self.max_hits = max_hits
+        self.start = start
+        self.end = end or date.today()
+        self.max_workers = max_workers
+
+    def count(self, query: str) -> int:
+        """Returns the number of hits for a query."""
+        return self.client.search(query, page_size=1, result_type="idlist").get("hitCount", 0)
+
+    def plan(self, query: str) -> list:
+        """
+        Returns disjoint partitions covering all hits of ``query``.
+
+        Ranges are counted level by level, with the counts of each level
+        fetched concurrently.
+        """
+        partitions = []
+        ranges = [(self.start, self.end)]
+        while ranges:
+            counts = ordered_map(
+                lambda r: self.count(date_range_query(query, *r)), ranges, max_workers=self.max_workers
+            )
+            next_ranges = []
+            for (start, end), hit_count in zip(ranges, counts):
+                if hit_count == 0:
+                    continue
+                if hit_count > self.max_hits and start < end:
+                    middle = start + timedelta(days=(end - start).days // 2)
+                    next_ranges.append((start, middle))
+                    next_ranges.append((middle + timedelta(days=1), end))
+                else:
+                    partitions.append(Partition(date_range_query(query, start, end), hit_count, start, end))
+            ranges = next_ranges
+        partitions.sort(key=lambda p: p.start)
+
+        remainder = undated_query(query, self.start, self.end)
+        hit_count = self.count(remainder)
+        if hit_count:
+            partitions.append(Partition(remainder, hit_count))
+        return partitions
+
+    def harvest(self, query: str, result_type: str = "lite", partitions: list = None,
+                max_memory_keys: int = 5000000):
+        """
+        Yields every hit of ``query`` once, harvesting partitions concurrently.
+
+        Hits arrive in no particular order. Duplicates are dropped by source
+        and ID across the whole harvest, including articles whose date is
+        corrected during the harvest and so appear in two partitions. The
+        keys seen are held in a :class:`SeenKeys` set, which moves to disk
+        beyond ``max_memory_keys`` keys.
+
+        :param partitions: Partitions from :meth:`plan`; planned if not given.
+        :param max_memory_keys: Number of hit keys kept in memory before
+                                they are moved to a temporary file.
+        """
+        if partitions is None:
+            partitions = self.plan(query)
+        streams = [self.client.search_iter(partition.query, result_type=result_type) for partition in partitions]
+        seen = SeenKeys(max_memory_keys)
+        try:
+            for hit in interleave(streams, max_workers=self.max_workers):
+                if seen.add((hit.get("source"), hit.get("id"))):
+                    yield hit
+        finally:
+            seen.close()
@@ -0,0 +1,371 @@
+import codecs
+import json
+import asyncio
+from collections import deque
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional dependency
+    ijson = None
+
+_SCALAR_EVENTS = ('string', 'number', 'boolean', 'null')
+_END = object()
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """Character buffer over an iterable of ``bytes`` or ``str`` chunks, refilled on demand."""
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, min_chars: int = 1) -> bool:
+        """Appends at least ``min_chars`` characters, unless the input ends. Returns False at the end."""
+        parts = [self.buf[self.pos:]]
+        added = 0
+        for chunk in self._chunks:
+            if isinstance(chunk, bytes):
+                chunk = self._utf8.decode(chunk)
+            parts.append(chunk)
+            added += len(chunk)
+            if added >= min_chars:
+                break
+        else:
+            parts.append(self._utf8.decode(b'', final=True))
+            self.eof = True
+        self.buf = ''.join(parts)
+        self.pos = 0
+        return added > 0
+
+    def peek(self) -> str:
+        """Skips whitespace and returns the next character, or '' at the end."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof or not self.fill():
+                return ''
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at position {self.pos} of the JSON stream")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A number at the end of the buffer may continue in the next chunk.
+                if end < len(self.buf) or self.eof or self.buf[self.pos] not in '-0123456789':
+                    self.pos = end
+                    return value
+            # Grow the buffer geometrically so a large value is not re-scanned once per chunk.
+            self.fill(max(1, len(self.buf) - self.pos))
+
+
+class JSONStream:
+    """
+    Decodes the items of one array in a JSON document as the document arrives.
+
+    ``path`` names the array with dot-separated object keys, e.g.
+    ``resultList.result``; an empty path means the document itself is an
+    array. Iterating yields the items one by one, so only one item is held
+    in memory at a time, however large the document is. Top-level scalar
+    fields such as ``hitCount`` or ``nextCursorMark`` are collected in
+    :attr:`fields` as they are passed; :meth:`get` returns one even before
+    iterating if it precedes the array, as it does in Europe PMC responses.
+
+    If reading the source fails part way, ``reopen`` can supply a fresh
+    copy of the document, from which decoding resumes after the items
+    already produced.
+
+    Uses ``ijson`` if it is installed and an incremental decoder built on
+    the standard ``json`` module otherwise. A stream can be iterated once.
+    """
+    def __init__(self, chunks, path: str = "", close=None, reopen=None):
+        """
+        :param chunks: Iterable of ``bytes`` (UTF-8) or ``str`` pieces of the document.
+        :param path: Dot-separated keys of the array to stream.
+        :param close: Optional callable that releases the source, called once
+                      the document has been read or the stream is closed.
+        :param reopen: Optional callable ``reopen(exc)`` called when reading
+                       the source raises ``exc``. It returns a ``(chunks, close)``
+                       pair for the same document to continue from, or None
+                       to let ``exc`` propagate.
+        """
+        self.path = path
+        self.fields = {}
+        self._close = close
+        self._reopen = reopen
+        self._lookahead = deque()
+        self._produced = 0
+        self._items = self._parse_chunks(chunks)
+
+    def _parse_chunks(self, chunks):
+        parse = self._parse_ijson if ijson is not None else self._parse
+        return parse(chunks)
+
+    def _resume(self, exc) -> bool:
+        """Restarts decoding from a reopened source. Returns False if the source could not be reopened."""
+        self._items.close()
+        if self._close is not None:
+            self._close()
+            self._close = None
+        source = self._reopen(exc)
+        if source is None:
+            return False
+        chunks, self._close = source
+        self._items = self._parse_chunks(chunks)
+        for _ in range(self._produced):
+            next(self._items)
+        return True
+
+    def _parse(self, chunks):
+        reader = _Reader(chunks)
+        if not self.path:
+            if reader.peek() == '[':
+                yield from self._array(reader)
+            else:
+                reader.value()
+            return
+        yield from self._object(reader, self.path.split('.'), top=True)
+
+    def _object(self, reader, path, top):
+        if reader.peek() != '{':
+            reader.value()
+            return
+        reader.pos += 1
+        if reader.peek() == '}':
+            reader.pos += 1
+            return
+        while True:
+            key = reader.value()
+            reader.expect(':')
+            if key == path[0] and len(path) > 1:
+                yield from self._object(reader, path[1:], top=False)
+            elif key == path[0] and reader.peek() == '[':
+                yield from self._array(reader)
+            else:
+                value = reader.value()
+                if top and not isinstance(value, (dict, list)):
+                    self.fields[key] = value
+            char = reader.peek()
+            reader.pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError(f"Expected ',' or '}}' at position {reader.pos - 1} of the JSON stream")
+
+    @staticmethod
+    def _array(reader):
+        reader.expect('[')
+        if reader.peek() == ']':
+            reader.pos += 1
+            return
+        while True:
+            yield reader.value()
+            char = reader.peek()
+            reader.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"Expected ',' or ']' at position {reader.pos - 1} of the JSON stream")
+
+    def _parse_ijson(self, chunks):
+        item_prefix = f"{self.path}.item" if self.path else "item"
+        events = ijson.sendable_list()
+        coro = ijson.parse_coro(events, use_float=True)
+        builder = None
+        depth = 0
+        chunks = iter(chunks)
+        while True:
+            chunk = next(chunks, None)
+            try:
+                if chunk is None:
+                    coro.close()
+                else:
+                    coro.send(chunk.encode('utf8') if isinstance(chunk, str) else chunk)
+            except ijson.JSONError as e:
+                raise ValueError(str(e)) from e
+            for prefix, event, value in events:
+                if builder is not None:
+                    builder.event(event, value)
+                    if event in ('start_map', 'start_array'):
+                        depth += 1
+                    elif event in ('end_map', 'end_array'):
+                        depth -= 1
+                        if depth == 0:
+                            yield builder.value
+                            builder = None
+                elif prefix == item_prefix:
+                    if event in ('start_map', 'start_array'):
+                        builder = ijson.ObjectBuilder()
+                        builder.event(event, value)
+                        depth = 1
+                    else:
+                        yield value
+                elif prefix and '.' not in prefix and event in _SCALAR_EVENTS:
+                    self.fields[prefix] = value
+            del events[:]
+            if chunk is None:
+                return
+
+    def _read_next(self) -> bool:
+        while True:
+            try:
+                self._lookahead.append(next(self._items))
+                self._produced += 1
+                return True
+            except StopIteration:
+                self.close()
+                return False
+            except Exception as e:
+                if self._reopen is None:
+                    raise
+                try:
+                    resumed = self._resume(e)
+                except StopIteration:
+                    # The new copy of the document is shorter than the old one.
+                    self.close()
+                    return False
+                if not resumed:
+                    raise
+
+    def __bool__(self):
+        """True if the array has at least one item. Reads ahead by one item."""
+        return bool(self._lookahead) or self._read_next()
+
+    def get(self, key, default=None):
+        """
+        Returns a top-level scalar field.
+
+        If the field has not been seen before the array, the remaining items
+        are buffered in memory to reach it.
+        """
+        if key not in self.fields and self:
+            while self._read_next():
+                pass
+        return self.fields.get(key, default)
+
+    def __iter__(self):
+        try:
+            while self._lookahead or self._read_next():
+                yield self._lookahead.popleft()
+        finally:
+            self.close()
+
+    def close(self):
+        """Stops decoding and releases the source."""
+        self._items.close()
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+
+class AsyncJSONStream:
+    """
+    Async counterpart of :class:`JSONStream`, over an async iterable of chunks.
+
+    The document is decoded by a :class:`JSONStream` running in the event
+    loop's default executor, which pulls each chunk from the loop as it needs
+    it, so both decoders and ``reopen`` behave exactly as in the synchronous
+    stream. Iterate with ``async for``; :meth:`get` and :meth:`has_items` are
+    coroutines. A stream can be iterated once.
+    """
+    def __init__(self, chunks, path: str = "", close=None, reopen=None):
+        """
+        Must be called from a running event loop.
+
+        :param chunks: Async iterable of ``bytes`` (UTF-8) or ``str`` pieces of the document.
+        :param path: Dot-separated keys of the array to stream.
+        :param close: Optional coroutine function that releases the source.
+        :param reopen: Optional coroutine function ``reopen(exc)`` returning a
+                       ``(chunks, close)`` pair to continue from, or None; see
+                       :class:`JSONStream`.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stream = JSONStream(
+            self._pull(chunks), path, close=self._blocking(close),
+            reopen=self._blocking_reopen(reopen) if reopen is not None else None
+        )
+        self._items = iter(self._stream)
+
+    @property
+    def fields(self) -> dict:
+        return self._stream.fields
+
+    def _wait(self, awaitable):
+        """Runs ``awaitable`` on the event loop from the decoding thread and returns its result."""
+        async def run():
+            return await awaitable
+        return asyncio.run_coroutine_threadsafe(run(), self._loop).result()
+
+    def _pull(self, chunks):
+        chunks = chunks.__aiter__()
+        while True:
+            try:
+                yield self._wait(chunks.__anext__())
+            except StopAsyncIteration:
+                return
+
+    def _blocking(self, close):
+        if close is None:
+            return None
+
+        def blocking():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is self._loop:
+                # Closed from the loop itself, e.g. when the stream is garbage collected.
+                self._loop.create_task(close())
+            else:
+                self._wait(close())
+        return blocking
+
+    def _blocking_reopen(self, reopen):
+        def blocking(exc):
+            source = self._wait(reopen(exc))
+            if source is None:
+                return None
+            chunks, close = source
+            return self._pull(chunks), self._blocking(close)
+        return blocking
+
+    async def _run(self, func, *args):
+        return await self._loop.run_in_executor(None, func, *args)
+
+    async def has_items(self) -> bool:
+        """True if the array has at least one item. Reads ahead by one item."""
+        return await self._run(bool, self._stream)
+
+    async def get(self, key, default=None):
+        """Returns a top-level scalar field; see :meth:`JSONStream.get`."""
+        if key in self._stream.fields:
+            return self._stream.fields[key]
+        return await self._run(self._stream.get, key, default)
+
+    async def __aiter__(self):
+        try:
+            while True:
+                item = await self._run(next, self._items, _END)
+                if item is _END:
+                    return
+                yield item
+        finally:
+            await self.aclose()
+
+    async def aclose(self):
+        """Stops decoding and releases the source."""
+        await self._run(self._stream.close)
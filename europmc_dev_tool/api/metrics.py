@@ -0,0 +1,232 @@
+import os
+import json
+import math
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+
+QUANTILES = (0.5, 0.95, 0.99)
+# Path segments that name an API or a method rather than an endpoint.
+_GENERIC_SEGMENTS = ('rest', 'get')
+
+
+def endpoint_name(url: str) -> str:
+    """
+    Returns the endpoint a request URL belongs to, e.g. ``search`` or ``references``.
+
+    Identifier segments such as ``MED``, ``12345`` or ``PMC12345`` are skipped,
+    so requests for different articles are grouped together.
+    """
+    segments = [s for s in urlsplit(url).path.split('/') if s]
+    for segment in reversed(segments):
+        if any(c.isdigit() for c in segment) or (segment.isupper() and len(segment) <= 5):
+            continue
+        if segment in _GENERIC_SEGMENTS:
+            continue
+        return segment
+    return urlsplit(url).netloc or 'unknown'
+
+
+class LatencyHistogram:
+    """
+    Log-scale histogram of durations in seconds.
+
+    Bucket boundaries grow by :attr:`GROWTH` from :attr:`MIN_SECONDS`, so
+    quantiles are accurate to within a few percent whatever the latency,
+    and memory is bounded by the number of distinct buckets hit.
+    """
+    MIN_SECONDS = 0.001
+    GROWTH = 1.1
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        if seconds <= self.MIN_SECONDS:
+            bucket = 0
+        else:
+            bucket = int(math.log(seconds / self.MIN_SECONDS, self.GROWTH)) + 1
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Returns an estimate of the ``q`` quantile, or None if nothing was recorded."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                if bucket == 0:
+                    return min(self.MIN_SECONDS, self.max)
+                # Geometric midpoint of the bucket.
+                low = self.MIN_SECONDS * self.GROWTH ** (bucket - 1)
+                return min(low * math.sqrt(self.GROWTH), self.max)
+        return self.max
+
+
+class EndpointStats:
+    """Counters for the requests made to one endpoint."""
+    def __init__(self):
+        self.requests = 0
+        self.statuses = Counter()
+        self.retries = 0
+        self.limiter_wait = 0.0
+        self.bytes = 0
+        self.latency = LatencyHistogram()
+
+    def to_dict(self) -> dict:
+        latency = {f"p{round(q * 100)}": self.latency.quantile(q) for q in QUANTILES}
+        latency.update(count=self.latency.count, sum=self.latency.sum, max=self.latency.max)
+        return {
+            "requests": self.requests,
+            "statuses": {str(status): n for status, n in sorted(self.statuses.items(), key=lambda i: str(i[0]))},
+            "retries": self.retries,
+            "limiter_wait_seconds": self.limiter_wait,
+            "bytes": self.bytes,
+            "latency_seconds": latency,
+        }
+
+
+def _label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestMetrics:
+    """
+    Per-endpoint request metrics, shared by any number of clients and threads.
+
+    For every request sent, records the status code (or the exception name
+    for requests that got no response), the latency until the response
+    headers arrived, the time spent waiting for the rate limiter and the
+    number of body bytes received, after content decoding. Streamed bodies
+    are counted as they are read and added when the response is closed.
+    Retries are counted separately. Responses
+    served from the HTTP cache are not requests and are not recorded.
+
+    Comparing latency with limiter waits shows whether a job is bound by the
+    server or by the rate limit.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+
+    def _stats(self, url) -> EndpointStats:
+        name = endpoint_name(url)
+        stats = self.endpoints.get(name)
+        if stats is None:
+            stats = self.endpoints[name] = EndpointStats()
+        return stats
+
+    def record_request(self, url: str, status, seconds: float, limiter_wait: float = 0.0, size: int = 0):
+        """
+        Records one request.
+
+        :param status: The HTTP status code, or a short error name such as ``ConnectionError``.
+        :param seconds: Time until the response headers arrived.
+        :param limiter_wait: Time spent waiting for the rate limiter before sending.
+        :param size: Number of body bytes received; streamed bodies are added
+                     later with :meth:`record_bytes`.
+        """
+        with self._lock:
+            stats = self._stats(url)
+            stats.requests += 1
+            stats.statuses[status] += 1
+            stats.limiter_wait += limiter_wait
+            stats.bytes += size
+            stats.latency.add(seconds)
+
+    def record_bytes(self, url: str, size: int):
+        """Adds the bytes read from a streamed response to ``url``."""
+        with self._lock:
+            self._stats(url).bytes += size
+
+    def record_retry(self, url: str):
+        """Records that a request to ``url`` is being retried."""
+        with self._lock:
+            self._stats(url).retries += 1
+
+    def to_dict(self) -> dict:
+        """Returns the metrics as a JSON-serialisable dictionary keyed by endpoint."""
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in sorted(self.endpoints.items())}
+
+    def to_json(self) -> str:
+        return json.dumps({"endpoints": self.to_dict()}, indent=2)
+
+    def to_prometheus(self, prefix: str = "epmc") -> str:
+        """Returns the metrics in the Prometheus text exposition format, e.g. for a node_exporter textfile."""
+        endpoints = self.to_dict()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = ",".join(f'{k}="{_label(v)}"' for k, v in labels)
+                lines.append(f"{prefix}_{name}{suffix}{{{label_text}}} {value}")
+
+        metric("requests_total", "counter", "HTTP requests sent, by endpoint and status.", [
+            ("", (("endpoint", name), ("status", status)), n)
+            for name, stats in endpoints.items() for status, n in stats["statuses"].items()
+        ])
+        metric("retries_total", "counter", "Requests retried after a transient error.", [
+            ("", (("endpoint", name),), stats["retries"]) for name, stats in endpoints.items()
+        ])
+        metric("rate_limit_wait_seconds_total", "counter", "Time spent waiting for the rate limiter.", [
+            ("", (("endpoint", name),), stats["limiter_wait_seconds"]) for name, stats in endpoints.items()
+        ])
+        metric("response_bytes_total", "counter", "Bytes received in responses.", [
+            ("", (("endpoint", name),), stats["bytes"]) for name, stats in endpoints.items()
+        ])
+        samples = []
+        for name, stats in endpoints.items():
+            latency = stats["latency_seconds"]
+            for q in QUANTILES:
+                value = latency[f"p{round(q * 100)}"]
+                samples.append(("", (("endpoint", name), ("quantile", q)), "NaN" if value is None else value))
+            samples.append(("_sum", (("endpoint", name),), latency["sum"]))
+            samples.append(("_count", (("endpoint", name),), latency["count"]))
+        metric("request_duration_seconds", "summary", "Time until the response headers arrived.", samples)
+        return "\n".join(lines) + "\n"
+
+    def format_table(self) -> str:
+        """Returns a human-readable summary, one line per endpoint."""
+        rows = [("endpoint", "requests", "retries", "statuses", "wait s", "MB", "p50 ms", "p95 ms", "p99 ms")]
+        for name, stats in self.to_dict().items():
+            latency = stats["latency_seconds"]
+            rows.append((
+                name,
+                str(stats["requests"]),
+                str(stats["retries"]),
+                " ".join(f"{status}:{n}" for status, n in stats["statuses"].items()),
+                f"{stats['limiter_wait_seconds']:.1f}",
+                f"{stats['bytes'] / 1e6:.1f}",
+                *("-" if latency[p] is None else f"{latency[p] * 1000:.0f}" for p in ("p50", "p95", "p99")),
+            ))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        return "\n".join(
+            "  ".join(cell.ljust(width) if i == 0 else cell.rjust(width) for i, (cell, width) in enumerate(zip(row, widths)))
+            for row in rows
+        )
+
+    def write(self, path: str, format: str = None):
+        """
+        Writes the metrics to a file, atomically.
+
+        :param format: ``json`` or ``prometheus``. By default, files ending
+                       in ``.prom`` are written in Prometheus format and all
+                       others as JSON.
+        """
+        format = format or ("prometheus" if path.endswith(".prom") else "json")
+        text = self.to_prometheus() if format == "prometheus" else self.to_json()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
@@ -1,4 +1,157 @@
+import io
+import requests
+from lxml import etree
+
 from .client import BaseClient
+from .concurrency import ordered_map
+
+OAI_NS = "http://www.openarchives.org/OAI/2.0/"
+_RECORD = f"{{{OAI_NS}}}record"
+_HEADER = f"{{{OAI_NS}}}header"
+_IDENTIFIER = f"{{{OAI_NS}}}identifier"
+_DATESTAMP = f"{{{OAI_NS}}}datestamp"
+_SET_SPEC = f"{{{OAI_NS}}}setSpec"
+_METADATA = f"{{{OAI_NS}}}metadata"
+_RESPONSE_DATE = f"{{{OAI_NS}}}responseDate"
+_RESUMPTION_TOKEN = f"{{{OAI_NS}}}resumptionToken"
+_ERROR = f"{{{OAI_NS}}}error"
+OAI_IDENTIFIER_PREFIX = "oai:europepmc.org:"
+
+
+def oai_identifier(pmcid: str) -> str:
+    """Returns the OAI identifier of an article, e.g. ``oai:europepmc.org:PMC1234567``."""
+    pmcid = pmcid.strip().upper()
+    if pmcid.startswith(OAI_IDENTIFIER_PREFIX.upper()):
+        pmcid = pmcid[len(OAI_IDENTIFIER_PREFIX):]
+    if not pmcid.startswith("PMC"):
+        pmcid = f"PMC{pmcid}"
+    return f"{OAI_IDENTIFIER_PREFIX}{pmcid}"
+
+
+class OAIError(Exception):
+    """An error reported by the OAI-PMH service, such as ``badResumptionToken``."""
+    def __init__(self, code, message=""):
+        super().__init__(f"{code}: {message}" if message else code)
+        self.code = code
+
+
+class OAIRecord:
+    """
+    A record from a ListRecords or GetRecord response.
+
+    ``xml`` holds the serialised ``<record>`` element, including its header.
+    """
+    __slots__ = ('identifier', 'datestamp', 'sets', 'deleted', 'xml')
+
+    def __init__(self, identifier, datestamp, sets=(), deleted=False, xml=b""):
+        self.identifier = identifier
+        self.datestamp = datestamp
+        self.sets = list(sets)
+        self.deleted = deleted
+        self.xml = xml
+
+    def metadata(self):
+        """Returns the serialised payload of the ``<metadata>`` element, or None for deleted records."""
+        record = etree.fromstring(self.xml)
+        metadata = record.find(_METADATA)
+        if metadata is None or len(metadata) == 0:
+            return None
+        return etree.tostring(metadata[0], encoding="UTF-8")
+
+    def __repr__(self):
+        return f"OAIRecord(identifier={self.identifier!r}, datestamp={self.datestamp!r}, sets={self.sets!r})"
+
+
+def parse_oai_response(source):
+    """
+    Incrementally parses an OAI-PMH response.
+
+    Yields ``('responseDate', str)``, one ``('record', OAIRecord)`` per
+    record and, if present, ``('resumptionToken', str or None)``. Each
+    record element is discarded once it has been yielded, so memory use does
+    not depend on the size of the response. A ``noRecordsMatch`` error is
+    treated as an empty response; other OAI errors raise :class:`OAIError`.
+
+    :param source: A binary file-like object or a path.
+    """
+    events = etree.iterparse(
+        source, events=('end',),
+        tag=(_RECORD, _RESPONSE_DATE, _RESUMPTION_TOKEN, _ERROR),
+        huge_tree=True
+    )
+    for _, element in events:
+        if element.tag == _RECORD:
+            header = element.find(_HEADER)
+            yield 'record', OAIRecord(
+                header.findtext(_IDENTIFIER),
+                header.findtext(_DATESTAMP),
+                [s.text for s in header.findall(_SET_SPEC)],
+                header.get('status') == 'deleted',
+                etree.tostring(element, encoding="UTF-8"),
+            )
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+        elif element.tag == _RESPONSE_DATE:
+            yield 'responseDate', element.text
+        elif element.tag == _RESUMPTION_TOKEN:
+            yield 'resumptionToken', (element.text or '').strip() or None
+        else:
+            code = element.get('code')
+            if code != 'noRecordsMatch':
+                raise OAIError(code, (element.text or '').strip())
+
+
+class RecordHarvester:
+    """
+    Iterates over ListRecords results, following ``resumptionToken``.
+
+    Iterating yields :class:`OAIRecord` objects. :meth:`pages` instead yields
+    one record iterator per response; once a page has been consumed,
+    :attr:`next_token` is the token from which a later harvester can resume,
+    or None if the harvest is complete. :attr:`response_date` is the
+    ``responseDate`` of the first response.
+    """
+    def __init__(self, client, metadata_prefix: str = "oai_dc", from_date: str = None, until: str = None,
+                 set_spec: str = None, resumption_token: str = None):
+        self.client = client
+        self.params = {"verb": "ListRecords", "metadataPrefix": metadata_prefix}
+        if from_date:
+            self.params["from"] = from_date
+        if until:
+            self.params["until"] = until
+        if set_spec:
+            self.params["set"] = set_spec
+        self.next_token = resumption_token
+        self.response_date = None
+
+    def _page(self, params):
+        self.next_token = None
+        with self.client._request(self.client.BASE_URL, params, stream=True) as response:
+            response.raw.decode_content = True
+            for kind, value in parse_oai_response(response.raw):
+                if kind == 'record':
+                    yield value
+                elif kind == 'resumptionToken':
+                    self.next_token = value
+                elif kind == 'responseDate' and self.response_date is None:
+                    self.response_date = value
+
+    def pages(self):
+        """Yields an iterator over the records of each response."""
+        params = self.params
+        if self.next_token:
+            params = {"verb": "ListRecords", "resumptionToken": self.next_token}
+        while True:
+            yield self._page(params)
+            if not self.next_token:
+                return
+            params = {"verb": "ListRecords", "resumptionToken": self.next_token}
+
+    def __iter__(self):
+        for page in self.pages():
+            yield from page
+
 
 class OAIClient(BaseClient):
     """
@@ -18,3 +171,54 @@ class OAIClient(BaseClient):
         
         # OAI-PMH returns XML, so we use _get_text
         return self._get_text(self.BASE_URL, params)
+
+    def iter_records(self, metadata_prefix: str = "oai_dc", from_date: str = None, until: str = None,
+                     set_spec: str = None, resumption_token: str = None) -> RecordHarvester:
+        """
+        Returns a harvester over every record of a ListRecords request.
+
+        Resumption tokens are followed automatically and each response is
+        parsed as it streams in. Pass ``resumption_token`` to resume an
+        interrupted harvest.
+        """
+        return RecordHarvester(self, metadata_prefix, from_date, until, set_spec, resumption_token)
+
+    def get_record(self, identifier: str, metadata_prefix: str = "pmc") -> OAIRecord:
+        """
+        Fetch a single record with GetRecord.
+
+        :param identifier: An OAI identifier or a PMCID.
+        :raises OAIError: If the record does not exist (``idDoesNotExist``) or
+                          cannot be disseminated in ``metadata_prefix``.
+        """
+        params = self._get_record_params(identifier, metadata_prefix)
+        return self._parse_record(self._get_text(self.BASE_URL, params), params["identifier"])
+
+    @staticmethod
+    def _get_record_params(identifier: str, metadata_prefix: str) -> dict:
+        if not identifier.startswith(OAI_IDENTIFIER_PREFIX):
+            identifier = oai_identifier(identifier)
+        return {"verb": "GetRecord", "metadataPrefix": metadata_prefix, "identifier": identifier}
+
+    @staticmethod
+    def _parse_record(xml: str, identifier: str) -> OAIRecord:
+        for kind, value in parse_oai_response(io.BytesIO(xml.encode("utf8"))):
+            if kind == "record":
+                return value
+        raise OAIError("idDoesNotExist", identifier)
+
+    def get_records(self, pmcids, metadata_prefix: str = "pmc", max_workers: int = 4):
+        """
+        Fetch records for many PMCIDs concurrently with GetRecord.
+
+        Requests go through the client's shared rate limiter, and results are
+        yielded in input order as ``(pmcid, record, error)`` triples, where
+        exactly one of ``record`` and ``error`` is None.
+        """
+        def fetch(pmcid):
+            try:
+                return pmcid, self.get_record(pmcid, metadata_prefix), None
+            except (OAIError, requests.RequestException, etree.XMLSyntaxError) as e:
+                return pmcid, None, e
+
+        yield from ordered_map(fetch, pmcids, max_workers=max_workers)
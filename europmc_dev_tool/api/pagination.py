@@ -0,0 +1,101 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from .concurrency import ordered_map
+
+
+class CursorPaginator:
+    """
+    Iterates over cursor-paginated API results.
+
+    The next page is requested in a background thread as soon as the cursor
+    for it is known, so the request overlaps with the caller consuming the
+    current page. At most two pages are held in memory at once, however many
+    results there are.
+
+    Iterating yields individual results; :meth:`pages` yields whole pages.
+    After each page, :attr:`next_cursor` is the cursor from which a later
+    paginator can resume.
+    """
+    def __init__(self, fetch, items, next_cursor, cursor: str = '*', prefetch: bool = True):
+        """
+        Initializes the paginator.
+
+        :param fetch: Callable ``fetch(cursor)`` returning one page.
+        :param items: Callable ``items(page)`` returning the results of a page.
+        :param next_cursor: Callable ``next_cursor(page)`` returning the cursor
+                            of the following page, or None on the last page.
+        :param cursor: The cursor of the first page.
+        :param prefetch: If False, pages are fetched only when needed.
+        """
+        self.fetch = fetch
+        self.items = items
+        self.get_next_cursor = next_cursor
+        self.cursor = cursor
+        self.next_cursor = cursor
+        self.prefetch = prefetch
+
+    def _is_last(self, page, cursor, next_cursor):
+        # Europe PMC returns the same cursor again once the results run out.
+        return not self.items(page) or not next_cursor or next_cursor == cursor
+
+    def pages(self):
+        """Yields pages until the cursor stops advancing."""
+        if not self.prefetch:
+            cursor = self.cursor
+            while cursor is not None:
+                page = self.fetch(cursor)
+                next_cursor = self.get_next_cursor(page)
+                self.cursor = cursor
+                self.next_cursor = None if self._is_last(page, cursor, next_cursor) else next_cursor
+                yield page
+                cursor = self.next_cursor
+            return
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            cursor = self.cursor
+            future = pool.submit(self.fetch, cursor)
+            try:
+                while future is not None:
+                    page = future.result()
+                    next_cursor = self.get_next_cursor(page)
+                    if self._is_last(page, cursor, next_cursor):
+                        next_cursor, future = None, None
+                    else:
+                        future = pool.submit(self.fetch, next_cursor)
+                    self.cursor = cursor
+                    self.next_cursor = next_cursor
+                    yield page
+                    cursor = next_cursor
+            finally:
+                if future is not None:
+                    future.cancel()
+
+    def __iter__(self):
+        for page in self.pages():
+            yield from self.items(page)
+
+
+def iter_numbered_pages(fetch, items, hit_count, first_page: int = 1, max_workers: int = 4):
+    """
+    Yields every result of a page-number paginated API.
+
+    The first page is fetched on its own to learn the total number of hits
+    and the page size the server actually uses; the remaining pages are
+    then fetched concurrently and their results yielded in page order.
+
+    :param fetch: Callable ``fetch(page_number)`` returning one page.
+    :param items: Callable ``items(page)`` returning the results of a page.
+    :param hit_count: Callable ``hit_count(page)`` returning the total number of hits.
+    :param first_page: Number of the first page.
+    :param max_workers: Number of concurrent requests.
+    """
+    first = fetch(first_page)
+    first_items = items(first)
+    yield from first_items
+    if not first_items:
+        return
+    pages = math.ceil(hit_count(first) / len(first_items))
+    remaining = range(first_page + 1, first_page + pages)
+    for page in ordered_map(fetch, remaining, max_workers=max_workers):
+        yield from items(page)
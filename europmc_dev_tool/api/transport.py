@@ -0,0 +1,201 @@
+import io
+import os
+import time
+import threading
+from datetime import timedelta
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+# The encodings urllib3 can decode in this environment: gzip and deflate,
+# plus br and zstd when the brotli and zstandard packages are installed.
+from urllib3.util.request import ACCEPT_ENCODING
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
+
+DEFAULT_POOL_SIZE = 32
+
+# Connection-specific headers are forbidden in HTTP/2 (RFC 9113, 8.2.2).
+HOP_BY_HOP_HEADERS = ('connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade')
+
+_config = {'pool_size': DEFAULT_POOL_SIZE, 'keep_alive': True, 'http2': False}
+_sessions = {}
+_lock = threading.Lock()
+
+
+class HTTPXRawResponse(io.RawIOBase):
+    """
+    File-like body of a streamed ``httpx`` response, used as ``response.raw``.
+
+    Reads return the body with any Content-Encoding already decoded, so
+    ``decode_content`` is accepted for compatibility and ignored.
+    """
+    def __init__(self, result, request=None):
+        super().__init__()
+        self._result = result
+        self._request = request
+        self._chunks = result.iter_bytes()
+        self._buffer = b''
+        self.decode_content = True
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+            except httpx.TransportError as e:
+                raise requests.ConnectionError(e, request=self._request)
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._result.close()
+        super().close()
+
+
+class HTTP2Adapter(BaseAdapter):
+    """
+    Transport adapter that sends ``requests`` traffic through an HTTP/2
+    capable ``httpx.Client``.
+
+    Mounted on a ``requests.Session``, it lets the existing clients
+    multiplex requests over a few HTTP/2 connections without changing their
+    code. With ``stream=True`` the body is read on demand through
+    ``response.raw``, as with the default adapter. Requires ``httpx`` with
+    HTTP/2 support (``pip install httpx[http2]``).
+    """
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, keep_alive: bool = True, client=None):
+        """
+        Initializes the adapter.
+
+        :param pool_size: Maximum number of connections.
+        :param keep_alive: If False, connections are not kept open between requests.
+        :param client: An existing ``httpx.Client`` to use instead of creating one.
+        """
+        super().__init__()
+        if client is None:
+            if httpx is None:
+                raise ImportError("HTTP/2 support requires httpx. Install it with: pip install httpx[http2]")
+            client = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=pool_size,
+                    max_keepalive_connections=pool_size if keep_alive else 0
+                ),
+            )
+        self.client = client
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        outgoing = self.client.build_request(
+            request.method, request.url, headers=dict(request.headers), content=request.body, timeout=timeout
+        )
+        # Both requests and httpx add a Connection header by default.
+        for header in HOP_BY_HOP_HEADERS:
+            outgoing.headers.pop(header, None)
+        start = time.monotonic()
+        try:
+            result = self.client.send(outgoing, stream=True)
+            if not stream:
+                result.read()
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(e, request=request)
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(e, request=request)
+
+        response = requests.Response()
+        response.status_code = result.status_code
+        response.headers = CaseInsensitiveDict(result.headers)
+        if stream:
+            response.raw = HTTPXRawResponse(result, request)
+        else:
+            # httpx has already decoded any Content-Encoding.
+            response._content = result.content
+            response._content_consumed = True
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.reason = result.reason_phrase
+        response.url = str(result.url)
+        response.request = request
+        response.elapsed = timedelta(seconds=time.monotonic() - start)
+        response.connection = self
+        return response
+
+    def close(self):
+        self.client.close()
+
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE, keep_alive: bool = True, http2: bool = False) -> requests.Session:
+    """
+    Creates a session with a tuned connection pool.
+
+    :param pool_size: Maximum number of connections kept per host.
+    :param keep_alive: If False, every request uses a new connection.
+    :param http2: If True, send requests over HTTP/2 using :class:`HTTP2Adapter`.
+    :rtype: requests.Session
+    """
+    session = requests.Session()
+    session.headers.update({
+        'User-Agent': USER_AGENT,
+        'Accept-Encoding': ACCEPT_ENCODING,
+    })
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    if http2:
+        adapter = HTTP2Adapter(pool_size, keep_alive)
+    else:
+        adapter = HTTPAdapter(pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def configure_transport(pool_size: int = None, keep_alive: bool = None, http2: bool = None):
+    """
+    Changes the settings of the shared session.
+
+    The session of the current process is recreated on the next call to
+    :func:`get_session`; clients that already hold a session keep it.
+    """
+    with _lock:
+        if pool_size is not None:
+            _config['pool_size'] = pool_size
+        if keep_alive is not None:
+            _config['keep_alive'] = keep_alive
+        if http2 is not None:
+            _config['http2'] = http2
+        session = _sessions.pop(os.getpid(), None)
+    if session is not None:
+        session.close()
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the session shared by all clients of this process.
+
+    Reusing one session keeps connections (and their TLS sessions) alive
+    across clients and commands. Each process gets its own session, since
+    pooled connections must not be shared across ``fork``.
+    """
+    pid = os.getpid()
+    session = _sessions.get(pid)
+    if session is None:
+        with _lock:
+            session = _sessions.get(pid)
+            if session is None:
+                session = create_session(**_config)
+                _sessions[pid] = session
+    return session
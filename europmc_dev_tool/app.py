@@ -1,10 +1,10 @@
 
 import argparse
 import json
-import requests
 import gzip
 import os
-from .xml_processor import XMLProcessor, ordered_labels
+from .xml_processor import XMLProcessor, ordered_labels, to_serializable
+from .api.transport import get_session
 
 def main():
     parser = argparse.ArgumentParser(description="A tool to extract structured JSON from JATS XML.")
@@ -22,7 +22,7 @@ def main():
     xml_content = ""
     try:
         if args.url:
-            resp = requests.get(args.url, timeout=30)
+            resp = get_session().get(args.url, timeout=30)
             resp.raise_for_status()
             xml_content = resp.text
         else:
@@ -46,10 +46,10 @@ def main():
         if not data_temp:
             raise ValueError("Failed to extract data from the XML.")
 
-        result = processor.process_json(data_temp, ordered_labels)
+        result = processor.process_records(data_temp, ordered_labels)
 
         with open(args.output_file, 'w', encoding='utf8') as f_out:
-            json.dump(result, f_out, indent=2)
+            json.dump(result, f_out, indent=2, default=to_serializable)
         
         print(f"Successfully processed and saved output to {args.output_file}")
 
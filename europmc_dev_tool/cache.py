@@ -0,0 +1,235 @@
+import os
+import gzip
+import json
+import struct
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from . import __version__
+from .jats_processor import MODEL_NAME
+from .section_maps import SECTION_MAPS_VERSION
+from .records import to_serializable
+
+
+class DiskCache:
+    """
+    A size-bounded, on-disk cache for JSON-serialisable values.
+
+    Each entry is stored as a gzip-compressed JSON file, sharded into
+    sub-directories by the first two characters of its key. When the total
+    size of the cache exceeds ``max_size`` bytes, the least recently used
+    entries (by modification time, refreshed on every hit) are evicted.
+
+    The total size is kept in a small state file in the cache directory and
+    updated by every write, so it is shared by every process using the
+    cache and the directory is only walked to rebuild a missing state file
+    or to evict. Updates are serialised by a lock and, where ``fcntl`` is
+    available, an exclusive ``flock`` on the state file, so concurrent
+    threads and processes do not lose each other's changes.
+    """
+    SUFFIX = ".json.gz"
+    SIZE_FILE = ".size"
+    _SIZE = struct.Struct('<q')
+
+    def __init__(self, directory, max_size=None):
+        """
+        Initializes the cache.
+
+        :param directory: Directory in which to store cache entries. It is
+                          created if it does not exist.
+        :type directory: str
+        :param max_size: Maximum total size of the cache in bytes. If None,
+                         the cache is unbounded.
+        :type max_size: int, optional
+        """
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + self.SUFFIX)
+
+    def _entries(self):
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(self.SUFFIX):
+                    yield entry
+
+    def _size_file(self):
+        # Each process opens its own descriptor, as in SharedRateLimiter.
+        if self._pid != os.getpid():
+            self._fd = os.open(os.path.join(self.directory, self.SIZE_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            fd = self._size_file()
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _read_size(self):
+        fd = self._size_file()
+        data = os.pread(fd, self._SIZE.size, 0)
+        if len(data) == self._SIZE.size:
+            return self._SIZE.unpack(data)[0]
+        size = sum(entry.stat().st_size for entry in self._entries())
+        self._write_size(size)
+        return size
+
+    def _write_size(self, size):
+        os.pwrite(self._size_file(), self._SIZE.pack(max(0, size)), 0)
+
+    def _add_size(self, delta):
+        with self._locked():
+            size = self._read_size() + delta
+            self._write_size(size)
+        return size
+
+    def _load_size(self):
+        # Rebuilds a missing state file before an entry changes the size.
+        with self._locked():
+            return self._read_size()
+
+    @property
+    def size(self):
+        """Total size of the cache entries in bytes."""
+        return self._load_size()
+
+    def close(self):
+        """Closes the state file. It is reopened if the cache is used again."""
+        with self._lock:
+            if self._fd is not None and self._pid == os.getpid():
+                os.close(self._fd)
+            self._fd = None
+            self._pid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key, default=None):
+        """Returns the value stored under ``key``, or ``default`` on a miss."""
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf8') as f:
+                value = json.load(f)
+        except (OSError, EOFError, ValueError):
+            return default
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value):
+        """Stores ``value`` under ``key``, evicting old entries if needed."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._load_size()
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        # Write to a temporary file first so concurrent readers never see a
+        # partially written entry.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                f.write(json.dumps(value, separators=(',', ':'), default=to_serializable).encode('utf8'))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        size = self._add_size(os.path.getsize(path) - previous)
+        if self.max_size is not None and size > self.max_size:
+            self.evict()
+
+    def delete(self, key):
+        """Removes the entry stored under ``key``, if any."""
+        path = self._path(key)
+        self._load_size()
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        self._add_size(-size)
+
+    def evict(self, target=None):
+        """
+        Removes least recently used entries until the cache size is at most
+        ``target`` bytes (defaults to 90% of ``max_size``).
+        """
+        if target is None:
+            if self.max_size is None:
+                return
+            target = int(self.max_size * 0.9)
+        with self._locked():
+            entries = []
+            for e in self._entries():
+                try:
+                    stat = e.stat()
+                except OSError:
+                    # Removed by another writer since the directory was listed.
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, e.path))
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+            self._write_size(total)
+
+    def clear(self):
+        """Removes every entry from the cache."""
+        self.evict(target=0)
+
+
+def jats_cache_key(xml_content, sentenciser=True):
+    """
+    Builds the cache key for a JATS to JSON conversion.
+
+    The key combines a hash of the input XML with everything that affects the
+    output: the sentenciser mode, the section maps version, the spaCy model
+    name and the package version.
+
+    :param xml_content: The raw JATS XML.
+    :type xml_content: str
+    :param sentenciser: Whether sentence splitting is enabled.
+    :type sentenciser: bool
+    :return: A hex digest suitable for use as a :class:`DiskCache` key.
+    :rtype: str
+    """
+    if isinstance(xml_content, str):
+        xml_content = xml_content.encode('utf8')
+    config = f"sentenciser={bool(sentenciser)};maps={SECTION_MAPS_VERSION};model={MODEL_NAME};version={__version__}"
+    digest = hashlib.sha256(xml_content)
+    digest.update(b'\0' + config.encode('utf8'))
+    return digest.hexdigest()
@@ -0,0 +1,44 @@
+import os
+import json
+
+
+class Checkpoint:
+    """
+    Small JSON state file for resuming long-running harvests.
+
+    Each :meth:`save` writes the whole state to a temporary file and renames
+    it over the previous one, so an interrupted run leaves either the old or
+    the new state on disk, never a partial file.
+    """
+    def __init__(self, path):
+        """
+        :param path: Path of the checkpoint file.
+        :type path: str
+        """
+        self.path = path
+
+    def load(self, default=None):
+        """Returns the saved state, or ``default`` if there is none."""
+        try:
+            with open(self.path, 'r', encoding='utf8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    def save(self, state):
+        """Atomically replaces the saved state."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf8') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Removes the checkpoint file."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
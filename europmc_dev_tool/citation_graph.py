@@ -0,0 +1,280 @@
+import os
+from array import array
+from collections.abc import Sequence
+
+import requests
+
+from .api.concurrency import ordered_map
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+INDPTR_FILE = "indptr.npy"
+INDICES_FILE = "indices.npy"
+IDS_FILE = "ids.npy"
+ORDER_FILE = "order.npy"
+
+
+def node_key(source, article_id):
+    """Returns the graph key of an article, e.g. ``MED:12345``."""
+    return f"{source.upper()}:{article_id}"
+
+
+class NodeKeys(Sequence):
+    """
+    The keys of a graph's nodes, in node order.
+
+    Keys are stored UTF-8 encoded in a fixed-width NumPy byte array, next to
+    ``order``, the node numbers sorted by key. Looking up a key's node
+    number is a binary search through ``order``, so no dictionary of all
+    keys is built and both arrays can be memory-mapped.
+    """
+    def __init__(self, keys, order):
+        """
+        :param keys: NumPy ``S`` array of encoded keys, in node order.
+        :param order: Node numbers sorted by key.
+        """
+        self.keys = keys
+        self.order = order
+
+    @classmethod
+    def from_list(cls, keys):
+        """Builds the arrays for a list of ``str`` keys."""
+        encoded = np.array([key.encode("utf8") for key in keys], dtype=bytes)
+        if not len(encoded):
+            encoded = np.zeros(0, dtype="S1")
+        return cls(encoded, np.argsort(encoded, kind="stable"))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.keys[i].decode("utf8")
+
+    def index(self, key, *args):
+        """Returns the node number of ``key``; raises ValueError if it is not in the graph."""
+        target = key.encode("utf8")
+        low, high = 0, len(self.order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.keys[self.order[middle]] < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self.order) and self.keys[self.order[low]] == target:
+            return int(self.order[low])
+        raise ValueError(f"{key!r} is not in the graph")
+
+    def __contains__(self, key):
+        try:
+            self.index(key)
+        except ValueError:
+            return False
+        return True
+
+
+class CitationGraph:
+    """
+    A directed citation graph in compressed sparse row (CSR) form.
+
+    Articles are numbered ``0..n-1``; :attr:`ids` is a :class:`NodeKeys`
+    sequence mapping numbers to keys such as ``MED:12345``, and
+    ``ids.index(key)`` maps keys back to numbers. An edge
+    ``a -> b`` means that ``a`` cites ``b``, and the articles cited by node
+    ``i`` are ``indices[indptr[i]:indptr[i + 1]]``. Both arrays are int32
+    (int64 for ``indptr`` on very large graphs), so ten million edges take
+    about 40 MB.
+
+    Requires the optional ``numpy`` dependency.
+    """
+    def __init__(self, ids, indptr, indices):
+        """
+        :param ids: Article keys, in node order.
+        :type ids: NodeKeys or list
+        :param indptr: CSR row pointer array of length ``len(ids) + 1``.
+        :param indices: CSR column index array.
+        """
+        self.ids = ids if isinstance(ids, NodeKeys) else NodeKeys.from_list(ids)
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_edges(cls, ids, sources, targets):
+        """
+        Builds a graph from parallel arrays of edge endpoints.
+
+        Duplicate edges are removed.
+        """
+        if np is None:
+            raise ImportError("The citation graph requires numpy. Install it with: pip install numpy")
+        n = len(ids)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        edges = np.unique(sources * n + targets)
+        sources, targets = np.divmod(edges, n) if n else (edges, edges)
+        index_type = np.int32 if n < 2 ** 31 else np.int64
+        counts = np.bincount(sources, minlength=n)
+        indptr = np.zeros(n + 1, dtype=np.int64 if len(edges) >= 2 ** 31 else np.int32)
+        np.cumsum(counts, out=indptr[1:])
+        return cls(NodeKeys.from_list(list(ids)), indptr, targets.astype(index_type))
+
+    @property
+    def num_nodes(self):
+        return len(self.ids)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    def node(self, key) -> int:
+        """Returns the node number of ``key``; raises KeyError if it is not in the graph."""
+        try:
+            return self.ids.index(key)
+        except ValueError:
+            raise KeyError(key) from None
+
+    def references(self, key):
+        """Returns the keys of the articles cited by ``key``."""
+        i = self.node(key)
+        return [self.ids[j] for j in self.indices[self.indptr[i]:self.indptr[i + 1]]]
+
+    def citations(self, key):
+        """
+        Returns the keys of the articles citing ``key``.
+
+        This scans the edge array; build the transposed graph for repeated
+        queries.
+        """
+        i = self.node(key)
+        rows = np.repeat(np.arange(self.num_nodes), np.diff(self.indptr))
+        return [self.ids[j] for j in rows[self.indices == i]]
+
+    def save(self, directory):
+        """
+        Saves the graph in ``directory`` as ``indptr.npy``, ``indices.npy``,
+        ``ids.npy`` (the keys) and ``order.npy`` (node numbers in key order).
+        """
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, INDPTR_FILE), self.indptr)
+        np.save(os.path.join(directory, INDICES_FILE), self.indices)
+        np.save(os.path.join(directory, IDS_FILE), self.ids.keys)
+        np.save(os.path.join(directory, ORDER_FILE), self.ids.order)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        Loads a graph saved with :meth:`save`.
+
+        With ``mmap``, the arrays, including the keys, are memory-mapped
+        read-only, so loading is immediate whatever the size of the graph and
+        pages are read on demand.
+        """
+        if np is None:
+            raise ImportError("The citation graph requires numpy. Install it with: pip install numpy")
+        mode = "r" if mmap else None
+        indptr = np.load(os.path.join(directory, INDPTR_FILE), mmap_mode=mode)
+        indices = np.load(os.path.join(directory, INDICES_FILE), mmap_mode=mode)
+        keys = np.load(os.path.join(directory, IDS_FILE), mmap_mode=mode)
+        order = np.load(os.path.join(directory, ORDER_FILE), mmap_mode=mode)
+        return cls(NodeKeys(keys, order), indptr, indices)
+
+
+def canonical_seeds(client, seeds):
+    """
+    Returns seeds keyed as the references and citations endpoints report articles.
+
+    Those endpoints give an article's search ``source`` and ``id``, which is
+    ``MED`` and the PMID for any article that has one, so a seed given as a
+    PMCID is looked up first; otherwise it would become a second node for
+    the same article. PMCIDs that cannot be resolved are kept as they are.
+
+    :param client: An :class:`~europmc_dev_tool.api.articles.ArticlesClient`.
+    :param seeds: Iterable of ``(source, article_id)`` pairs.
+    :rtype: list
+    """
+    seeds = list(seeds)
+    pmcids = [article_id for source, article_id in seeds if source == "PMC"]
+    resolved = {}
+    if pmcids:
+        for article_id, result, error in client.resolve_ids(pmcids):
+            if result and result.get("source") and result.get("id"):
+                resolved[article_id] = (result["source"], result["id"])
+    return [resolved.get(article_id, (source, article_id)) if source == "PMC" else (source, article_id)
+            for source, article_id in seeds]
+
+
+def build_citation_graph(client, seeds, depth=1, references=True, citations=True, max_workers=4, on_error=None):
+    """
+    Builds the citation neighbourhood of a set of articles.
+
+    Starting from ``seeds``, references and/or citing articles are fetched
+    for every article of the current level concurrently, and newly found
+    articles form the next level, up to ``depth`` levels. Articles found at
+    the last level are in the graph but are not expanded. Edges are kept in
+    compact integer arrays while crawling and converted to CSR at the end.
+    References without a Europe PMC identifier are dropped. Seeds are first
+    normalised with :func:`canonical_seeds`.
+
+    :param client: An :class:`~europmc_dev_tool.api.articles.ArticlesClient`.
+    :param seeds: Iterable of ``(source, article_id)`` pairs.
+    :param depth: Number of levels to expand.
+    :param on_error: Optional callable ``on_error(key, exc)`` for articles
+                     that could not be fetched; by default they are skipped.
+    :rtype: CitationGraph
+    """
+    ids = []
+    index = {}
+    sources = array("i")
+    targets = array("i")
+
+    def node(source, article_id):
+        key = node_key(source, article_id)
+        i = index.get(key)
+        if i is None:
+            i = index[key] = len(ids)
+            ids.append(key)
+        return i
+
+    def neighbours(key):
+        source, article_id = key.split(":", 1)
+        try:
+            found = []
+            if references:
+                found += [("ref", r) for r in client.get_all_references(source, article_id, max_workers=1)]
+            if citations:
+                found += [("cit", c) for c in client.get_all_citations(source, article_id, max_workers=1)]
+            return key, found
+        except (requests.RequestException, ValueError) as e:
+            if on_error is not None:
+                on_error(key, e)
+            return key, []
+
+    frontier = []
+    for source, article_id in canonical_seeds(client, seeds):
+        before = len(ids)
+        i = node(source, article_id)
+        if i == before:
+            frontier.append(ids[i])
+    for _ in range(depth):
+        next_frontier = []
+        for key, found in ordered_map(neighbours, frontier, max_workers=max_workers):
+            i = index[key]
+            for kind, item in found:
+                if not item.get("id") or not item.get("source"):
+                    continue
+                before = len(ids)
+                j = node(item["source"], item["id"])
+                if j == before:
+                    next_frontier.append(ids[j])
+                if kind == "ref":
+                    sources.append(i)
+                    targets.append(j)
+                else:
+                    sources.append(j)
+                    targets.append(i)
+        frontier = next_frontier
+    return CitationGraph.from_edges(ids, sources, targets)
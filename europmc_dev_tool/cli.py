@@ -1,5 +1,10 @@
 import click
 from .api.articles import ArticlesClient
+from .api.client import RateLimiter, SharedRateLimiter, RetryPolicy
+from .api.cache import ResponseCache, DAY
+from .api.transport import configure_transport, DEFAULT_POOL_SIZE
+from .api.concurrency import SingleFlight
+from .api.metrics import RequestMetrics
 from .commands.articles import articles
 from .commands.grants import grants
 from .commands.annotations import annotations
@@ -7,16 +12,91 @@ from .commands.oai import oai
 from .commands.local import local
 
 
+def parse_cache_ttls(values):
+    """Parses --cache-ttl values into a default TTL and per-endpoint TTLs."""
+    ttl = None
+    ttls = {}
+    for value in values:
+        endpoint, _, seconds = value.rpartition('=')
+        try:
+            seconds = float(seconds)
+        except ValueError:
+            raise click.BadParameter(f"invalid TTL '{value}'", param_hint="--cache-ttl")
+        if endpoint:
+            ttls[endpoint] = seconds
+        else:
+            ttl = seconds
+    return ttl, ttls
+
 
 @click.group()
 @click.option("--email", help="Contact email for API identification.")
 @click.option("--tool", help="Tool name for API identification.")
+@click.option("--rate-limit", default=10.0, type=float, show_default=True, envvar="EPMC_RATE_LIMIT",
+              help="Maximum number of API requests per second.")
+@click.option("--rate-limit-file", type=click.Path(dir_okay=False), envvar="EPMC_RATE_LIMIT_FILE",
+              help="Share the request budget with every process on this host that uses the same file.")
+@click.option("--max-attempts", default=5, type=int, show_default=True,
+              help="Maximum attempts per request for transient errors (connection errors, 5xx, 429).")
+@click.option("--retry-budget", type=int, default=None,
+              help="Maximum number of retries for the whole run. Unlimited by default.")
+@click.option("--http-cache-dir", type=click.Path(file_okay=False), envvar="EPMC_HTTP_CACHE_DIR",
+              help="Cache API responses in this directory and revalidate them when stale.")
+@click.option("--http-cache-max-size", type=float, default=None, metavar="MB",
+              help="Maximum size of the HTTP cache in MB; least recently used responses are evicted. Unbounded by default.")
+@click.option("--cache-ttl", multiple=True, metavar="[ENDPOINT=]SECONDS",
+              help="Time-to-live for cached responses, overall or per endpoint (e.g. search=3600). Repeatable.")
+@click.option("--offline", is_flag=True, default=False,
+              help="Serve API responses only from the HTTP cache; never contact the server.")
+@click.option("--pool-size", default=DEFAULT_POOL_SIZE, type=int, show_default=True,
+              help="Maximum number of pooled HTTP connections per host.")
+@click.option("--keep-alive/--no-keep-alive", default=True, show_default=True,
+              help="Reuse HTTP connections between requests.")
+@click.option("--http2", is_flag=True, default=False,
+              help="Use HTTP/2 (requires httpx[http2]).")
+@click.option("--stats", is_flag=True, default=False,
+              help="Print per-endpoint request counts, retries, rate-limit waits, bytes and latency percentiles on exit.")
+@click.option("--stats-file", type=click.Path(dir_okay=False, writable=True),
+              help="Write request metrics on exit: Prometheus text format if the name ends in .prom, JSON otherwise.")
 @click.pass_context
-def cli(ctx, email, tool):
+def cli(ctx, email, tool, rate_limit, rate_limit_file, max_attempts, retry_budget, http_cache_dir, http_cache_max_size,
+        cache_ttl, offline, pool_size, keep_alive, http2, stats, stats_file):
     """epmc-cli: Command-line interface for Europe PMC."""
     ctx.ensure_object(dict)
+    configure_transport(pool_size=pool_size, keep_alive=keep_alive, http2=http2)
     ctx.obj["email"] = email
     ctx.obj["tool"] = tool
+    if rate_limit_file:
+        ctx.obj["rate_limiter"] = SharedRateLimiter(rate_limit, 1, rate_limit_file)
+    else:
+        ctx.obj["rate_limiter"] = RateLimiter(rate_limit, 1)
+    ctx.obj["retry_policy"] = RetryPolicy(max_attempts=max_attempts, budget=retry_budget)
+    if offline and not http_cache_dir:
+        raise click.UsageError("--offline requires --http-cache-dir.")
+    if http_cache_dir:
+        ttl, ttls = parse_cache_ttls(cache_ttl)
+        max_size = None if http_cache_max_size is None else int(http_cache_max_size * 1024 * 1024)
+        ctx.obj["cache"] = ResponseCache(
+            http_cache_dir, ttl=DAY if ttl is None else ttl, ttls=ttls, offline=offline, max_size=max_size
+        )
+        ctx.call_on_close(ctx.obj["cache"].close)
+    flight = ctx.obj["flight"] = SingleFlight()
+
+    def report_coalesced():
+        if flight.saved:
+            click.echo(f"Coalesced {flight.saved} duplicate concurrent requests.", err=True)
+
+    ctx.call_on_close(report_coalesced)
+    if stats or stats_file:
+        metrics = ctx.obj["metrics"] = RequestMetrics()
+
+        def report_metrics():
+            if stats:
+                click.echo(metrics.format_table(), err=True)
+            if stats_file:
+                metrics.write(stats_file)
+
+        ctx.call_on_close(report_metrics)
     # The client is now instantiated within each command group
     # to ensure the correct client is used for each API.
     pass
@@ -1,6 +1,9 @@
+import os
 import click
 import json
 from ..api.annotations import AnnotationsClient
+from ..checkpoint import Checkpoint
+from .common import make_client, read_ids
 
 @click.group()
 def annotations():
@@ -8,16 +11,43 @@ def annotations():
     pass
 
 @annotations.command('by-id')
-@click.argument("article_ids", nargs=-1, required=True)
+@click.argument("article_ids", nargs=-1)
 @click.option("--provider", help="Filter by annotation provider.")
+@click.option("--input", "input_path", type=click.Path(dir_okay=False, allow_dash=True),
+              help="Read IDs from a file, one per line ('-' for stdin), and write results as JSON Lines.")
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True), default="-",
+              help="With --input, file to write the results to (default: stdout).")
+@click.option("--workers", default=4, show_default=True, help="With --input, number of concurrent requests.")
 @click.pass_context
-def get_by_id(ctx, article_ids, provider):
+def get_by_id(ctx, article_ids, provider, input_path, output, workers):
     """
     Get annotations by article IDs (e.g., PMC:11704132).
+
+    With --input, any number of IDs is looked up in chunks of 8 fetched
+    concurrently, and results are written in input order.
     """
-    client = AnnotationsClient(email=ctx.obj.get("email"), tool=ctx.obj.get("tool"))
-    data = client.get_by_article_ids(list(article_ids), provider)
-    click.echo(json.dumps(data, indent=2))
+    client = make_client(ctx, AnnotationsClient)
+    if input_path is None:
+        if not article_ids:
+            raise click.UsageError("Give article IDs or --input.")
+        data = client.get_by_article_ids(list(article_ids), provider)
+        click.echo(json.dumps(data, indent=2))
+        return
+
+    failed = []
+
+    def on_error(article_id, exc):
+        failed.append(article_id)
+        click.echo(f"Failed to fetch annotations for {article_id}: {exc}", err=True)
+
+    count = 0
+    with click.open_file(output, "w", encoding="utf8") as f:
+        for article in client.get_by_article_ids_bulk(
+            read_ids(input_path), provider, max_workers=workers, on_error=on_error
+        ):
+            f.write(json.dumps(article) + "\n")
+            count += 1
+    click.echo(f"Wrote annotations for {count} articles; {len(failed)} IDs failed.", err=True)
 
 @annotations.command('by-entity')
 @click.argument("entity", required=True)
@@ -27,7 +57,7 @@ def get_by_entity(ctx, entity, provider):
     """
     Find articles that cite a specific entity (e.g., p53).
     """
-    client = AnnotationsClient(email=ctx.obj.get("email"), tool=ctx.obj.get("tool"))
+    client = make_client(ctx, AnnotationsClient)
     data = client.get_by_entity(entity, provider)
     click.echo(json.dumps(data, indent=2))
 
@@ -39,11 +69,71 @@ def get_by_entity(ctx, entity, provider):
 @click.option("--filter", "filter_val", default=1, type=int, help="Filter annotations (0 or 1).")
 @click.option("--page-size", default=4, type=int, help="Number of articles per page (1-8).")
 @click.option("--cursor-mark", default="0.0", help="Cursor for pagination.")
+@click.option("--all", "fetch_all", is_flag=True, default=False,
+              help="Follow nextCursorMark through every page and write articles as JSON Lines.")
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True),
+              help="With --all, file to write the articles to (default: stdout). Required to resume.")
+@click.option("--checkpoint", "checkpoint_path", type=click.Path(dir_okay=False),
+              help="With --all, resume file (default: OUTPUT.checkpoint).")
 @click.pass_context
-def get_by_type(ctx, annotation_type, subtype, section, provider, filter_val, page_size, cursor_mark):
+def get_by_type(ctx, annotation_type, subtype, section, provider, filter_val, page_size, cursor_mark,
+                fetch_all, output, checkpoint_path):
     """
     Get annotations of a specific type, with optional filters.
+
+    With --all and --output, progress is checkpointed after every page, and
+    re-running the same command resumes an interrupted harvest.
     """
-    client = AnnotationsClient(email=ctx.obj.get("email"), tool=ctx.obj.get("tool"))
+    client = make_client(ctx, AnnotationsClient)
+    if fetch_all:
+        harvest_by_type(
+            client, output, checkpoint_path, cursor_mark,
+            annotation_type=annotation_type, subtype=subtype, section=section,
+            provider=provider, filter=filter_val
+        )
+        return
     data = client.get_by_section_and_or_type(annotation_type, subtype, section, provider, filter_val, page_size, cursor_mark)
     click.echo(json.dumps(data, indent=2))
+
+
+def harvest_by_type(client, output, checkpoint_path, cursor_mark, **query):
+    """Writes every page of a by-type query as JSON Lines, checkpointing after each page."""
+    if output is None:
+        for article in client.iter_by_section_and_or_type(cursor_mark=cursor_mark, **query):
+            click.echo(json.dumps(article))
+        return
+
+    checkpoint = Checkpoint(checkpoint_path or f"{output}.checkpoint")
+    state = checkpoint.load()
+    if state and not os.path.exists(output):
+        state = None
+    if state and state.get("query") != query:
+        raise click.UsageError(f"{checkpoint.path} belongs to a different query; remove it to start over.")
+    if state and state.get("cursor") is None:
+        click.echo(f"Harvest already complete: {state['written']} articles in {output}.", err=True)
+        return
+
+    written = 0
+    offset = 0
+    if state:
+        cursor_mark, written, offset = state["cursor"], state["written"], state["offset"]
+        click.echo(f"Resuming after {written} articles.", err=True)
+    paginator = client.paginate_by_section_and_or_type(
+        page_size=AnnotationsClient.MAX_PAGE_SIZE, cursor_mark=cursor_mark, **query
+    )
+    with open(output, "r+" if state else "w", encoding="utf8") as f:
+        # Drop anything written after the last checkpoint.
+        f.seek(offset)
+        f.truncate()
+        for page in paginator.pages():
+            for article in paginator.items(page):
+                f.write(json.dumps(article) + "\n")
+                written += 1
+            f.flush()
+            checkpoint.save({
+                "query": query,
+                "cursor": paginator.next_cursor,
+                "written": written,
+                "offset": f.tell(),
+            })
+    click.echo(f"Wrote {written} articles.", err=True)
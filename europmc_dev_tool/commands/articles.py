@@ -1,6 +1,11 @@
 import click
 import json
-from ..api.articles import ArticlesClient
+from datetime import date
+from ..api.articles import ArticlesClient, split_article_id
+from ..api.harvest import HarvestPlanner, EARLIEST_DATE
+from ..api.fulltext import fetch_fulltext_bulk, STATUS_OK
+from ..citation_graph import build_citation_graph
+from .common import make_client, read_ids
 
 @click.group()
 def articles():
@@ -12,21 +17,73 @@ def articles():
 @click.option("--page", default=1)
 @click.option("--page-size", default=25)
 @click.option("--core/--lite", default=True)
+@click.option("--all", "fetch_all", is_flag=True, default=False,
+              help="Fetch every hit with cursorMark paging and write them as JSON Lines.")
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True), default="-",
+              help="With --all, file to write the hits to (default: stdout).")
 @click.pass_context
-def search(ctx, query, page, page_size, core):
+def search(ctx, query, page, page_size, core, fetch_all, output):
     """Search articles by query."""
-    client = ArticlesClient(email=ctx.obj.get("email"), tool=ctx.obj.get("tool"))
+    client = make_client(ctx, ArticlesClient)
     result_type = "core" if core else "lite"
+    if fetch_all:
+        count = 0
+        with click.open_file(output, "w", encoding="utf8") as f:
+            for hit in client.search_iter(query, result_type=result_type):
+                f.write(json.dumps(hit) + "\n")
+                count += 1
+        click.echo(f"Wrote {count} hits.", err=True)
+        return
     data = client.search(query, page, page_size, result_type)
     click.echo(json.dumps(data, indent=2))
 
+@articles.command()
+@click.argument("query")
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True), default="-",
+              help="File to write the hits to as JSON Lines (default: stdout).")
+@click.option("--max-hits", default=100000, show_default=True,
+              help="Split publication-date ranges until each has at most this many hits.")
+@click.option("--workers", default=4, show_default=True, help="Number of partitions harvested at once.")
+@click.option("--start-date", type=click.DateTime(formats=["%Y-%m-%d"]), default=EARLIEST_DATE.isoformat(),
+              show_default=True, help="First publication date to partition.")
+@click.option("--end-date", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+              help="Last publication date to partition (default: today).")
+@click.option("--core/--lite", default=False)
+@click.option("--plan-only", is_flag=True, default=False, help="Print the partitions without harvesting.")
+@click.pass_context
+def harvest(ctx, query, output, max_hits, workers, start_date, end_date, core, plan_only):
+    """
+    Harvest every hit of a large query in parallel.
+
+    The query is split into disjoint FIRST_PDATE ranges using hitCount, and
+    the ranges are paged through concurrently within the global rate limit.
+    """
+    client = make_client(ctx, ArticlesClient)
+    planner = HarvestPlanner(
+        client, max_hits=max_hits, max_workers=workers,
+        start=start_date.date(), end=end_date.date() if end_date else date.today()
+    )
+    partitions = planner.plan(query)
+    total = sum(partition.hit_count for partition in partitions)
+    click.echo(f"Planned {len(partitions)} partitions covering {total} hits.", err=True)
+    if plan_only:
+        for partition in partitions:
+            click.echo(json.dumps({"query": partition.query, "hitCount": partition.hit_count}))
+        return
+    count = 0
+    with click.open_file(output, "w", encoding="utf8") as f:
+        for hit in planner.harvest(query, result_type="core" if core else "lite", partitions=partitions):
+            f.write(json.dumps(hit) + "\n")
+            count += 1
+    click.echo(f"Wrote {count} hits.", err=True)
+
 @articles.command()
 @click.argument("article_id")
 @click.option("--core/--lite", default=True)
 @click.pass_context
 def get(ctx, article_id, core):
     """Get metadata for an article."""
-    client = ArticlesClient(email=ctx.obj.get("email"), tool=ctx.obj.get("tool"))
+    client = make_client(ctx, ArticlesClient)
     result_type = "core" if core else "lite"
     
     # Determine the source from the article_id
@@ -35,25 +92,135 @@ def get(ctx, article_id, core):
     data = client.get_article(source, article_id, result_type=result_type)
     click.echo(json.dumps(data, indent=2))
 
+@articles.command()
+@click.option("--input", "input_path", type=click.Path(dir_okay=False, allow_dash=True), default="-",
+              help="File with one PMID, PMCID or DOI per line ('-' for stdin).")
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True), default="-",
+              help="File to write one JSON line per ID to (default: stdout).")
+@click.option("--core/--lite", default=False, help="Return core or lite metadata (default: lite).")
+@click.option("--workers", default=4, show_default=True, help="Number of concurrent search requests.")
+@click.pass_context
+def resolve(ctx, input_path, output, core, workers):
+    """
+    Get metadata for many articles with batched search queries.
+
+    Writes one JSON line per input ID, in input order, with the matching
+    search result (including isOpenAccess) or null if it was not found.
+    """
+    client = make_client(ctx, ArticlesClient)
+    result_type = "core" if core else "lite"
+    found = missing = failed = 0
+    with click.open_file(output, "w", encoding="utf8") as f:
+        for article_id, result, error in client.resolve_ids(read_ids(input_path), result_type, max_workers=workers):
+            if error is not None:
+                failed += 1
+                click.echo(f"{article_id}: {error}", err=True)
+            elif result is None:
+                missing += 1
+            else:
+                found += 1
+            f.write(json.dumps({"id": article_id, "result": result}) + "\n")
+    click.echo(f"Resolved {found} IDs; {missing} not found, {failed} failed.", err=True)
+
 @articles.command()
 @click.argument("source")
 @click.argument("article_id")
 @click.option("--page", default=1)
 @click.option("--page-size", default=25)
+@click.option("--all", "fetch_all", is_flag=True, default=False,
+              help="Fetch every page concurrently and write the merged references as JSON Lines.")
 @click.pass_context
-def references(ctx, source, article_id, page, page_size):
+def references(ctx, source, article_id, page, page_size, fetch_all):
     """Get references for an article."""
-    client = ArticlesClient(email=ctx.obj.get("email"), tool=ctx.obj.get("tool"))
+    client = make_client(ctx, ArticlesClient)
     if source.upper() == "PMC":
         article_id = f"PMC{article_id}"
+    if fetch_all:
+        for reference in client.get_all_references(source, article_id):
+            click.echo(json.dumps(reference))
+        return
     data = client.get_references(source, article_id, page, page_size)
     click.echo(json.dumps(data, indent=2))
 
+@articles.command("references-batch")
+@click.option("--input", "input_path", type=click.Path(dir_okay=False, allow_dash=True), default="-",
+              help="File with one article ID per line: SOURCE:ID, a PMCID or a PMID ('-' for stdin).")
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True), default="-",
+              help="File to write one JSON line per article to (default: stdout).")
+@click.option("--workers", default=4, show_default=True, help="Number of articles fetched at once.")
+@click.pass_context
+def references_batch(ctx, input_path, output, workers):
+    """Get all references for many articles."""
+    client = make_client(ctx, ArticlesClient)
+    articles_ids = (split_article_id(i) for i in read_ids(input_path))
+    count = failed = 0
+    with click.open_file(output, "w", encoding="utf8") as f:
+        for source, article_id, refs, error in client.get_references_batch(articles_ids, max_workers=workers):
+            if error is not None:
+                failed += 1
+                click.echo(f"{source}:{article_id}: {error}", err=True)
+                continue
+            f.write(json.dumps({"source": source, "id": article_id, "references": refs}) + "\n")
+            count += 1
+    click.echo(f"Wrote references for {count} articles; {failed} failed.", err=True)
+
+@articles.command("citation-graph")
+@click.argument("output_dir", type=click.Path(file_okay=False))
+@click.option("--input", "input_path", type=click.Path(dir_okay=False, allow_dash=True), default="-",
+              help="File with one seed article ID per line: SOURCE:ID, a PMCID or a PMID ('-' for stdin).")
+@click.option("--depth", default=1, show_default=True, help="Number of levels to expand from the seeds.")
+@click.option("--references/--no-references", default=True, help="Follow the articles each article cites.")
+@click.option("--citations/--no-citations", default=True, help="Follow the articles citing each article.")
+@click.option("--workers", default=4, show_default=True, help="Number of articles fetched at once.")
+@click.pass_context
+def citation_graph(ctx, output_dir, input_path, depth, references, citations, workers):
+    """Build a citation graph around seed articles and save it as NumPy arrays."""
+    client = make_client(ctx, ArticlesClient)
+    seeds = [split_article_id(i) for i in read_ids(input_path)]
+    try:
+        graph = build_citation_graph(
+            client, seeds, depth=depth, references=references, citations=citations, max_workers=workers,
+            on_error=lambda key, e: click.echo(f"{key}: {e}", err=True)
+        )
+    except ImportError as e:
+        click.echo(f"Error: {e}", err=True)
+        return
+    graph.save(output_dir)
+    click.echo(f"Saved {graph.num_nodes} articles and {graph.num_edges} citations to {output_dir}", err=True)
+
 @articles.command()
 @click.argument("article_id")
 @click.pass_context
 def fulltext(ctx, article_id):
     """Download full-text XML for an open-access article."""
-    client = ArticlesClient(email=ctx.obj.get("email"), tool=ctx.obj.get("tool"))
+    client = make_client(ctx, ArticlesClient)
     xml = client.get_fulltext_xml(article_id)
     click.echo(xml)
+
+
+@articles.command("fulltext-bulk")
+@click.argument("output_dir", type=click.Path(file_okay=False))
+@click.option("--input", "input_path", type=click.Path(dir_okay=False, allow_dash=True), default="-",
+              help="File with one PMCID per line ('-' for stdin).")
+@click.option("--workers", default=4, show_default=True, help="Number of concurrent downloads.")
+@click.pass_context
+def fulltext_bulk(ctx, output_dir, input_path, workers):
+    """
+    Download full-text XML for many open-access articles.
+
+    Each article is streamed to OUTPUT_DIR/<PMCID>.xml.gz. Outcomes are
+    logged to OUTPUT_DIR/status.tsv; articles already downloaded or known to
+    have no full text are skipped, so the command can be re-run to resume.
+    """
+    client = make_client(ctx, ArticlesClient)
+    article_ids = (
+        i.upper() if i.upper().startswith("PMC") else f"PMC{i}"
+        for i in read_ids(input_path)
+    )
+    counts = {}
+    for article_id, status in fetch_fulltext_bulk(client, article_ids, output_dir, max_workers=workers):
+        counts[status] = counts.get(status, 0) + 1
+        if status != STATUS_OK:
+            click.echo(f"{article_id}: {status}", err=True)
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    click.echo(f"Done: {summary or 'nothing to fetch'}.", err=True)
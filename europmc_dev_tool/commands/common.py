@@ -0,0 +1,34 @@
+import click
+
+
+def make_client(ctx, client_cls):
+    """
+    Creates an API client configured from the global ``epmc-cli`` options.
+
+    All clients created for one invocation share the same rate limiter,
+    retry policy, HTTP response cache, request coalescing and, with
+    ``--stats``, request metrics.
+    """
+    obj = ctx.obj or {}
+    return client_cls(
+        email=obj.get("email"),
+        tool=obj.get("tool"),
+        rate_limiter=obj.get("rate_limiter"),
+        retry_policy=obj.get("retry_policy"),
+        cache=obj.get("cache"),
+        flight=obj.get("flight"),
+        metrics=obj.get("metrics"),
+    )
+
+
+def read_ids(path):
+    """
+    Yields identifiers from a file, one per line, or from stdin if ``path`` is ``-``.
+
+    Blank lines and lines starting with ``#`` are skipped.
+    """
+    with click.open_file(path, "r", encoding="utf8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
@@ -1,6 +1,7 @@
 import click
 import json
 from ..api.grants import GrantsClient
+from .common import make_client
 
 @click.group()
 def grants():
@@ -11,9 +12,22 @@ def grants():
 @click.argument("query")
 @click.option("--page", default=1)
 @click.option("--page-size", default=25)
+@click.option("--all", "fetch_all", is_flag=True, default=False,
+              help="Fetch every matching grant and write them as JSON Lines.")
+@click.option("--output", "-o", type=click.Path(dir_okay=False, writable=True), default="-",
+              help="With --all, file to write the grants to (default: stdout).")
+@click.option("--workers", default=4, show_default=True, help="With --all, number of concurrent requests.")
 @click.pass_context
-def search(ctx, query, page, page_size):
+def search(ctx, query, page, page_size, fetch_all, output, workers):
     """Search grants by query."""
-    client = GrantsClient(email=ctx.obj.get("email"), tool=ctx.obj.get("tool"))
+    client = make_client(ctx, GrantsClient)
+    if fetch_all:
+        count = 0
+        with click.open_file(output, "w", encoding="utf8") as f:
+            for grant in client.search_iter(query, page_size, max_workers=workers):
+                f.write(json.dumps(grant) + "\n")
+                count += 1
+        click.echo(f"Wrote {count} grants.", err=True)
+        return
     data = client.search(query, page, page_size)
     click.echo(json.dumps(data, indent=2))
@@ -1,11 +1,16 @@
 import click
 import json
+import gzip
 import requests
 import os
 from tqdm import tqdm
 from ..jats_processor import XMLProcessor
 from ..section_maps import ordered_labels
 from ..api.articles import ArticlesClient
+from ..api.transport import get_session
+from ..cache import DiskCache, jats_cache_key
+from ..records import article_records, to_serializable
+from .common import make_client
 
 @click.group()
 def local():
@@ -16,29 +21,36 @@ def local():
 @click.argument('input_path', type=click.STRING)
 @click.argument('output_path', type=click.Path())
 @click.option('--no-sentenciser', is_flag=True, default=False, help="Disable sentence splitting.")
-def jats2json(input_path, output_path, no_sentenciser):
+@click.option('--cache-dir', type=click.Path(file_okay=False), default=None, help="Directory of an on-disk cache of conversion results.")
+@click.option('--cache-max-size', default=1024, type=float, show_default=True, help="Maximum size of the conversion cache in MB.")
+@click.pass_context
+def jats2json(ctx, input_path, output_path, no_sentenciser, cache_dir, cache_max_size):
     """
     Converts a JATS XML file to JSON.
 
     The input can be a local file path, a URL, or a PMCID (e.g., PMC12345).
     The tool will automatically detect the input type.
+
+    With --cache-dir, results are cached on disk keyed by the content of the
+    XML and the converter configuration, so unchanged articles are not
+    re-processed on later runs.
     """
-    processor = XMLProcessor(sentenciser=not no_sentenciser)
     xml_content = None
 
     try:
         if input_path.startswith('http://') or input_path.startswith('https://'):
             click.echo(f"Input identified as URL: {input_path}")
-            response = requests.get(input_path)
+            response = get_session().get(input_path, timeout=30)
             response.raise_for_status()  # Will raise an HTTPError for bad responses (4xx or 5xx)
             xml_content = response.text
         elif os.path.exists(input_path):
             click.echo(f"Input identified as local file: {input_path}")
-            with open(input_path, 'r') as f:
+            open_func = gzip.open if input_path.endswith('.gz') else open
+            with open_func(input_path, 'rt') as f:
                 xml_content = f.read()
         elif input_path.upper().startswith('PMC'):
             click.echo(f"Input identified as PMCID: {input_path}")
-            articles_client = ArticlesClient()
+            articles_client = make_client(ctx, ArticlesClient)
             xml_content = articles_client.get_fulltext_xml(input_path)
             if not xml_content:
                 raise ValueError(f"Could not retrieve XML for PMCID {input_path}. It may not exist or may not have a full-text XML available.")
@@ -62,10 +74,27 @@ def jats2json(input_path, output_path, no_sentenciser):
         click.echo("Failed to retrieve any XML content.", err=True)
         return
 
-    processed_data = processor.process_full_text(xml_content)
-    final_json = processor.process_json(processed_data, ordered_labels)
+    cache = None
+    final_json = None
+    if cache_dir:
+        cache = DiskCache(cache_dir, max_size=int(cache_max_size * 1024 * 1024))
+        cache_key = jats_cache_key(xml_content, sentenciser=not no_sentenciser)
+        final_json = cache.get(cache_key)
+        if final_json is not None:
+            click.echo(f"Using cached conversion for {input_path}")
+
+    if final_json is None:
+        processor = XMLProcessor(sentenciser=not no_sentenciser)
+        processed_data = processor.process_full_text(xml_content)
+        # Sentences stay records until they are written out.
+        final_json = processor.process_records(processed_data, ordered_labels)
+        if cache is not None and final_json:
+            cache.set(cache_key, final_json)
+    if cache is not None:
+        cache.close()
+
     with open(output_path, 'w') as f:
-        json.dump(final_json, f, indent=2)
+        json.dump(final_json, f, indent=2, default=to_serializable)
     click.echo(f"Successfully converted {input_path} to {output_path}")
 
 @local.command(name='extract-accessions-resources')
@@ -74,12 +103,13 @@ def jats2json(input_path, output_path, no_sentenciser):
 @click.option('--offline', is_flag=True, default=False, help="Run in offline mode.")
 def extract_accessions_resources(input_path, output_path, offline):
     """Extracts accession numbers and resources from a JSON file."""
-    from ..spacy_extractor import extract_with_spacy
+    from ..spacy_extractor import extract_records, load_cache, save_cache
     import spacy
     nlp = spacy.load("en_core_sci_sm")
     with open(input_path, 'r') as f:
-        data = json.load(f)
+        data = article_records(json.load(f))
     
+    uri_cache = load_cache()
     all_extractions = []
     total_sentences = sum(len(s) for s in data.get('sections', {}).values())
 
@@ -90,13 +120,13 @@ def extract_accessions_resources(input_path, output_path, offline):
         
         for section, sentences in data.get('sections', {}).items():
             for sentence in sentences:
-                text = sentence.get('text', '')
-                sentence_id = sentence.get('sentence_id')
-                extraction_result = extract_with_spacy(nlp, text, section, sentence_id, offline=offline)
+                extraction_result = extract_records(
+                    nlp, nlp(sentence.text), section, sentence.sentence_id, offline=offline, cache=uri_cache
+                )
                 
                 if extraction_result:
                     for item in extraction_result:
-                        if item['type'] == 'accession':
+                        if item.type == 'accession':
                             accession_pbar.update(1)
                         else:
                             resource_pbar.update(1)
@@ -104,6 +134,90 @@ def extract_accessions_resources(input_path, output_path, offline):
                 
                 sentence_pbar.update(1)
 
+    save_cache(uri_cache)
+    # Extractions are kept as compact records and only turned into
+    # dictionaries as they are written out.
     with open(output_path, 'w') as f:
-        json.dump(all_extractions, f, indent=2)
+        json.dump(all_extractions, f, indent=2, default=to_serializable)
     click.echo(f"\nSuccessfully extracted {len(all_extractions)} total items from {input_path} to {output_path}")
+
+@local.command(name='export-parquet')
+@click.argument('output_dir', type=click.Path(file_okay=False))
+@click.argument('input_paths', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--extract', is_flag=True, default=False, help="Also extract accession numbers and resources into an extractions table.")
+@click.option('--offline', is_flag=True, default=False, help="Skip online validation when extracting.")
+@click.option('--row-group-size', default=100000, type=int, show_default=True, help="Approximate number of rows per Parquet row group.")
+def export_parquet(output_dir, input_paths, extract, offline, row_group_size):
+    """
+    Exports JSON files created by jats2json as Parquet tables.
+
+    Writes a sentences table (article_id, section, sentence_id, text) and,
+    with --extract, an extractions table (article_id, sentence_id, type,
+    name, exact, span_start, span_end, uri) under OUTPUT_DIR.
+    Requires pyarrow.
+    """
+    from ..export import ParquetExporter
+    try:
+        exporter = ParquetExporter(output_dir, row_group_size=row_group_size)
+    except ImportError as e:
+        click.echo(f"Error: {e}", err=True)
+        return
+
+    nlp = None
+    uri_cache = None
+    if extract:
+        from ..spacy_extractor import extract_records, load_cache, save_cache
+        import spacy
+        nlp = spacy.load("en_core_sci_sm")
+        uri_cache = load_cache()
+
+    with exporter, tqdm(total=len(input_paths), desc="Exporting articles", unit=" art") as pbar:
+        for input_path in input_paths:
+            with open(input_path, 'r') as f:
+                data = article_records(json.load(f))
+            extractions = None
+            if extract:
+                extractions = []
+                for section, sentences in data.get('sections', {}).items():
+                    for sentence in sentences:
+                        extractions.extend(extract_records(
+                            nlp, nlp(sentence.text), section, sentence.sentence_id,
+                            offline=offline, cache=uri_cache
+                        ))
+            exporter.add_article(data, extractions)
+            pbar.update(1)
+
+    if uri_cache is not None:
+        save_cache(uri_cache)
+    click.echo(f"Exported {exporter.articles} articles to {output_dir}")
+
+@local.command(name='pack-corpus')
+@click.argument('corpus_path', type=click.Path(dir_okay=False))
+@click.argument('input_paths', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--no-compress', is_flag=True, default=False, help="Store blocks uncompressed.")
+def pack_corpus(corpus_path, input_paths, no_compress):
+    """
+    Packs JSON files created by jats2json into a corpus container.
+
+    Articles are appended to CORPUS_PATH and indexed by PMCID, PMID and DOI
+    in CORPUS_PATH.idx. Existing corpora are appended to.
+    """
+    from ..corpus import CorpusWriter
+    with CorpusWriter(corpus_path, compress=not no_compress) as writer:
+        for input_path in tqdm(input_paths, desc="Packing articles", unit=" art"):
+            with open(input_path, 'r') as f:
+                writer.write(article_records(json.load(f)))
+    click.echo(f"Packed {writer.count} articles into {corpus_path}")
+
+@local.command(name='corpus-get')
+@click.argument('corpus_path', type=click.Path(exists=True, dir_okay=False))
+@click.argument('article_id')
+def corpus_get(corpus_path, article_id):
+    """Prints one article from a corpus container by PMCID, PMID or DOI."""
+    from ..corpus import CorpusReader
+    with CorpusReader(corpus_path) as reader:
+        article = reader.get(article_id)
+    if article is None:
+        click.echo(f"Error: {article_id} not found in {corpus_path}", err=True)
+        return
+    click.echo(json.dumps(article, indent=2))
@@ -1,5 +1,12 @@
+import os
+import re
+import gzip
 import click
-from ..api.oai import OAIClient
+from datetime import date, timedelta
+from ..api.oai import OAIClient, parse_oai_response, oai_identifier, OAI_IDENTIFIER_PREFIX
+from ..checkpoint import Checkpoint
+from ..shards import ShardWriter
+from .common import make_client, read_ids
 
 @click.group()
 def oai():
@@ -12,9 +19,201 @@ def oai():
 @click.option("--from-date", help="Start date for harvesting (YYYY-MM-DD).")
 @click.option("--until", help="End date for harvesting (YYYY-MM-DD).")
 @click.option("--set-spec", help="Set to harvest.")
+@click.option("--output-dir", type=click.Path(file_okay=False),
+              help="Follow resumption tokens and write every record to gzip shards in this directory.")
+@click.option("--records-per-shard", default=10000, show_default=True, help="With --output-dir, records per shard.")
+@click.option("--incremental", is_flag=True, default=False,
+              help="With --output-dir, harvest only what changed since the last run of the same prefix and set.")
+@click.option("--overlap-days", default=1, show_default=True,
+              help="With --incremental, days to re-harvest before the last run to allow for clock skew.")
 @click.pass_context
-def harvest(ctx, verb, metadata_prefix, from_date, until, set_spec):
-    """Harvest metadata via OAI-PMH."""
-    client = OAIClient(email=ctx.obj.get("email"), tool=ctx.obj.get("tool"))
+def harvest(ctx, verb, metadata_prefix, from_date, until, set_spec, output_dir, records_per_shard,
+            incremental, overlap_days):
+    """
+    Harvest metadata via OAI-PMH.
+
+    With --output-dir, all ListRecords pages are harvested and progress is
+    checkpointed after each page, so re-running the same command resumes an
+    interrupted harvest.
+
+    With --incremental, each run goes into a new subdirectory of the output
+    directory and starts from the previous run's responseDate.
+    """
+    client = make_client(ctx, OAIClient)
+    if incremental:
+        if not output_dir:
+            raise click.UsageError("--incremental requires --output-dir.")
+        harvest_incremental(
+            client, output_dir, records_per_shard, overlap_days,
+            metadata_prefix=metadata_prefix, from_date=from_date, until=until, set_spec=set_spec
+        )
+        return
+    if output_dir:
+        harvest_to_shards(
+            client, output_dir, records_per_shard,
+            metadata_prefix=metadata_prefix, from_date=from_date, until=until, set_spec=set_spec
+        )
+        return
     xml = client.harvest(verb, metadata_prefix, from_date, until, set_spec)
     click.echo(xml)
+
+
+@oai.command("get-records")
+@click.argument("output_dir", type=click.Path(file_okay=False))
+@click.option("--input", "input_path", type=click.Path(dir_okay=False, allow_dash=True), default="-",
+              help="File with one PMCID per line ('-' for stdin).")
+@click.option("--metadata-prefix", default="pmc", show_default=True, help="Metadata prefix.")
+@click.option("--workers", default=4, show_default=True, help="Number of concurrent requests.")
+@click.option("--gzip/--no-gzip", "compress", default=True, show_default=True, help="Compress the written files.")
+@click.pass_context
+def get_records(ctx, output_dir, input_path, metadata_prefix, workers, compress):
+    """
+    Fetch OAI records for a list of PMCIDs with GetRecord.
+
+    The <metadata> payload of each record (the JATS article for the pmc
+    prefix) is written to OUTPUT_DIR/<PMCID>.xml or .xml.gz, which
+    `local jats2json` reads directly. Existing files are skipped.
+    """
+    client = make_client(ctx, OAIClient)
+    os.makedirs(output_dir, exist_ok=True)
+    suffix = ".xml.gz" if compress else ".xml"
+
+    def path(pmcid):
+        return os.path.join(output_dir, f"{pmcid}{suffix}")
+
+    pmcids = (oai_identifier(i)[len(OAI_IDENTIFIER_PREFIX):] for i in read_ids(input_path))
+    pending = (pmcid for pmcid in pmcids if not os.path.exists(path(pmcid)))
+    written = failed = 0
+    for pmcid, record, error in client.get_records(pending, metadata_prefix, max_workers=workers):
+        payload = record.metadata() if record is not None else None
+        if payload is None:
+            failed += 1
+            click.echo(f"{pmcid}: {error or 'no metadata (deleted record)'}", err=True)
+            continue
+        part_path = path(pmcid) + ".part"
+        with (gzip.open(part_path, "wb") if compress else open(part_path, "wb")) as f:
+            f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
+            f.write(payload)
+        os.replace(part_path, path(pmcid))
+        written += 1
+    click.echo(f"Wrote {written} records to {output_dir}; {failed} failed.", err=True)
+
+
+def harvest_to_shards(client, output_dir, records_per_shard, skip=None, **query):
+    """
+    Harvests every record of a ListRecords query into rotating gzip shards.
+
+    The resumption token and shard position are checkpointed to
+    ``checkpoint.json`` in ``output_dir`` after each page.
+
+    :param skip: Optional predicate; records for which it returns True are not written.
+    :return: The final checkpoint state.
+    """
+    checkpoint = Checkpoint(os.path.join(output_dir, "checkpoint.json"))
+    state = checkpoint.load()
+    if state and state.get("query") != query:
+        raise click.UsageError(f"{checkpoint.path} belongs to a different harvest; use another --output-dir.")
+    writer = ShardWriter(output_dir, prefix=query["metadata_prefix"], max_records=records_per_shard)
+    if state and state.get("complete"):
+        if "shard" in state:
+            # The run may have stopped after checkpointing its last page but
+            # before completing the shard that page was written to.
+            writer.resume(state["shard"])
+            writer.close()
+        click.echo(f"Harvest already complete: {state['records']} records in {output_dir}.", err=True)
+        return state
+
+    token, records, response_date = None, 0, None
+    if state:
+        writer.resume(state["shard"])
+        token, records, response_date = state["token"], state["records"], state.get("response_date")
+        click.echo(f"Resuming after {records} records.", err=True)
+
+    harvester = client.iter_records(resumption_token=token, **query)
+    with writer:
+        for page in harvester.pages():
+            batch = [record.xml for record in page if skip is None or not skip(record)]
+            writer.write_batch(batch)
+            records += len(batch)
+            response_date = response_date or harvester.response_date
+            state = {
+                "query": query,
+                "token": harvester.next_token,
+                # Saved with the last page, so a run stopped before the end
+                # of this function is not restarted from the beginning.
+                "complete": harvester.next_token is None,
+                "records": records,
+                "response_date": response_date,
+                "shard": writer.state(),
+            }
+            checkpoint.save(state)
+    state = dict(state or {"query": query, "records": records}, complete=True, token=None)
+    checkpoint.save(state)
+    click.echo(f"Harvested {records} records into {output_dir}.", err=True)
+    return state
+
+
+def shard_records(directory):
+    """Yields the records stored in the completed shards of a directory."""
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".xml.gz"):
+            with gzip.open(os.path.join(directory, name)) as f:
+                for kind, record in parse_oai_response(f):
+                    yield record
+
+
+def harvest_incremental(client, output_dir, records_per_shard, overlap_days, **query):
+    """
+    Harvests the records that changed since the previous run.
+
+    ``state.json`` in ``output_dir`` keeps, per metadata prefix and set, the
+    ``responseDate`` of the last complete run (the high-water mark) and the
+    identifiers and datestamps of the records in the overlap window. The
+    next run starts ``overlap_days`` before the high-water mark, and records
+    already harvested with the same datestamp are skipped. An interrupted
+    run is resumed before a new one is started.
+    """
+    state_file = Checkpoint(os.path.join(output_dir, "state.json"))
+    state = state_file.load({})
+    key = f"{query['metadata_prefix']}|{query['set_spec'] or ''}"
+    entry = state.get(key, {})
+
+    run = entry.get("pending_run")
+    if run is None:
+        if entry.get("high_water"):
+            start = date.fromisoformat(entry["high_water"]) - timedelta(days=overlap_days)
+            query["from_date"] = start.isoformat()
+        runs = entry.get("runs", 0) + 1
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", key.rstrip("|"))
+        run = {"directory": f"{name}-{runs:05d}-{date.today():%Y%m%d}", "query": query, "number": runs}
+        entry["pending_run"] = run
+        state[key] = entry
+        state_file.save(state)
+    query = run["query"]
+    click.echo(f"Harvesting {key} from {query['from_date'] or 'the beginning'}.", err=True)
+
+    seen = entry.get("boundary", {})
+    run_dir = os.path.join(output_dir, run["directory"])
+    result = harvest_to_shards(
+        client, run_dir, records_per_shard,
+        skip=lambda record: seen.get(record.identifier) == record.datestamp,
+        **query
+    )
+
+    high_water = (result.get("response_date") or "")[:10] or entry.get("high_water")
+    boundary = {}
+    if high_water:
+        window_start = (date.fromisoformat(high_water) - timedelta(days=overlap_days)).isoformat()
+        # Records skipped as duplicates are not in this run's shards.
+        boundary = {i: d for i, d in seen.items() if d[:10] >= window_start}
+        for record in shard_records(run_dir):
+            if record.datestamp and record.datestamp[:10] >= window_start:
+                boundary[record.identifier] = record.datestamp
+    state[key] = {
+        "high_water": high_water,
+        "boundary": boundary,
+        "last_run": run["directory"],
+        "runs": run["number"],
+    }
+    state_file.save(state)
+    return state[key]
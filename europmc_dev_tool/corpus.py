@@ -0,0 +1,391 @@
+import os
+import mmap
+import zlib
+import json
+import struct
+import hashlib
+from array import array
+from collections import OrderedDict
+
+from .records import to_serializable
+
+MAGIC = b"EPMCCRP1"
+BLOCK_HEADER = struct.Struct('<BI')
+RECORD_HEADER = struct.Struct('<I')
+FLAG_RAW = 0
+FLAG_ZLIB = 1
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"EPMCIDX1"
+INDEX_HEADER = struct.Struct('<8sQ')
+# 64-bit key hash (0 marks an empty slot), block offset, record offset.
+INDEX_ENTRY = struct.Struct('<QQI')
+MIN_INDEX_SLOTS = 8
+INDEXED_ID_TYPES = ('pmcid', 'pmc', 'pmid', 'doi')
+
+
+def normalize_article_id(value, id_type=None):
+    """
+    Normalises an article identifier for use as a corpus index key.
+
+    PMCIDs are upper-cased and given the ``PMC`` prefix, DOIs are lower-cased
+    and PMIDs are left as they are. When ``id_type`` is not given, it is
+    guessed from the value: ``PMC...`` is a PMCID and ``10.`` is a DOI.
+
+    :param value: The identifier.
+    :type value: str
+    :param id_type: The JATS ``pub-id-type`` of the identifier, if known.
+    :type id_type: str, optional
+    :rtype: str
+    """
+    value = value.strip()
+    if id_type is None:
+        if value.upper().startswith('PMC'):
+            id_type = 'pmcid'
+        elif value.startswith('10.'):
+            id_type = 'doi'
+    if id_type in ('pmcid', 'pmc'):
+        value = value.upper()
+        return value if value.startswith('PMC') else f"PMC{value}"
+    if id_type == 'doi':
+        return value.lower()
+    return value
+
+
+def key_hash(key):
+    """Returns the non-zero 64-bit hash of a normalised index key."""
+    digest = hashlib.blake2b(key.encode('utf8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') or 1
+
+
+def write_index(path, hashes, block_offsets, record_offsets):
+    """
+    Writes a corpus index as an open-addressing hash table.
+
+    The table has a power-of-two number of fixed-width slots, at most half
+    full, and is probed linearly from ``hash % slots``, so a lookup reads
+    one or two slots whatever the size of the corpus. When a hash occurs
+    more than once, the last entry wins. The file is replaced atomically.
+
+    :param hashes: Key hashes, as returned by :func:`key_hash`.
+    :param block_offsets: Block offset of each entry.
+    :param record_offsets: Record offset within the block of each entry.
+    """
+    slots = MIN_INDEX_SLOTS
+    while slots < 2 * len(hashes):
+        slots *= 2
+    mask = slots - 1
+    table = bytearray(INDEX_HEADER.size + slots * INDEX_ENTRY.size)
+    INDEX_HEADER.pack_into(table, 0, INDEX_MAGIC, slots)
+    for h, block_offset, record_offset in zip(hashes, block_offsets, record_offsets):
+        slot = h & mask
+        while True:
+            position = INDEX_HEADER.size + slot * INDEX_ENTRY.size
+            (slot_hash,) = struct.unpack_from('<Q', table, position)
+            if slot_hash in (0, h):
+                INDEX_ENTRY.pack_into(table, position, h, block_offset, record_offset)
+                break
+            slot = (slot + 1) & mask
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(table)
+    os.replace(tmp_path, path)
+
+
+def read_index(path):
+    """Returns the occupied entries of an index as ``(hashes, block_offsets, record_offsets)`` arrays."""
+    hashes, block_offsets, record_offsets = array('Q'), array('Q'), array('I')
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, slots = INDEX_HEADER.unpack_from(data, 0)
+    if magic != INDEX_MAGIC:
+        raise ValueError(f"{path} is not a corpus index file.")
+    for h, block_offset, record_offset in INDEX_ENTRY.iter_unpack(data[INDEX_HEADER.size:]):
+        if h:
+            hashes.append(h)
+            block_offsets.append(block_offset)
+            record_offsets.append(record_offset)
+    return hashes, block_offsets, record_offsets
+
+
+def scan_index(path):
+    """
+    Rebuilds the index entries of a corpus file by reading every block.
+
+    Used when the corpus exists but its index file does not.
+
+    :return: ``(hashes, block_offsets, record_offsets)`` arrays, as from :func:`read_index`.
+    """
+    hashes, block_offsets, record_offsets = array('Q'), array('Q'), array('I')
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an article corpus file.")
+        while True:
+            block_offset = f.tell()
+            header = f.read(BLOCK_HEADER.size)
+            if not header:
+                break
+            if len(header) < BLOCK_HEADER.size:
+                raise ValueError(f"{path} ends with a truncated block at offset {block_offset}.")
+            flag, length = BLOCK_HEADER.unpack(header)
+            block = f.read(length)
+            if len(block) < length:
+                raise ValueError(f"{path} ends with a truncated block at offset {block_offset}.")
+            if flag == FLAG_ZLIB:
+                block = zlib.decompress(block)
+            position = 0
+            while position < len(block):
+                (record_length,) = RECORD_HEADER.unpack_from(block, position)
+                start = position + RECORD_HEADER.size
+                for key in article_keys(json.loads(block[start:start + record_length])):
+                    hashes.append(key_hash(key))
+                    block_offsets.append(block_offset)
+                    record_offsets.append(position)
+                position = start + record_length
+    return hashes, block_offsets, record_offsets
+
+
+def article_keys(article):
+    """Returns the normalised index keys for an article's ``article_ids``."""
+    keys = []
+    for id_type, value in (article.get('article_ids') or {}).items():
+        if id_type in INDEXED_ID_TYPES and value:
+            key = normalize_article_id(value, id_type)
+            if key not in keys:
+                keys.append(key)
+    return keys
+
+
+class CorpusWriter:
+    """
+    Appends processed articles to a single-file corpus container.
+
+    Records are serialised as compact JSON and prefixed with their length.
+    Records are grouped into blocks of roughly ``block_size`` bytes, and each
+    block is optionally zlib-compressed as a unit. A sidecar index file
+    (``<path>.idx``) maps every PMCID, PMID and DOI found in the article's
+    ``article_ids`` to the block offset and the record offset within the
+    block, so that :class:`CorpusReader` can look articles up directly.
+    The index is a binary hash table (see :func:`write_index`) and is
+    written when the writer is closed; until then, entries are kept in
+    compact arrays.
+
+    Opening an existing corpus appends to it. If its index file is missing,
+    the index is rebuilt from the corpus blocks.
+    """
+    def __init__(self, path, compress=True, block_size=1 << 20):
+        """
+        Initializes the writer.
+
+        :param path: Path of the corpus file.
+        :type path: str
+        :param compress: If True, compress each block with zlib.
+        :type compress: bool
+        :param block_size: Target uncompressed block size in bytes.
+        :type block_size: int
+        """
+        self.path = path
+        self.compress = compress
+        self.block_size = block_size
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        index_path = path + INDEX_SUFFIX
+        if not exists:
+            self._hashes, self._block_offsets, self._record_offsets = array('Q'), array('Q'), array('I')
+        elif os.path.exists(index_path):
+            self._hashes, self._block_offsets, self._record_offsets = read_index(index_path)
+        else:
+            self._hashes, self._block_offsets, self._record_offsets = scan_index(path)
+        self._data = open(path, 'ab')
+        if not exists:
+            self._data.write(MAGIC)
+        self._block = bytearray()
+        self._pending = []
+        self.count = 0
+
+    def write(self, article):
+        """
+        Appends one article record.
+
+        :param article: An article as returned by ``XMLProcessor.process_json``
+                        or ``XMLProcessor.process_records``.
+        :type article: dict
+        """
+        payload = json.dumps(
+            article, separators=(',', ':'), ensure_ascii=False, default=to_serializable
+        ).encode('utf8')
+        self._pending.append((article_keys(article), len(self._block)))
+        self._block += RECORD_HEADER.pack(len(payload))
+        self._block += payload
+        self.count += 1
+        if len(self._block) >= self.block_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the current block and its index entries to disk."""
+        if not self._block:
+            return
+        block_offset = self._data.tell()
+        if self.compress:
+            payload, flag = zlib.compress(bytes(self._block), 6), FLAG_ZLIB
+        else:
+            payload, flag = bytes(self._block), FLAG_RAW
+        self._data.write(BLOCK_HEADER.pack(flag, len(payload)))
+        self._data.write(payload)
+        self._data.flush()
+        for keys, record_offset in self._pending:
+            for key in keys:
+                self._hashes.append(key_hash(key))
+                self._block_offsets.append(block_offset)
+                self._record_offsets.append(record_offset)
+        self._block = bytearray()
+        self._pending = []
+
+    def close(self):
+        """Flushes the last block, closes the corpus file and writes the index."""
+        self.flush()
+        self._data.close()
+        write_index(self.path + INDEX_SUFFIX, self._hashes, self._block_offsets, self._record_offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CorpusReader:
+    """
+    Reads a corpus container written by :class:`CorpusWriter`.
+
+    The corpus file and its index are memory-mapped, so opening a corpus
+    reads nothing up front. Looking up an article by PMCID, PMID or DOI
+    probes one or two slots of the index hash table and reads a single
+    block, and iteration walks the blocks sequentially. Recently used
+    decompressed blocks are kept in a small cache.
+    """
+    def __init__(self, path, block_cache_size=8):
+        """
+        Opens a corpus.
+
+        :param path: Path of the corpus file.
+        :type path: str
+        :param block_cache_size: Number of decompressed blocks to keep in memory.
+        :type block_cache_size: int
+        """
+        self.path = path
+        self._blocks = OrderedDict()
+        self._block_cache_size = block_cache_size
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an article corpus file.")
+        self._index_file = open(path + INDEX_SUFFIX, 'rb')
+        self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._slots = INDEX_HEADER.unpack_from(self._index, 0)
+        if magic != INDEX_MAGIC:
+            self.close()
+            raise ValueError(f"{path}{INDEX_SUFFIX} is not a corpus index file.")
+
+    def _locate(self, key):
+        """Returns the ``(block_offset, record_offset)`` indexed under ``key``, or None."""
+        h = key_hash(key)
+        mask = self._slots - 1
+        slot = h & mask
+        while True:
+            slot_hash, block_offset, record_offset = INDEX_ENTRY.unpack_from(
+                self._index, INDEX_HEADER.size + slot * INDEX_ENTRY.size
+            )
+            if slot_hash == 0:
+                return None
+            if slot_hash == h:
+                return block_offset, record_offset
+            slot = (slot + 1) & mask
+
+    def _block(self, offset):
+        block = self._blocks.get(offset)
+        if block is not None:
+            self._blocks.move_to_end(offset)
+            return block
+        flag, length = BLOCK_HEADER.unpack_from(self._mmap, offset)
+        start = offset + BLOCK_HEADER.size
+        if flag == FLAG_ZLIB:
+            block = zlib.decompress(self._mmap[start:start + length])
+        else:
+            block = memoryview(self._mmap)[start:start + length]
+        self._blocks[offset] = block
+        if len(self._blocks) > self._block_cache_size:
+            self._blocks.popitem(last=False)
+        return block
+
+    @staticmethod
+    def _record(block, offset):
+        (length,) = RECORD_HEADER.unpack_from(block, offset)
+        start = offset + RECORD_HEADER.size
+        return json.loads(bytes(block[start:start + length]))
+
+    def __contains__(self, article_id):
+        return self.get(article_id) is not None
+
+    def __getitem__(self, article_id):
+        key = normalize_article_id(article_id)
+        location = self._locate(key)
+        if location is None:
+            raise KeyError(article_id)
+        block_offset, record_offset = location
+        article = self._record(self._block(block_offset), record_offset)
+        # The index stores hashes only, so check the record really has the key.
+        if key not in article_keys(article):
+            raise KeyError(article_id)
+        return article
+
+    def get(self, article_id, default=None):
+        """Returns the article with the given PMCID, PMID or DOI, or ``default``."""
+        try:
+            return self[article_id]
+        except KeyError:
+            return default
+
+    def keys(self):
+        """Yields the indexed identifiers, reading the whole corpus."""
+        for article in self:
+            yield from article_keys(article)
+
+    def __iter__(self):
+        offset = len(MAGIC)
+        end = len(self._mmap)
+        while offset < end:
+            flag, length = BLOCK_HEADER.unpack_from(self._mmap, offset)
+            start = offset + BLOCK_HEADER.size
+            if flag == FLAG_ZLIB:
+                block = zlib.decompress(self._mmap[start:start + length])
+            else:
+                block = memoryview(self._mmap)[start:start + length]
+            position = 0
+            while position < len(block):
+                (record_length,) = RECORD_HEADER.unpack_from(block, position)
+                yield self._record(block, position)
+                position += RECORD_HEADER.size + record_length
+            offset = start + length
+
+    def close(self):
+        """Closes the memory map and the underlying file."""
+        self._blocks.clear()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A block is still referenced by a live iterator; the map is
+                # released when that reference goes away.
+                pass
+            self._mmap = None
+        self._file.close()
+        if getattr(self, '_index', None) is not None:
+            self._index.close()
+            self._index = None
+            self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
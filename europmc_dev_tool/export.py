@@ -0,0 +1,221 @@
+import os
+
+from .records import Sentence, Extraction
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+ID_PREFERENCE = ('pmcid', 'pmc', 'pmid', 'doi')
+
+
+def primary_article_id(article_ids):
+    """
+    Picks a single identifier for an article from its ``article_ids``.
+
+    PMCIDs are preferred (normalised to the ``PMC`` prefix), then PMIDs,
+    then DOIs, then whatever identifier comes first.
+
+    :param article_ids: The ``article_ids`` mapping produced by the JATS processor.
+    :type article_ids: dict
+    :return: The chosen identifier, or None if there are none.
+    :rtype: str or None
+    """
+    if not article_ids:
+        return None
+    for id_type in ID_PREFERENCE:
+        value = article_ids.get(id_type)
+        if value:
+            if id_type in ('pmcid', 'pmc') and not value.upper().startswith('PMC'):
+                value = f"PMC{value}"
+            return value
+    return next(iter(article_ids.values()))
+
+
+def _schemas():
+    string_dict = pa.dictionary(pa.int32(), pa.string())
+    sentences = pa.schema([
+        ('article_id', string_dict),
+        ('section', string_dict),
+        ('sentence_id', pa.int32()),
+        ('text', pa.string()),
+    ])
+    extractions = pa.schema([
+        ('article_id', string_dict),
+        ('sentence_id', pa.int32()),
+        ('type', string_dict),
+        ('name', string_dict),
+        ('exact', pa.string()),
+        ('span_start', pa.int32()),
+        ('span_end', pa.int32()),
+        ('uri', pa.string()),
+    ])
+    return sentences, extractions
+
+
+class _TableWriter:
+    """
+    Buffers rows for one table and writes them as Parquet row groups,
+    starting a new part file every ``rows_per_file`` rows.
+    """
+    def __init__(self, directory, schema, dictionary_columns, row_group_size, rows_per_file, compression):
+        self.directory = directory
+        self.schema = schema
+        self.dictionary_columns = dictionary_columns
+        self.row_group_size = row_group_size
+        self.rows_per_file = rows_per_file
+        self.compression = compression
+        self.columns = {name: [] for name in schema.names}
+        self.buffered = 0
+        self.rows_in_file = 0
+        self.part = 0
+        self.writer = None
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, row):
+        for name, column in self.columns.items():
+            column.append(row[name])
+        self.buffered += 1
+
+    def maybe_flush(self):
+        # Only called between articles, so an article never straddles files.
+        if self.buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffered:
+            return
+        if self.writer is None:
+            path = os.path.join(self.directory, f"part-{self.part:05d}.parquet")
+            self.writer = pq.ParquetWriter(
+                path, self.schema,
+                compression=self.compression,
+                use_dictionary=self.dictionary_columns
+            )
+        arrays = [
+            pa.array(self.columns[field.name], type=field.type)
+            for field in self.schema
+        ]
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+        self.rows_in_file += self.buffered
+        self.columns = {name: [] for name in self.schema.names}
+        self.buffered = 0
+        if self.rows_in_file >= self.rows_per_file:
+            self._close_file()
+
+    def _close_file(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.part += 1
+            self.rows_in_file = 0
+
+    def close(self):
+        self.flush()
+        self._close_file()
+
+
+class ParquetExporter:
+    """
+    Exports processed articles as columnar Parquet tables.
+
+    Sentences are written to ``<output_dir>/sentences`` with the columns
+    ``article_id``, ``section``, ``sentence_id`` and ``text``. Extractions
+    are written to ``<output_dir>/extractions`` with the columns
+    ``article_id``, ``sentence_id``, ``type``, ``name``, ``exact``,
+    ``span_start``, ``span_end`` and ``uri``. Low-cardinality columns
+    (article ID, section, type and label) are dictionary encoded.
+
+    Rows are grouped by article and an article never spans two part files,
+    so both tables can be read column-selectively and filtered by
+    ``article_id`` using row-group statistics, e.g.
+    ``pyarrow.parquet.read_table(path, columns=['article_id', 'text'])``.
+
+    Requires the optional ``pyarrow`` dependency.
+    """
+    def __init__(self, output_dir, row_group_size=100000, rows_per_file=5000000, compression='zstd'):
+        """
+        Initializes the exporter.
+
+        :param output_dir: Directory in which to create the tables.
+        :type output_dir: str
+        :param row_group_size: Approximate number of rows per row group.
+        :type row_group_size: int
+        :param rows_per_file: Approximate number of rows per part file.
+        :type rows_per_file: int
+        :param compression: Parquet compression codec.
+        :type compression: str
+        """
+        if pa is None:
+            raise ImportError(
+                "Parquet export requires pyarrow. Install it with: pip install pyarrow"
+            )
+        sentences_schema, extractions_schema = _schemas()
+        self.output_dir = output_dir
+        self.sentences = _TableWriter(
+            os.path.join(output_dir, 'sentences'), sentences_schema,
+            ['article_id', 'section'], row_group_size, rows_per_file, compression
+        )
+        self.extractions = _TableWriter(
+            os.path.join(output_dir, 'extractions'), extractions_schema,
+            ['article_id', 'type', 'name'], row_group_size, rows_per_file, compression
+        )
+        self.articles = 0
+
+    def add_article(self, article, extractions=None):
+        """
+        Adds one article to the export.
+
+        :param article: An article as returned by ``XMLProcessor.process_json``
+                        or ``XMLProcessor.process_records``.
+        :type article: dict
+        :param extractions: Extractions for the article, either
+                            :class:`~europmc_dev_tool.records.Extraction`
+                            records or dictionaries as returned by
+                            ``extract_with_spacy``.
+        :type extractions: list, optional
+        """
+        article_id = primary_article_id(article.get('article_ids'))
+        for section, sentences in article.get('sections', {}).items():
+            for sentence in sentences:
+                if isinstance(sentence, Sentence):
+                    sentence_id, text = sentence.sentence_id, sentence.text
+                else:
+                    sentence_id = sentence.get('sentence_id', sentence.get('sent_id'))
+                    text = sentence.get('text', '')
+                self.sentences.append({
+                    'article_id': article_id,
+                    'section': section,
+                    'sentence_id': sentence_id,
+                    'text': text,
+                })
+        for item in extractions or []:
+            if not isinstance(item, Extraction):
+                item = Extraction.from_dict(item)
+            self.extractions.append({
+                'article_id': article_id,
+                'sentence_id': item.sentence_id,
+                'type': item.type,
+                'name': item.name,
+                'exact': item.exact,
+                'span_start': item.start,
+                'span_end': item.end,
+                'uri': item.uri,
+            })
+        self.sentences.maybe_flush()
+        self.extractions.maybe_flush()
+        self.articles += 1
+
+    def close(self):
+        """Flushes buffered rows and closes the part files."""
+        self.sentences.close()
+        self.extractions.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
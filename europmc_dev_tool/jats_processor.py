@@ -2,10 +2,13 @@ import re
 from bs4 import BeautifulSoup
 from rapidfuzz import process as fuzz_process, fuzz
 import spacy
+from .records import Sentence
 from .section_maps import (
     ordered_labels, compiled_titleMapsBody, compiled_titleExactMapsBody, compiled_titleMapsBack
 )
 
+MODEL_NAME = "en_core_sci_sm"
+
 class XMLProcessor:
     """
     A class to process JATS XML content.
@@ -23,7 +26,7 @@ class XMLProcessor:
         """
         self.sentenciser = sentenciser
         if sentenciser:
-            self.nlp = spacy.load("en_core_sci_sm", disable=["parser", "ner", "tagger", "lemmatizer"])
+            self.nlp = spacy.load(MODEL_NAME, disable=["parser", "ner", "tagger", "lemmatizer"])
             self.nlp.add_pipe("sentencizer")
         else:
             self.nlp = None
@@ -154,6 +157,25 @@ class XMLProcessor:
             return None
 
     def process_json(self, data, ordered_labels):
+        """
+        Orders and labels the sections of a processed article and numbers
+        its sentences, returning plain JSON-serialisable dictionaries.
+        """
+        combined_data = self.process_records(data, ordered_labels)
+        if combined_data:
+            combined_data['sections'] = {
+                label: [sentence.to_dict() for sentence in sentences]
+                for label, sentences in combined_data['sections'].items()
+            }
+        return combined_data
+
+    def process_records(self, data, ordered_labels):
+        """
+        Same as :meth:`process_json`, but each section holds
+        :class:`~europmc_dev_tool.records.Sentence` records instead of
+        dictionaries. Use this when holding many articles in memory and
+        convert at serialisation time.
+        """
         if not data or 'sections' not in data:
             return {}
         if not ordered_labels:
@@ -181,7 +203,7 @@ class XMLProcessor:
         result_json = {}
         for section_key in sections:
             label = mapped_labels.get(section_key, section_key)
-            texts = [{"text": text} for text in sections[section_key]]
+            texts = [Sentence(text, section=label) for text in sections[section_key]]
             if label in result_json:
                 result_json[label].extend(texts)
             else:
@@ -196,7 +218,7 @@ class XMLProcessor:
         sent_id = 1
         for section in ordered_json.values():
             for entry in section:
-                entry["sentence_id"] = sent_id
+                entry.sentence_id = sent_id
                 sent_id += 1
 
         combined_data = {
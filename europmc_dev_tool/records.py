@@ -0,0 +1,130 @@
+import sys
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Sentence:
+    """
+    A sentence (or paragraph) of a processed article.
+
+    Uses ``__slots__`` so that large batches of sentences do not carry a
+    per-instance dictionary, and interns the section label so that every
+    sentence of a section shares one string.
+    """
+    __slots__ = ('text', 'sentence_id', 'section')
+
+    def __init__(self, text, sentence_id=None, section=None):
+        self.text = text
+        self.sentence_id = sentence_id
+        self.section = _intern(section)
+
+    def to_dict(self, id_key="sentence_id"):
+        """
+        Returns the sentence in the JSON output format.
+
+        :param id_key: Name of the sentence number field; ``jatx2json`` output uses ``sent_id``.
+        """
+        return {"text": self.text, id_key: self.sentence_id}
+
+    @classmethod
+    def from_dict(cls, data, section=None):
+        """Builds a sentence from its JSON output format."""
+        return cls(data.get('text', ''), data.get('sentence_id', data.get('sent_id')), section)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sentence):
+            return NotImplemented
+        return (self.text, self.sentence_id, self.section) == (other.text, other.sentence_id, other.section)
+
+    def __repr__(self):
+        return f"Sentence(text={self.text!r}, sentence_id={self.sentence_id!r}, section={self.section!r})"
+
+
+class Extraction:
+    """
+    An accession number or resource extracted from a sentence.
+
+    The type, label and section are interned, and the URI is stored as its
+    shared normalisation prefix and only joined with the matched text when
+    requested, so extractions of the same kind share their strings.
+    """
+    __slots__ = ('type', 'name', 'exact', 'start', 'end', 'uri_base', 'uri_with_exact', 'sentence_id', 'section')
+
+    def __init__(self, type, name, exact, start, end, uri_base='', uri_with_exact=False, sentence_id=None, section=None):
+        self.type = _intern(type)
+        self.name = _intern(name)
+        self.exact = exact
+        self.start = start
+        self.end = end
+        self.uri_base = _intern(uri_base)
+        self.uri_with_exact = uri_with_exact
+        self.sentence_id = sentence_id
+        self.section = _intern(section)
+
+    @property
+    def uri(self):
+        if self.uri_with_exact and self.uri_base:
+            return f"{self.uri_base}/{self.exact}"
+        return self.uri_base
+
+    @property
+    def span(self):
+        return [self.start, self.end]
+
+    def to_dict(self):
+        """Returns the extraction in the JSON output format of ``extract_with_spacy``."""
+        return {
+            'type': self.type,
+            'name': self.name,
+            'exact': self.exact,
+            'span': [self.start, self.end],
+            'uri': self.uri,
+            'sentence_id': self.sentence_id
+        }
+
+    @classmethod
+    def from_dict(cls, data, section=None):
+        """Builds an extraction from its JSON output format."""
+        span = data.get('span') or [None, None]
+        return cls(
+            data.get('type'), data.get('name'), data.get('exact'), span[0], span[1],
+            uri_base=data.get('uri') or '', sentence_id=data.get('sentence_id'), section=section
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, Extraction):
+            return NotImplemented
+        return self.to_dict() == other.to_dict() and self.section == other.section
+
+    def __repr__(self):
+        return f"Extraction(type={self.type!r}, name={self.name!r}, exact={self.exact!r}, span={self.span!r})"
+
+
+def article_records(article):
+    """
+    Replaces the sentence dictionaries of a loaded ``jats2json`` article with
+    :class:`Sentence` records, in place, and returns the article.
+
+    Lets commands that read JSON files hold articles in the same compact form
+    as ``XMLProcessor.process_records`` produces.
+    """
+    sections = (article or {}).get('sections') or {}
+    for section, sentences in sections.items():
+        sections[section] = [
+            s if isinstance(s, Sentence) else Sentence.from_dict(s, section) for s in sentences
+        ]
+    return article
+
+
+def to_serializable(obj):
+    """
+    ``default`` hook for ``json.dump`` that serialises records as dicts.
+
+    Lets callers keep records all the way to the writer:
+    ``json.dump(data, f, default=to_serializable)``.
+    """
+    if isinstance(obj, (Sentence, Extraction)):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -1,4 +1,6 @@
 import re
+import json
+import hashlib
 
 ordered_labels = [
     'TITLE', 'ABSTRACT', 'INTRO', 'METHODS', 'RESULTS', 'DISCUSS', 'CONCL', 'CASE',
@@ -111,3 +113,14 @@ compiled_titleMapsBack = {
     key: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
     for key, patterns in titleMapsBack.items()
 }
+
+
+def _maps_version():
+    """Short digest of the section maps, so edits to them invalidate cached conversions."""
+    payload = json.dumps(
+        [ordered_labels, titleMapsBody, titleExactMapsBody, titleMapsBack],
+        sort_keys=True
+    )
+    return hashlib.sha1(payload.encode('utf8')).hexdigest()[:12]
+
+SECTION_MAPS_VERSION = _maps_version()
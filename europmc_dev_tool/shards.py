@@ -0,0 +1,115 @@
+import os
+import gzip
+
+XML_HEADER = b'<?xml version="1.0" encoding="UTF-8"?>\n'
+
+
+class ShardWriter:
+    """
+    Writes XML documents to rotating gzip-compressed shard files.
+
+    Each shard is ``<prefix>-<n>.xml.gz`` and holds up to ``max_records``
+    documents wrapped in a ``<root>`` element. The shard being written has a
+    ``.part`` suffix until it is complete.
+
+    Documents are written in batches, and each batch is appended as a
+    separate gzip member (which ``gzip`` readers treat as one stream). After
+    a batch, :meth:`state` describes the end of the written data, and
+    :meth:`resume` reopens a shard at that point, dropping anything written
+    after it. Together with a checkpoint this makes an interrupted harvest
+    resume without duplicate or partial records.
+    """
+    def __init__(self, directory, prefix='records', max_records=10000, root='records'):
+        """
+        Initializes the writer.
+
+        :param directory: Directory for the shards.
+        :type directory: str
+        :param prefix: File name prefix of the shards.
+        :type prefix: str
+        :param max_records: Number of documents after which a shard is closed.
+        :type max_records: int
+        :param root: Name of the element wrapping the documents of a shard.
+        :type root: str
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.max_records = max_records
+        self.root = root
+        self.index = 0
+        self.count = 0
+        self._file = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, index):
+        """Returns the path of a completed shard."""
+        return os.path.join(self.directory, f"{self.prefix}-{index:05d}.xml.gz")
+
+    def _open(self):
+        self._file = open(self.path(self.index) + '.part', 'wb')
+        self._file.write(gzip.compress(XML_HEADER + f'<{self.root}>\n'.encode('utf8')))
+        self.count = 0
+
+    def write_batch(self, documents):
+        """
+        Appends a batch of serialised XML documents.
+
+        :param documents: Iterable of ``bytes``.
+        """
+        if self._file is None:
+            self._open()
+        data = bytearray()
+        for document in documents:
+            data += document
+            data += b'\n'
+            self.count += 1
+        if data:
+            self._file.write(gzip.compress(bytes(data)))
+        self._file.flush()
+        if self.count >= self.max_records:
+            self._finish()
+
+    def _finish(self):
+        if self._file is None:
+            return
+        self._file.write(gzip.compress(f'</{self.root}>\n'.encode('utf8')))
+        self._file.close()
+        self._file = None
+        os.replace(self.path(self.index) + '.part', self.path(self.index))
+        self.index += 1
+        self.count = 0
+
+    def state(self):
+        """Returns the position after the last batch, for :meth:`resume`."""
+        offset = self._file.tell() if self._file is not None else None
+        return {'index': self.index, 'count': self.count, 'offset': offset}
+
+    def resume(self, state):
+        """Continues writing at a position returned by :meth:`state`."""
+        self.index = state['index']
+        self.count = state['count']
+        part_path = self.path(self.index) + '.part'
+        if state['offset'] is None or not os.path.exists(part_path):
+            # The shard had not been started yet.
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            self.count = 0
+            return
+        self._file = open(part_path, 'r+b')
+        self._file.truncate(state['offset'])
+        self._file.seek(state['offset'])
+
+    def close(self):
+        """Completes the current shard."""
+        self._finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._file is not None:
+            # Leave the .part shard in place for resume().
+            self._file.close()
+            self._file = None
@@ -4,7 +4,11 @@ import requests
 import json
 import os
 from spacy.matcher import Matcher
+from spacy.tokens import Span
 from .spacy_patterns import patterns as spacy_patterns, blacklist
+from .records import Extraction
+from .api.transport import get_session
+from .api.concurrency import SingleFlight
 
 CACHE_FILE = '/home/stirunag/work/github/epmc-tools/uri_cache.json'
 
@@ -21,6 +25,51 @@ def save_cache(cache):
     with open(CACHE_FILE, 'w') as f:
         json.dump(cache, f, indent=2)
 
+# Threads validating the same URI at the same time share one request;
+# ``validation_flight.saved`` counts the requests saved.
+validation_flight = SingleFlight()
+
+def _check_uri(uri):
+    try:
+        # Closing the streamed response returns the connection to the
+        # shared pool.
+        with get_session().get(uri, timeout=5, stream=True) as response:
+            return response.status_code < 400
+    except requests.exceptions.RequestException:
+        return False
+
+def validate_uri(uri):
+    """
+    Returns True if ``uri`` resolves without an HTTP error.
+
+    Concurrent checks of the same URI are coalesced into one request.
+    """
+    return validation_flight.do(uri, _check_uri, uri)
+
+_matchers = {}
+pattern_map = {p["label"]: p for p in spacy_patterns}
+
+def get_matcher(nlp):
+    """
+    Returns a Matcher loaded with the accession and resource patterns.
+
+    The Matcher is built once per vocabulary and reused on later calls, since
+    compiling the full pattern list is far more expensive than matching a
+    single sentence.
+
+    :param nlp: The loaded spaCy language model.
+    :return: The shared Matcher for ``nlp.vocab``.
+    :rtype: spacy.matcher.Matcher
+    """
+    entry = _matchers.get(id(nlp.vocab))
+    if entry is None or entry[0] is not nlp.vocab:
+        matcher = Matcher(nlp.vocab)
+        for p in spacy_patterns:
+            matcher.add(p["label"], [[{"TEXT": {"REGEX": p["pattern"]}}]], greedy='LONGEST')
+        entry = (nlp.vocab, matcher)
+        _matchers[id(nlp.vocab)] = entry
+    return entry[1]
+
 def extract_with_spacy(nlp, text, section="unknown", sentence_id=None, offline=False):
     """
     Extracts accession numbers and resources from text using spaCy's Matcher.
@@ -44,23 +93,72 @@ def extract_with_spacy(nlp, text, section="unknown", sentence_id=None, offline=F
     :rtype: list
     """
     doc = nlp(text)
-    matcher = Matcher(nlp.vocab)
     cache = load_cache()
+    extracted_data = extract_from_span(nlp, doc, section, sentence_id, offline=offline, cache=cache)
+    save_cache(cache)
+    return extracted_data
 
-    # Create a map from rule ID to pattern details for easy lookup
-    pattern_map = {p["label"]: p for p in spacy_patterns}
+def extract_from_span(nlp, sent, section="unknown", sentence_id=None, offline=False, cache=None):
+    """
+    Extracts accession numbers and resources from an already tokenised text.
 
-    for p in spacy_patterns:
-        matcher.add(p["label"], [[{"TEXT": {"REGEX": p["pattern"]}}]], greedy='LONGEST')
+    This is the same as :func:`extract_with_spacy`, but runs the Matcher
+    directly on an existing ``Doc`` or sentence ``Span`` instead of
+    tokenising the text again. For a ``Span``, character offsets are relative
+    to the stripped sentence text.
 
-    matches = matcher(doc)
+    :param nlp: The spaCy language model that produced ``sent``.
+    :param sent: The tokenised sentence.
+    :type sent: spacy.tokens.Doc or spacy.tokens.Span
+    :param section: The document section where the text originates,
+                    defaults to "unknown".
+    :type section: str, optional
+    :param sentence_id: The ID of the sentence, defaults to None.
+    :type sentence_id: str, optional
+    :param offline: If True, skips online validation.
+    :type offline: bool, optional
+    :param cache: URI validation cache to read and update. If None, the
+                  cache file is loaded and saved around this call.
+    :type cache: dict, optional
+    :return: A list of dictionaries, one per extracted item. Pipelines that
+             keep extractions for many sentences should use
+             :func:`extract_records` and convert at serialisation time.
+    :rtype: list
+    """
+    return [record.to_dict() for record in extract_records(nlp, sent, section, sentence_id, offline=offline, cache=cache)]
+
+def extract_records(nlp, sent, section="unknown", sentence_id=None, offline=False, cache=None):
+    """
+    Extracts accession numbers and resources as :class:`~europmc_dev_tool.records.Extraction` records.
+
+    Takes the same arguments as :func:`extract_from_span`. Batch pipelines
+    should keep the records and only convert them to dictionaries when
+    serialising (see :func:`~europmc_dev_tool.records.to_serializable`).
+
+    :return: A list of extraction records.
+    :rtype: list
+    """
+    own_cache = cache is None
+    if own_cache:
+        cache = load_cache()
+
+    if isinstance(sent, Span):
+        text = sent.text.strip()
+        offset = sent.start_char + len(sent.text) - len(sent.text.lstrip())
+    else:
+        text = sent.text
+        offset = 0
+
+    matches = get_matcher(nlp)(sent)
     extracted_data = []
     found_spans = set()
 
     for match_id, start, end in matches:
-        span = doc[start:end]
+        span = sent[start:end]
+        span_start = span.start_char - offset
+        span_end = span.end_char - offset
         
-        if (span.start_char, span.end_char) in found_spans:
+        if (span_start, span_end) in found_spans:
             continue
         
         rule_id = nlp.vocab.strings[match_id]
@@ -102,30 +200,24 @@ def extract_with_spacy(nlp, text, section="unknown", sentence_id=None, offline=F
                     elif uri in cache and not cache[uri]:
                         is_valid = False
                     else:
-                        try:
-                            response = requests.get(uri, timeout=5, stream=True)
-                            if response.status_code >= 400:
-                                cache[uri] = False
-                                is_valid = False
-                            else:
-                                cache[uri] = True
-                        except requests.exceptions.RequestException:
-                            cache[uri] = False
-                            is_valid = False
+                        is_valid = cache[uri] = validate_uri(uri)
             
             if is_valid:
-                if uri and not pattern_details["label"].startswith('R') and (offline or validation_method not in ['online', 'onlineWithContext']):
-                    uri = f"{uri}/{span.text}"
-
-                found_spans.add((span.start_char, span.end_char))
-                extracted_data.append({
-                    'type': extraction_type,
-                    'name': pattern_details["label"],
-                    'exact': span.text,
-                    'span': [span.start_char, span.end_char],
-                    'uri': uri,
-                    'sentence_id': sentence_id
-                })
+                found_spans.add((span_start, span_end))
+                # Accession URIs are the normalisation URL plus the matched
+                # text; the record keeps them apart so the URL is shared.
+                extracted_data.append(Extraction(
+                    extraction_type,
+                    pattern_details["label"],
+                    span.text,
+                    span_start,
+                    span_end,
+                    uri_base=pattern_details.get('normalization_url', ''),
+                    uri_with_exact=not pattern_details["label"].startswith('R'),
+                    sentence_id=sentence_id,
+                    section=section
+                ))
             
-    save_cache(cache)
-    return extracted_data
\ No newline at end of file
+    if own_cache:
+        save_cache(cache)
+    return extracted_data
@@ -4,10 +4,23 @@ from bs4 import BeautifulSoup
 import spacy
 from rapidfuzz import process, fuzz
 # JATX2JSON Package
-from .spacy_extractor import extract_with_spacy
+from .spacy_extractor import extract_records, load_cache, save_cache
+from .records import Sentence, to_serializable as record_to_serializable
 
 import os
 
+
+
+def to_serializable(obj):
+    """
+    ``default`` hook for ``json.dump`` of :meth:`XMLProcessor.process_records`
+    output. Same as :func:`europmc_dev_tool.records.to_serializable`, but
+    sentences keep this format's ``sent_id`` key.
+    """
+    if isinstance(obj, Sentence):
+        return obj.to_dict(id_key="sent_id")
+    return record_to_serializable(obj)
+
 # ---------- Section Maps (put these at the top for clarity) ----------
 
 ordered_labels = [
@@ -69,6 +82,25 @@ class XMLProcessor:
         else:
             return [text.strip()] if text.strip() else []
 
+    def sentence_spans(self, text):
+        """
+        Splits text into sentence Spans, keeping the tokens for later reuse.
+
+        Used in accessions mode so the matcher runs on the tokens produced by
+        sentence splitting instead of tokenising every sentence a second time.
+        """
+        if not text.strip():
+            return []
+        doc = self.nlp(text)
+        if not self.sentenciser:
+            return [doc[:]]
+        return [sent for sent in doc.sents if sent.text.strip()]
+
+    def split_units(self, text):
+        if self.accessions:
+            return self.sentence_spans(text)
+        return self.sentence_split(text)
+
     def createSecTag(self, soup, secType):
         secTag = soup.new_tag('SecTag')
         secTag['type'] = secType
@@ -82,7 +114,7 @@ class XMLProcessor:
             if gch.name in ['title', 'label', 'td', 'th']:
                 text = gch.get_text(separator=' ', strip=True)
                 if text:
-                    sents = self.sentence_split(text)
+                    sents = self.split_units(text)
                     sentences.extend(sents)
             elif gch.name == 'p':
                 sub_sentences = self.process_p_tag(gch)
@@ -90,7 +122,7 @@ class XMLProcessor:
             else:
                 text = gch.get_text(separator=' ', strip=True)
                 if text:
-                    sents = self.sentence_split(text)
+                    sents = self.split_units(text)
                     sentences.extend(sents)
         return sentences
 
@@ -98,7 +130,7 @@ class XMLProcessor:
         sentences = []
         text = gch.get_text(separator=' ', strip=True)
         if text:
-            sents = self.sentence_split(text)
+            sents = self.split_units(text)
             sentences.extend(sents)
         return sentences
 
@@ -175,6 +207,7 @@ class XMLProcessor:
             self.section_tag(xml_soup)
             sections = {}
             all_extracted_accessions = []
+            uri_cache = load_cache() if self.accessions else None
             
             for sec_tag in xml_soup.find_all('SecTag'):
                 sec_type = sec_tag.get('type', 'unknown').strip().upper()
@@ -187,17 +220,25 @@ class XMLProcessor:
                 content_units = self.call_sentence_tags(sec_tag)
                 
                 if self.accessions:
+                    # content_units are sentence Spans here; match on their
+                    # tokens directly rather than re-tokenising the text.
                     sentences_with_accessions = []
-                    for sentence in content_units:
-                        extraction_result = extract_with_spacy(self.nlp, sentence, section=sec_type)
+                    seen_sentences = set()
+                    for sent in content_units:
+                        extraction_result = extract_records(self.nlp, sent, section=sec_type, cache=uri_cache)
                         if extraction_result:
                             all_extracted_accessions.append(extraction_result)
-                            if sentence not in sentences_with_accessions:
+                            sentence = sent.text.strip()
+                            if sentence not in seen_sentences:
+                                seen_sentences.add(sentence)
                                 sentences_with_accessions.append(sentence)
                     sections[sec_type].extend(sentences_with_accessions)
                 else:
                     sections[sec_type].extend(content_units)
 
+            if uri_cache is not None:
+                save_cache(uri_cache)
+
             # Filter out sections that ended up with no sentences
             sections = {k: v for k, v in sections.items() if v}
             
@@ -214,6 +255,31 @@ class XMLProcessor:
             return None
 
     def process_json(self, data, ordered_labels):
+        """
+        Orders and labels the sections of a processed article and numbers
+        its sentences, returning plain JSON-serialisable dictionaries.
+        """
+        combined_data = self.process_records(data, ordered_labels)
+        if combined_data:
+            combined_data['sections'] = {
+                label: [sentence.to_dict(id_key="sent_id") for sentence in sentences]
+                for label, sentences in combined_data['sections'].items()
+            }
+            combined_data['accession_numbers'] = [
+                [record.to_dict() for record in group]
+                for group in combined_data['accession_numbers']
+            ]
+        return combined_data
+
+    def process_records(self, data, ordered_labels):
+        """
+        Same as :meth:`process_json`, but each section holds
+        :class:`~europmc_dev_tool.records.Sentence` records and
+        ``accession_numbers`` holds
+        :class:`~europmc_dev_tool.records.Extraction` records. Serialise the
+        result with ``json.dump(..., default=to_serializable)``, using this
+        module's :func:`to_serializable`.
+        """
         if not data or 'sections' not in data:
             return {}
         if not ordered_labels:
@@ -241,7 +307,7 @@ class XMLProcessor:
         result_json = {}
         for section_key in sections:
             label = mapped_labels.get(section_key, section_key)
-            texts = [{"text": text} for text in sections[section_key]]
+            texts = [Sentence(text, section=label) for text in sections[section_key]]
             if label in result_json:
                 result_json[label].extend(texts)
             else:
@@ -256,7 +322,7 @@ class XMLProcessor:
         sent_id = 1
         for section in ordered_json.values():
             for entry in section:
-                entry["sent_id"] = sent_id
+                entry.sentence_id = sent_id
                 sent_id += 1
 
         combined_data = {
@@ -265,6 +331,6 @@ class XMLProcessor:
             'article_type': data['article_type'],
             'keywords': data['keywords'],
             'sections': ordered_json,
-            'accession_numbers': data.get('accession_numbers', {})
+            'accession_numbers': data.get('accession_numbers', [])
         }
         return combined_data
@@ -15,6 +15,13 @@ setup(
         "requests",
         "click",
     ],
+    extras_require={
+        "parquet": ["pyarrow"],
+        "async": ["httpx"],
+        "http2": ["httpx[http2]"],
+        "graph": ["numpy"],
+        "stream": ["ijson"],
+    },
     entry_points={
         "console_scripts": [
             "jatx2json=europmc_dev_tool.app:main",
@@ -0,0 +1,49 @@
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from europmc_dev_tool.api.annotations import AnnotationsClient
+
+
+def fake_lookup(article_ids, provider=None):
+    if "MED:bad" in article_ids:
+        raise requests.HTTPError("400 Client Error")
+    # The API does not promise to keep the order of the requested IDs.
+    return [
+        {"source": i.split(":")[0], "extId": ("PMC" if i.startswith("PMC") else "") + i.split(":")[1], "annotations": []}
+        for i in reversed(article_ids)
+    ]
+
+
+class TestAnnotationsBulk(unittest.TestCase):
+
+    @patch.object(AnnotationsClient, 'get_by_article_ids', side_effect=fake_lookup)
+    def test_chunks_in_input_order(self, mock_lookup):
+        """Tests that IDs are chunked and results come back in input order."""
+        ids = [f"PMC:{n}" for n in range(20)] + ["MED:123"]
+        results = list(AnnotationsClient().get_by_article_ids_bulk(iter(ids), chunk_size=8))
+        self.assertEqual([r["extId"] for r in results], [f"PMC{n}" for n in range(20)] + ["123"])
+        self.assertEqual(mock_lookup.call_count, 3)
+        self.assertTrue(all(len(c.args[0]) <= 8 for c in mock_lookup.call_args_list))
+
+    @patch.object(AnnotationsClient, 'get_by_article_ids', side_effect=fake_lookup)
+    def test_failed_chunk_retried_per_id(self, mock_lookup):
+        """Tests that a failing chunk is retried ID by ID and only the bad ID is reported."""
+        failed = []
+        ids = ["MED:1", "MED:bad", "MED:3"]
+        results = list(AnnotationsClient().get_by_article_ids_bulk(
+            ids, on_error=lambda article_id, exc: failed.append(article_id)
+        ))
+        self.assertEqual([r["extId"] for r in results], ["1", "3"])
+        self.assertEqual(failed, ["MED:bad"])
+
+    @patch.object(AnnotationsClient, 'get_by_article_ids', side_effect=fake_lookup)
+    def test_failure_raised_without_handler(self, mock_lookup):
+        """Tests that an ID that keeps failing is raised when there is no on_error."""
+        with self.assertRaises(requests.HTTPError):
+            list(AnnotationsClient().get_by_article_ids_bulk(["MED:bad"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
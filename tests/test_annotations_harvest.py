@@ -0,0 +1,62 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from europmc_dev_tool.cli import cli
+from europmc_dev_tool.api.annotations import AnnotationsClient
+from europmc_dev_tool.api.jsonstream import JSONStream
+from europmc_dev_tool.checkpoint import Checkpoint
+
+PAGES = {
+    "0.0": {"nextCursorMark": "a", "articles": [{"pmcid": "PMC1"}, {"pmcid": "PMC2"}]},
+    "a": {"nextCursorMark": "b", "articles": [{"pmcid": "PMC3"}]},
+    "b": {"nextCursorMark": "b", "articles": []},
+}
+
+
+def fake_page(annotation_type, subtype, section, provider, filter, page_size, cursor_mark):
+    return JSONStream([json.dumps(PAGES[cursor_mark])], "articles")
+
+
+class TestAnnotationsHarvest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.output = os.path.join(self.directory, "out.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @patch.object(AnnotationsClient, 'stream_by_section_and_or_type', side_effect=fake_page)
+    def test_iterator_follows_cursor(self, mock_page):
+        """Tests that the iterator follows nextCursorMark to the end."""
+        articles = list(AnnotationsClient().iter_by_section_and_or_type("Accession Numbers"))
+        self.assertEqual([a["pmcid"] for a in articles], ["PMC1", "PMC2", "PMC3"])
+
+    @patch.object(AnnotationsClient, 'stream_by_section_and_or_type', side_effect=fake_page)
+    def test_resume_from_checkpoint(self, mock_page):
+        """Tests that a harvest resumes from the saved cursor and drops uncheckpointed output."""
+        with open(self.output, "w") as f:
+            f.write(json.dumps({"pmcid": "PMC1"}) + "\n" + json.dumps({"pmcid": "PMC2"}) + "\n")
+            offset = f.tell()
+            f.write('{"pmcid": "PARTIAL')
+        query = {"annotation_type": "Accession Numbers", "subtype": None, "section": None, "provider": None, "filter": 1}
+        Checkpoint(self.output + ".checkpoint").save({"query": query, "cursor": "a", "written": 2, "offset": offset})
+
+        result = CliRunner().invoke(cli, ["annotations", "by-type", "--type", "Accession Numbers", "--all", "--output", self.output])
+        self.assertEqual(result.exit_code, 0, result.output)
+        with open(self.output) as f:
+            self.assertEqual([json.loads(line)["pmcid"] for line in f], ["PMC1", "PMC2", "PMC3"])
+        self.assertEqual([c.args[-1] for c in mock_page.call_args_list], ["a", "b"])
+        state = Checkpoint(self.output + ".checkpoint").load()
+        self.assertIsNone(state["cursor"])
+        self.assertEqual(state["written"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,387 @@
+import os
+import gzip
+import shutil
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from europmc_dev_tool.api.async_client import (
+    httpx, AsyncArticlesClient, AsyncAnnotationsClient, AsyncGrantsClient, AsyncOAIClient, AsyncRateLimiter,
+    AsyncCursorPaginator
+)
+from europmc_dev_tool.api.cache import ResponseCache, OfflineCacheMiss
+from europmc_dev_tool.api.metrics import RequestMetrics
+from europmc_dev_tool.api.oai import OAIError
+
+
+def oai_page(identifiers, token=None):
+    records = "".join(
+        f"<record><header><identifier>{i}</identifier><datestamp>2024-01-01</datestamp></header>"
+        "<metadata><article/></metadata></record>"
+        for i in identifiers
+    )
+    token_xml = f"<resumptionToken>{token}</resumptionToken>" if token else ""
+    return ("<OAI-PMH xmlns='http://www.openarchives.org/OAI/2.0/'>"
+            f"<ListRecords>{records}{token_xml}</ListRecords></OAI-PMH>")
+
+
+def fake_api(request):
+    """Routes requests to canned Europe PMC responses."""
+    path = request.url.path
+    params = request.url.params
+    if path.endswith("/search") and "GristAPI" not in path:
+        if "EXT_ID:" in params["query"]:
+            return httpx.Response(200, json={"resultList": {"result": [
+                {"id": "1", "source": "MED", "pmid": "1"}, {"id": "2", "source": "MED", "pmid": "2"}
+            ]}})
+        if params["cursorMark"] == "*":
+            return httpx.Response(200, json={"nextCursorMark": "c1", "resultList": {"result": [{"id": "1"}]}})
+        return httpx.Response(200, json={"nextCursorMark": "c1", "resultList": {"result": []}})
+    if "/article/" in path:
+        return httpx.Response(200, json={"result": {"id": path.rsplit("/", 1)[-1]}})
+    if path.endswith("/references") or path.endswith("/citations"):
+        if "/broken/" in path:
+            return httpx.Response(404)
+        kind = "reference" if path.endswith("/references") else "citation"
+        page = int(params["page"])
+        return httpx.Response(200, json={"hitCount": 3, f"{kind}List": {kind: [{"id": f"{page}a"}, {"id": f"{page}b"}][:5 - 2 * page]}})
+    if path.endswith("/fullTextXML"):
+        return httpx.Response(200, content=b"<article/>")
+    if path.endswith("/annotationsByArticleIds"):
+        ids = params["articleIds"].split(",")
+        if "PMC:bad" in ids:
+            return httpx.Response(500)
+        return httpx.Response(200, json=[{"source": i.split(":")[0], "extId": i.split(":")[1]} for i in reversed(ids)])
+    if path.endswith("/annotationsByEntity"):
+        return httpx.Response(200, json=[{"entity": params["entity"]}])
+    if path.endswith("/annotationsBySectionAndOrType"):
+        if params["cursorMark"] == "0.0":
+            return httpx.Response(200, json={"nextCursorMark": "1.0", "articles": [{"extId": "1"}]})
+        return httpx.Response(200, json={"nextCursorMark": "1.0", "articles": []})
+    if "GristAPI" in path:
+        page = int(path.split("page=")[1].split("&")[0])
+        return httpx.Response(200, json={"HitCount": 3, "RecordList": {"Record": [{"p": page}] * (2 if page == 1 else 1)}})
+    if path.endswith("/oai.cgi"):
+        if params.get("verb") == "GetRecord":
+            if params["identifier"].endswith("PMC404"):
+                return httpx.Response(200, text=("<OAI-PMH xmlns='http://www.openarchives.org/OAI/2.0/'>"
+                                                 "<error code='idDoesNotExist'>missing</error></OAI-PMH>"))
+            return httpx.Response(200, text=oai_page([params["identifier"]]))
+        if params.get("resumptionToken") == "t1":
+            return httpx.Response(200, text=oai_page(["oai:2"]))
+        return httpx.Response(200, text=oai_page(["oai:1"], token="t1"))
+    return httpx.Response(404)
+
+
+@unittest.skipIf(httpx is None, "httpx is not installed")
+class TestAsyncClients(unittest.TestCase):
+
+    def test_shared_endpoint_logic(self):
+        """Tests that async clients build the same requests as the sync clients."""
+        seen = []
+
+        def handler(request):
+            seen.append(request.url)
+            return httpx.Response(200, json={"hitCount": 1})
+
+        async def run():
+            http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            client = AsyncArticlesClient(email="a@b.org", http_client=http)
+            data = await client.search("BRCA1", page_size=5)
+            await http.aclose()
+            return data
+
+        self.assertEqual(asyncio.run(run()), {"hitCount": 1})
+        self.assertEqual(seen[0].path, "/europepmc/webservices/rest/search")
+        self.assertEqual(seen[0].params["query"], "BRCA1")
+        self.assertEqual(seen[0].params["pageSize"], "5")
+        self.assertEqual(seen[0].params["email"], "a@b.org")
+
+    def test_none_params_dropped_and_retry(self):
+        """Tests that None parameters are not sent and failed requests are retried."""
+        calls = []
+
+        def handler(request):
+            calls.append(request.url)
+            if len(calls) == 1:
+                return httpx.Response(503)
+            return httpx.Response(200, json=[])
+
+        async def run():
+            http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            client = AsyncAnnotationsClient(http_client=http)
+            with patch('asyncio.sleep', return_value=None):
+                data = await client.get_by_article_ids(["PMC:1"])
+            await http.aclose()
+            return data
+
+        self.assertEqual(asyncio.run(run()), [])
+        self.assertEqual(len(calls), 2)
+        self.assertNotIn("provider", calls[1].params)
+
+    def test_rate_limiter_is_shared(self):
+        """Tests that a shared limiter spaces requests across clients."""
+        async def run():
+            limiter = AsyncRateLimiter(rate=2, per=0.1)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await asyncio.gather(*(limiter.acquire() for _ in range(6)))
+            return loop.time() - start
+
+        self.assertGreaterEqual(asyncio.run(run()), 0.15)
+
+    def test_rate_limiter_sleeps_outside_lock(self):
+        """Tests that waiting callers do not hold the limiter's lock, so they wait concurrently."""
+        async def run():
+            limiter = AsyncRateLimiter(rate=1, per=0.2)
+            await limiter.acquire()
+            waiters = [asyncio.ensure_future(limiter.acquire()) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            locked = limiter._lock.locked()
+            waits = await asyncio.gather(*waiters)
+            return locked, waits
+
+        locked, waits = asyncio.run(run())
+        self.assertFalse(locked)
+        self.assertAlmostEqual(waits[0], 0.2, delta=0.05)
+        self.assertAlmostEqual(waits[1], 0.4, delta=0.05)
+
+    def test_cache_and_coalescing(self):
+        """Tests that async clients use the response cache and send identical concurrent requests once."""
+        calls = []
+
+        async def handler(request):
+            calls.append(request.url)
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"hitCount": 1})
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+
+        async def run(offline=False):
+            http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            async with AsyncArticlesClient(http_client=http, cache=ResponseCache(tmp_dir, offline=offline)) as client:
+                results = await asyncio.gather(client.search("x"), client.search("x"))
+                saved = client.flight.saved
+            await http.aclose()
+            return results, saved
+
+        results, saved = asyncio.run(run())
+        self.assertEqual(results, [{"hitCount": 1}] * 2)
+        self.assertEqual(saved, 1)
+        self.assertEqual(len(calls), 1)
+        results, _ = asyncio.run(run(offline=True))
+        self.assertEqual(results, [{"hitCount": 1}] * 2)
+        self.assertEqual(len(calls), 1)
+
+    def test_offline_blocks_streamed_requests(self):
+        """Tests that offline mode refuses uncached requests, streamed or not."""
+        calls = []
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+
+        async def run():
+            http = httpx.AsyncClient(transport=httpx.MockTransport(lambda r: calls.append(r) or httpx.Response(200)))
+            async with AsyncArticlesClient(http_client=http, cache=ResponseCache(tmp_dir, offline=True)) as client:
+                with self.assertRaises(OfflineCacheMiss):
+                    await client.search("x")
+                with self.assertRaises(OfflineCacheMiss):
+                    await client.download_fulltext_xml("PMC1", os.path.join(tmp_dir, "PMC1.xml.gz"))
+            await http.aclose()
+
+        asyncio.run(run())
+        self.assertEqual(calls, [])
+
+    def test_stream_resumes_after_read_error(self):
+        """Tests that a page cut off while streaming is requested again and decoding resumes."""
+        body = b'{"hitCount": 3, "resultList": {"result": [{"id": "1"}, {"id": "2"}, {"id": "3"}]}}'
+        attempts = []
+
+        class Broken(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                yield body[:60]
+                raise httpx.ReadError("connection reset")
+
+        def handler(request):
+            attempts.append(request)
+            if len(attempts) == 1:
+                return httpx.Response(200, stream=Broken())
+            return httpx.Response(200, content=body)
+
+        async def run():
+            http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            async with AsyncArticlesClient(http_client=http) as client:
+                with patch('asyncio.sleep', return_value=None):
+                    stream = await client.search_stream("x")
+                    hit_count = await stream.get("hitCount")
+                    items = [item async for item in stream]
+            await http.aclose()
+            return hit_count, items
+
+        hit_count, items = asyncio.run(run())
+        self.assertEqual(hit_count, 3)
+        self.assertEqual(items, [{"id": "1"}, {"id": "2"}, {"id": "3"}])
+        self.assertEqual(len(attempts), 2)
+
+
+@unittest.skipIf(httpx is None, "httpx is not installed")
+class TestAsyncPublicMethods(unittest.TestCase):
+    """Calls every public method of the async clients against a fake API."""
+
+    def run_client(self, cls, func, **kwargs):
+        async def run():
+            http = httpx.AsyncClient(transport=httpx.MockTransport(fake_api))
+            async with cls(http_client=http, **kwargs) as client:
+                with patch('asyncio.sleep', return_value=None):
+                    result = await func(client)
+            await http.aclose()
+            return result
+
+        return asyncio.run(run())
+
+    def test_base_client_attributes(self):
+        """Tests that attributes the shared client code reads are set."""
+        metrics = RequestMetrics()
+        for cls in (AsyncArticlesClient, AsyncAnnotationsClient, AsyncGrantsClient, AsyncOAIClient):
+            client = cls(http_client=object(), metrics=metrics)
+            for attribute in ("email", "tool", "rate_limiter", "retry_policy", "session", "cache", "flight"):
+                self.assertTrue(hasattr(client, attribute), f"{cls.__name__}.{attribute}")
+            self.assertIs(client.metrics, metrics)
+
+    def test_metrics(self):
+        """Tests that async requests are recorded in the metrics."""
+        metrics = RequestMetrics()
+        self.run_client(AsyncArticlesClient, lambda c: c.get_article("MED", "1"), metrics=metrics)
+        self.assertEqual(metrics.to_dict()["article"]["statuses"], {"200": 1})
+
+        async def stream(client):
+            return [r async for r in await client.search_stream("x")]
+
+        self.run_client(AsyncArticlesClient, stream, metrics=metrics)
+        body = fake_api(httpx.Request("GET", "https://x/search", params={"query": "x", "cursorMark": "*"})).content
+        self.assertEqual(metrics.to_dict()["search"]["bytes"], len(body))
+
+    def test_articles(self):
+        async def calls(client):
+            async def collect(agen):
+                return [item async for item in agen]
+
+            return {
+                "search": await client.search("x", cursor_mark="*"),
+                "search_iter": await collect(client.search_iter("x")),
+                "get_article": await client.get_article("MED", "7"),
+                "resolve_ids": await collect(client.resolve_ids(["1", "2", "3"])),
+                "get_references": await client.get_references("MED", "1"),
+                "get_citations": await client.get_citations("MED", "1"),
+                "get_all_references": await collect(client.get_all_references("MED", "1", page_size=2)),
+                "get_all_citations": await collect(client.get_all_citations("MED", "1", page_size=2)),
+                "get_references_batch": await collect(client.get_references_batch(
+                    [("MED", "1"), ("MED", "broken")], page_size=2
+                )),
+                "get_fulltext_xml": await client.get_fulltext_xml("PMC1"),
+                "download_fulltext_xml": await client.download_fulltext_xml("PMC1", path),
+            }
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, "PMC1.xml.gz")
+        results = self.run_client(AsyncArticlesClient, calls)
+
+        self.assertEqual(results["search"]["nextCursorMark"], "c1")
+        self.assertEqual(results["search_iter"], [{"id": "1"}])
+        self.assertEqual(results["get_article"], {"result": {"id": "7"}})
+        self.assertEqual([(i, r and r["id"], e) for i, r, e in results["resolve_ids"]],
+                         [("1", "1", None), ("2", "2", None), ("3", None, None)])
+        self.assertEqual(results["get_references"]["hitCount"], 3)
+        self.assertEqual(results["get_citations"]["hitCount"], 3)
+        self.assertEqual(results["get_all_references"], [{"id": "1a"}, {"id": "1b"}, {"id": "2a"}])
+        self.assertEqual(results["get_all_citations"], [{"id": "1a"}, {"id": "1b"}, {"id": "2a"}])
+        (_, _, references, error), (_, broken, missing, broken_error) = results["get_references_batch"]
+        self.assertEqual(len(references), 3)
+        self.assertIsNone(error)
+        self.assertEqual(broken, "broken")
+        self.assertIsNone(missing)
+        self.assertIsInstance(broken_error, httpx.HTTPStatusError)
+        self.assertEqual(results["get_fulltext_xml"], "<article/>")
+        self.assertEqual(results["download_fulltext_xml"], len(b"<article/>"))
+        with gzip.open(path) as f:
+            self.assertEqual(f.read(), b"<article/>")
+        self.assertFalse(os.path.exists(path + ".part"))
+
+    def test_search_stream(self):
+        async def calls(client):
+            stream = await client.search_stream("x")
+            return await stream.get("nextCursorMark"), [r async for r in stream]
+
+        self.assertEqual(self.run_client(AsyncArticlesClient, calls), ("c1", [{"id": "1"}]))
+
+    def test_annotations(self):
+        async def calls(client):
+            errors = []
+            return {
+                "get_by_article_ids": await client.get_by_article_ids(["PMC:1", "PMC:2"]),
+                "get_by_article_ids_bulk": [r async for r in client.get_by_article_ids_bulk(
+                    ["PMC:1", "PMC:2", "PMC:bad", "PMC:3"], chunk_size=2, on_error=lambda i, e: errors.append(i)
+                )],
+                "errors": errors,
+                "get_by_entity": await client.get_by_entity("BRCA1"),
+                "get_by_section_and_or_type": await client.get_by_section_and_or_type("Gene_Proteins"),
+                "iter_by_section_and_or_type": [a async for a in client.iter_by_section_and_or_type("Gene_Proteins")],
+            }
+
+        results = self.run_client(AsyncAnnotationsClient, calls)
+        self.assertEqual([r["extId"] for r in results["get_by_article_ids"]], ["2", "1"])
+        self.assertEqual([r["extId"] for r in results["get_by_article_ids_bulk"]], ["1", "2", "3"])
+        self.assertEqual(results["errors"], ["PMC:bad"])
+        self.assertEqual(results["get_by_entity"], [{"entity": "BRCA1"}])
+        self.assertEqual(results["get_by_section_and_or_type"]["nextCursorMark"], "1.0")
+        self.assertEqual(results["iter_by_section_and_or_type"], [{"extId": "1"}])
+
+    def test_annotations_streams(self):
+        async def calls(client):
+            stream = await client.stream_by_section_and_or_type("Gene_Proteins")
+            streamed = [a async for a in stream]
+            paginator = client.paginate_by_section_and_or_type("Gene_Proteins")
+            cursors = []
+            async for page in paginator.pages():
+                cursors.append((paginator.cursor, paginator.next_cursor))
+                [a async for a in page]
+            return streamed, paginator, cursors
+
+        streamed, paginator, cursors = self.run_client(AsyncAnnotationsClient, calls)
+        self.assertEqual(streamed, [{"extId": "1"}])
+        self.assertIsInstance(paginator, AsyncCursorPaginator)
+        self.assertEqual(cursors, [("0.0", "1.0"), ("1.0", None)])
+
+    def test_grants(self):
+        async def calls(client):
+            return await client.search("malaria"), [g async for g in client.search_iter("malaria", page_size=2)]
+
+        first, grants = self.run_client(AsyncGrantsClient, calls)
+        self.assertEqual(first["HitCount"], 3)
+        self.assertEqual(grants, [{"p": 1}, {"p": 1}, {"p": 2}])
+
+    def test_oai(self):
+        async def calls(client):
+            return {
+                "harvest": await client.harvest(),
+                "iter_records": [r.identifier async for r in client.iter_records()],
+                "resume": [r.identifier async for r in client.iter_records(resumption_token="t1")],
+                "get_record": await client.get_record("PMC1"),
+                "get_records": [(i, r is None, e) async for i, r, e in client.get_records(["PMC1", "PMC404"])],
+            }
+
+        results = self.run_client(AsyncOAIClient, calls)
+        self.assertIn("<resumptionToken>t1</resumptionToken>", results["harvest"])
+        self.assertEqual(results["iter_records"], ["oai:1", "oai:2"])
+        self.assertEqual(results["resume"], ["oai:2"])
+        self.assertEqual(results["get_record"].identifier, "oai:europepmc.org:PMC1")
+        (pmcid, missing, error), (missing_id, not_found, not_found_error) = results["get_records"]
+        self.assertEqual((pmcid, missing, error), ("PMC1", False, None))
+        self.assertEqual((missing_id, not_found), ("PMC404", True))
+        self.assertIsInstance(not_found_error, OAIError)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import click
+from click.testing import CliRunner
+
+from europmc_dev_tool.cache import DiskCache, jats_cache_key
+from europmc_dev_tool.cli import cli
+
+
+def entries_size(directory):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(directory) for name in names if name.endswith('.json.gz'))
+
+
+def fill(directory, prefix):
+    cache = DiskCache(directory)
+    for n in range(40):
+        cache.set(f"{prefix}{n:03d}", os.urandom(50).hex())
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_roundtrip(self):
+        """Tests that stored values are returned on a hit and misses return the default."""
+        cache = DiskCache(self.cache_dir)
+        key = jats_cache_key("<article/>")
+        self.assertIsNone(cache.get(key))
+        cache.set(key, {"sections": {"INTRO": [{"text": "a", "sentence_id": 1}]}})
+        self.assertIn(key, cache)
+        self.assertEqual(cache.get(key)["sections"]["INTRO"][0]["text"], "a")
+
+    def test_key_depends_on_content_and_config(self):
+        """Tests that the key changes with the XML and the sentenciser mode."""
+        base = jats_cache_key("<article/>", sentenciser=True)
+        self.assertEqual(base, jats_cache_key("<article/>", sentenciser=True))
+        self.assertNotEqual(base, jats_cache_key("<article></article>", sentenciser=True))
+        self.assertNotEqual(base, jats_cache_key("<article/>", sentenciser=False))
+
+    def test_size_bounded_eviction(self):
+        """Tests that the least recently used entries are evicted first."""
+        cache = DiskCache(self.cache_dir)
+        payload = os.urandom(2000).hex()
+        cache.set("aa01", payload)
+        entry_size = cache.size
+        cache.max_size = entry_size * 2 + entry_size // 2
+
+        old = time.time() - 100
+        os.utime(cache._path("aa01"), (old, old))
+        cache.set("bb02", payload)
+        cache.set("cc03", payload)
+
+        self.assertNotIn("aa01", cache)
+        self.assertIn("bb02", cache)
+        self.assertIn("cc03", cache)
+        self.assertLessEqual(cache.size, cache.max_size)
+
+    def test_size_kept_without_scanning(self):
+        """Tests that the running size survives new instances and is not rebuilt by walking the directory."""
+        cache = DiskCache(self.cache_dir)
+        cache.set("aa01", "x" * 100)
+        with patch.object(DiskCache, '_entries') as entries:
+            other = DiskCache(self.cache_dir, max_size=10 ** 9)
+            for n in range(50):
+                other.set(f"b{n:03d}", "y" * 100)
+            other.delete("aa01")
+            entries.assert_not_called()
+        self.assertEqual(cache.size, entries_size(self.cache_dir))
+
+    def test_missing_size_file_rebuilt(self):
+        """Tests that a cache directory without a size file is scanned once."""
+        DiskCache(self.cache_dir).set("aa01", "x" * 100)
+        expected = DiskCache(self.cache_dir).size
+        os.remove(os.path.join(self.cache_dir, DiskCache.SIZE_FILE))
+        self.assertEqual(DiskCache(self.cache_dir).size, expected)
+
+    def test_concurrent_threads_keep_size(self):
+        """Tests that concurrent writes from threads sharing a cache do not lose size updates."""
+        cache = DiskCache(self.cache_dir)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda n: cache.set(f"{n % 7}{n:04d}", os.urandom(50).hex()), range(200)))
+        self.assertEqual(cache.size, entries_size(self.cache_dir))
+
+    def test_concurrent_processes_keep_size(self):
+        """Tests that processes writing to one cache directory share an exact size."""
+        DiskCache(self.cache_dir).size
+        processes = [multiprocessing.Process(target=fill, args=(self.cache_dir, prefix)) for prefix in "abcd"]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(DiskCache(self.cache_dir).size, entries_size(self.cache_dir))
+
+    def test_close_releases_size_file(self):
+        """Tests that closing the cache closes the size file and that it is reopened on use."""
+        with DiskCache(self.cache_dir) as cache:
+            cache.set("ab1", "x")
+            fd = cache._fd
+            os.fstat(fd)
+        self.assertIsNone(cache._fd)
+        with self.assertRaises(OSError):
+            os.fstat(fd)
+        cache.set("ab2", "y")
+        self.assertEqual(cache.size, entries_size(self.cache_dir))
+        cache.close()
+        cache.close()
+
+    def test_cli_http_cache_max_size(self):
+        """Tests that --http-cache-max-size bounds the response cache."""
+        seen = {}
+
+        @cli.command(name="cache-probe")
+        @click.pass_context
+        def probe(ctx):
+            seen["max_size"] = ctx.obj["cache"].store.max_size
+            seen["store"] = ctx.obj["cache"].store
+            seen["store"].size
+
+        try:
+            result = CliRunner().invoke(cli, ["--http-cache-dir", self.cache_dir, "--http-cache-max-size", "1.5",
+                                              "cache-probe"])
+        finally:
+            cli.commands.pop("cache-probe")
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(seen["max_size"], int(1.5 * 1024 * 1024))
+        self.assertIsNone(seen["store"]._fd, "the CLI leaves the size file open")
+
+
+if __name__ == '__main__':
+    unittest.main()
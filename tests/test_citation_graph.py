@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from europmc_dev_tool.api.articles import ArticlesClient
+from europmc_dev_tool.citation_graph import CitationGraph, build_citation_graph, np
+
+# A -> B means A cites B.
+CITES = {
+    "1": ["2", "3"],
+    "2": ["3"],
+    "3": ["4"],
+    "5": ["1"],
+}
+
+
+def references_page(source, article_id, page, page_size):
+    if article_id == "broken":
+        raise requests.HTTPError("500 Server Error")
+    refs = [{"source": "MED", "id": i} for i in CITES.get(article_id, [])]
+    refs.append({"title": "A reference without an identifier"})
+    return {"hitCount": len(refs), "referenceList": {"reference": refs}}
+
+
+def citations_page(source, article_id, page, page_size):
+    cits = [{"source": "MED", "id": a} for a, cited in CITES.items() if article_id in cited]
+    return {"hitCount": len(cits), "citationList": {"citation": cits}}
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestCitationGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_from_edges(self):
+        """Tests the CSR layout and that duplicate edges are dropped."""
+        graph = CitationGraph.from_edges(["a", "b", "c"], [2, 0, 0, 0], [0, 2, 1, 2])
+        self.assertEqual(graph.indptr.tolist(), [0, 2, 2, 3])
+        self.assertEqual(graph.indices.tolist(), [1, 2, 0])
+        self.assertEqual(graph.references("a"), ["b", "c"])
+        self.assertEqual(graph.citations("a"), ["c"])
+        self.assertEqual(graph.num_edges, 3)
+
+    def test_save_and_load(self):
+        """Tests that a saved graph loads memory-mapped with the same contents."""
+        graph = CitationGraph.from_edges(["a", "b"], [0], [1])
+        graph.save(self.tmp_dir)
+        loaded = CitationGraph.load(self.tmp_dir)
+        self.assertIsInstance(loaded.indices, np.memmap)
+        self.assertIsInstance(loaded.ids.keys, np.memmap)
+        self.assertEqual(list(loaded.ids), ["a", "b"])
+        self.assertEqual(loaded.references("a"), ["b"])
+
+    def test_key_lookup(self):
+        """Tests that keys are found by binary search in node order."""
+        keys = [f"MED:{i}" for i in range(500, 0, -7)] + ["PMC:PMC9", "PPR:PPR1", "\u00e9:1"]
+        graph = CitationGraph.from_edges(keys, [], [])
+        graph.save(self.tmp_dir)
+        for candidate in (graph, CitationGraph.load(self.tmp_dir)):
+            self.assertEqual([candidate.node(key) for key in keys], list(range(len(keys))))
+            self.assertEqual(candidate.ids[len(keys) - 1], "\u00e9:1")
+            self.assertNotIn("MED:2", candidate.ids)
+            with self.assertRaises(KeyError):
+                candidate.references("MED:2")
+
+    @patch.object(ArticlesClient, 'get_citations', side_effect=citations_page)
+    @patch.object(ArticlesClient, 'get_references', side_effect=references_page)
+    def test_build_depth(self, mock_refs, mock_cits):
+        """Tests that references and citations are followed to the given depth only."""
+        graph = build_citation_graph(ArticlesClient(), [("MED", "1")], depth=1)
+        self.assertEqual(sorted(graph.ids), ["MED:1", "MED:2", "MED:3", "MED:5"])
+        self.assertEqual(graph.references("MED:1"), ["MED:2", "MED:3"])
+        self.assertEqual(graph.references("MED:5"), ["MED:1"])
+        # Articles at the last level are not expanded.
+        self.assertEqual(graph.references("MED:2"), [])
+
+        graph = build_citation_graph(ArticlesClient(), [("MED", "1")], depth=2)
+        self.assertEqual(sorted(graph.ids), ["MED:1", "MED:2", "MED:3", "MED:4", "MED:5"])
+        self.assertEqual(graph.references("MED:2"), ["MED:3"])
+        self.assertEqual(graph.num_edges, 5)
+
+    @patch.object(ArticlesClient, 'get_citations', side_effect=citations_page)
+    @patch.object(ArticlesClient, 'get_references', side_effect=references_page)
+    def test_build_reports_errors(self, mock_refs, mock_cits):
+        """Tests that articles that cannot be fetched are reported and kept as nodes."""
+        errors = []
+        graph = build_citation_graph(
+            ArticlesClient(), [("MED", "broken"), ("MED", "3")], depth=1, citations=False,
+            on_error=lambda key, e: errors.append(key)
+        )
+        self.assertEqual(errors, ["MED:broken"])
+        self.assertEqual(list(graph.ids), ["MED:broken", "MED:3", "MED:4"])
+        mock_cits.assert_not_called()
+
+    @patch.object(ArticlesClient, 'search')
+    @patch.object(ArticlesClient, 'get_citations', side_effect=citations_page)
+    @patch.object(ArticlesClient, 'get_references', side_effect=references_page)
+    def test_pmc_seed_is_normalised(self, mock_refs, mock_cits, mock_search):
+        """Tests that a PMCID seed is keyed by the source and ID the references endpoint reports."""
+        mock_search.return_value = {"resultList": {"result": [
+            {"source": "MED", "id": "1", "pmcid": "PMC100"}
+        ]}}
+        graph = build_citation_graph(ArticlesClient(), [("PMC", "PMC100"), ("PMC", "PMC404")], depth=1)
+        self.assertEqual(list(graph.ids)[:2], ["MED:1", "PMC:PMC404"])
+        # Article 5 cites article 1; found as a citation it is the same node as the seed.
+        self.assertEqual(graph.references("MED:5"), ["MED:1"])
+        self.assertEqual(graph.num_nodes, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import time
+import unittest
+
+from europmc_dev_tool.api.concurrency import ordered_map, interleave
+
+
+class TestConcurrency(unittest.TestCase):
+
+    def test_ordered_map_keeps_order(self):
+        """Tests that results are yielded in input order despite varying latency."""
+        def slow_square(x):
+            time.sleep(0.01 * (5 - x % 5))
+            return x * x
+
+        self.assertEqual(list(ordered_map(slow_square, range(20), max_workers=4)), [x * x for x in range(20)])
+
+    def test_ordered_map_is_lazy(self):
+        """Tests that only a bounded number of items is read ahead."""
+        consumed = []
+
+        def items():
+            for i in range(1000):
+                consumed.append(i)
+                yield i
+
+        results = ordered_map(lambda x: x, items(), max_workers=2, max_pending=4)
+        self.assertEqual(next(results), 0)
+        results.close()
+        self.assertLessEqual(len(consumed), 5)
+
+    def test_interleave(self):
+        """Tests that every item of every iterable is yielded."""
+        streams = [range(0, 100), range(100, 150), range(150, 151)]
+        self.assertEqual(sorted(interleave(streams, max_workers=2, buffer=8)), list(range(151)))
+
+    def test_interleave_propagates_errors(self):
+        """Tests that an exception in a producer is raised in the consumer."""
+        def failing():
+            yield 1
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            list(interleave([failing(), range(5)]))
+
+
+if __name__ == '__main__':
+    unittest.main()
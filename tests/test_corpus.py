@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from europmc_dev_tool import corpus
+from europmc_dev_tool.corpus import (
+    CorpusWriter, CorpusReader, normalize_article_id, INDEX_HEADER, INDEX_ENTRY, INDEX_MAGIC
+)
+
+
+def make_article(n):
+    return {
+        'article_ids': {'pmcid': str(1000 + n), 'pmid': str(2000 + n), 'doi': f"10.1000/ABC.{n}"},
+        'sections': {'INTRO': [{'text': f"Sentence {n}.", 'sentence_id': 1}]}
+    }
+
+
+class TestCorpus(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'corpus.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_normalize_article_id(self):
+        """Tests normalisation of PMCIDs and DOIs."""
+        self.assertEqual(normalize_article_id('123', 'pmcid'), 'PMC123')
+        self.assertEqual(normalize_article_id('pmc123'), 'PMC123')
+        self.assertEqual(normalize_article_id('10.1000/ABC'), '10.1000/abc')
+
+    def test_lookup_and_iteration(self):
+        """Tests lookups by every ID type and sequential iteration across blocks."""
+        for compress in (True, False):
+            with self.subTest(compress=compress):
+                with CorpusWriter(self.path, compress=compress, block_size=200) as writer:
+                    for n in range(50):
+                        writer.write(make_article(n))
+                with CorpusReader(self.path) as reader:
+                    self.assertEqual(reader['PMC1007']['sections']['INTRO'][0]['text'], 'Sentence 7.')
+                    self.assertEqual(reader['2042']['article_ids']['pmcid'], '1042')
+                    self.assertEqual(reader['10.1000/abc.13']['article_ids']['pmid'], '2013')
+                    self.assertIsNone(reader.get('PMC9999'))
+                    self.assertEqual([a['article_ids']['pmid'] for a in reader], [str(2000 + n) for n in range(50)])
+                os.remove(self.path)
+                os.remove(self.path + '.idx')
+
+    def test_append(self):
+        """Tests that reopening a corpus appends to it."""
+        with CorpusWriter(self.path) as writer:
+            writer.write(make_article(1))
+        with CorpusWriter(self.path) as writer:
+            writer.write(make_article(2))
+        with CorpusReader(self.path) as reader:
+            self.assertEqual(len(list(reader)), 2)
+            self.assertIn('PMC1002', reader)
+
+    def test_append_rebuilds_missing_index(self):
+        """Tests that appending to a corpus whose index was lost re-indexes the existing articles."""
+        for compress in (True, False):
+            with self.subTest(compress=compress):
+                with CorpusWriter(self.path, compress=compress, block_size=200) as writer:
+                    for n in range(20):
+                        writer.write(make_article(n))
+                os.remove(self.path + '.idx')
+                with CorpusWriter(self.path, compress=compress) as writer:
+                    writer.write(make_article(20))
+                with CorpusReader(self.path) as reader:
+                    for n in range(21):
+                        self.assertEqual(reader[f'PMC{1000 + n}']['article_ids']['pmid'], str(2000 + n))
+                    self.assertEqual(reader['10.1000/abc.13']['article_ids']['pmcid'], '1013')
+                os.remove(self.path)
+                os.remove(self.path + '.idx')
+
+    def test_append_to_truncated_corpus(self):
+        """Tests that a corpus without an index that cannot be re-indexed is refused."""
+        with CorpusWriter(self.path) as writer:
+            writer.write(make_article(1))
+        os.remove(self.path + '.idx')
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        with self.assertRaises(ValueError):
+            CorpusWriter(self.path)
+
+    def test_binary_index(self):
+        """Tests that the index is a fixed-width hash table at most half full."""
+        with CorpusWriter(self.path) as writer:
+            for n in range(10):
+                writer.write(make_article(n))
+        with open(self.path + '.idx', 'rb') as f:
+            data = f.read()
+        magic, slots = INDEX_HEADER.unpack_from(data, 0)
+        self.assertEqual(magic, INDEX_MAGIC)
+        self.assertGreaterEqual(slots, 60)
+        self.assertEqual(len(data), INDEX_HEADER.size + slots * INDEX_ENTRY.size)
+        with CorpusReader(self.path) as reader:
+            self.assertEqual(sorted(reader.keys())[:2], ['10.1000/abc.0', '10.1000/abc.1'])
+            self.assertNotIn('PMC5000', reader)
+
+    def test_hash_collision_is_not_a_match(self):
+        """Tests that a lookup whose hash matches another article's key is a miss."""
+        with patch.object(corpus, 'key_hash', return_value=1):
+            with CorpusWriter(self.path) as writer:
+                writer.write(make_article(1))
+                writer.write(make_article(2))
+            with CorpusReader(self.path) as reader:
+                self.assertEqual(reader['PMC1002']['article_ids']['pmid'], '2002')
+                self.assertIsNone(reader.get('PMC1001'))
+
+
+if __name__ == '__main__':
+    unittest.main()
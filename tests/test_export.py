@@ -0,0 +1,51 @@
+import shutil
+import tempfile
+import unittest
+
+from europmc_dev_tool.export import ParquetExporter, primary_article_id, pq
+
+
+class TestParquetExport(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_primary_article_id(self):
+        """Tests that PMCIDs are preferred and normalised."""
+        self.assertEqual(primary_article_id({'pmid': '39762646', 'pmcid': '11832904'}), 'PMC11832904')
+        self.assertEqual(primary_article_id({'doi': '10.1/x', 'pmid': '1'}), '1')
+        self.assertIsNone(primary_article_id({}))
+
+    @unittest.skipIf(pq is None, "pyarrow is not installed")
+    def test_export_tables(self):
+        """Tests that sentences and extractions are written as separate tables."""
+        article = {
+            'article_ids': {'pmcid': '11832904'},
+            'sections': {
+                'INTRO': [{'text': 'First.', 'sentence_id': 1}],
+                'METHODS': [{'text': 'Data in PXD053361.', 'sentence_id': 2}],
+            }
+        }
+        extractions = [{
+            'type': 'accession', 'name': 'pxd', 'exact': 'PXD053361',
+            'span': [8, 17], 'uri': 'http://identifiers.org/pride.project/PXD053361',
+            'sentence_id': 2
+        }]
+        with ParquetExporter(self.output_dir) as exporter:
+            exporter.add_article(article, extractions)
+
+        sentences = pq.read_table(f"{self.output_dir}/sentences", columns=['section', 'text']).to_pylist()
+        self.assertEqual(sentences, [
+            {'section': 'INTRO', 'text': 'First.'},
+            {'section': 'METHODS', 'text': 'Data in PXD053361.'},
+        ])
+        rows = pq.read_table(f"{self.output_dir}/extractions").to_pylist()
+        self.assertEqual(rows[0]['article_id'], 'PMC11832904')
+        self.assertEqual((rows[0]['span_start'], rows[0]['span_end']), (8, 17))
+
+
+if __name__ == '__main__':
+    unittest.main()
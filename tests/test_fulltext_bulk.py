@@ -0,0 +1,67 @@
+import io
+import os
+import gzip
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from europmc_dev_tool.api.articles import ArticlesClient
+from europmc_dev_tool.api.fulltext import fetch_fulltext_bulk, StatusLog, fulltext_path
+
+
+def make_response(status, body=b''):
+    response = requests.Response()
+    response.status_code = status
+    response.raw = io.BytesIO(body)
+    return response
+
+
+def fake_get(url, params=None, timeout=None, stream=False, **kwargs):
+    if 'PMC404' in url:
+        return make_response(404)
+    return make_response(200, b'<article>' + url.encode() + b'</article>')
+
+
+class TestFulltextBulk(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    @patch('requests.Session.get', side_effect=fake_get)
+    def test_streams_to_gzip_and_logs(self, mock_get):
+        """Tests that full texts are written compressed and 404s are logged."""
+        results = list(fetch_fulltext_bulk(ArticlesClient(), ['PMC1', 'PMC404', 'PMC2'], self.directory))
+        self.assertEqual(results, [('PMC1', 'ok'), ('PMC404', 'not_found'), ('PMC2', 'ok')])
+        with gzip.open(fulltext_path(self.directory, 'PMC1')) as f:
+            self.assertIn(b'PMC1/fullTextXML', f.read())
+        self.assertFalse(os.path.exists(fulltext_path(self.directory, 'PMC404')))
+        self.assertFalse(any(name.endswith('.part') for name in os.listdir(self.directory)))
+        statuses = StatusLog(os.path.join(self.directory, 'status.tsv')).load()
+        self.assertEqual(statuses['PMC404'], 'not_found')
+
+    @patch('requests.Session.get', side_effect=fake_get)
+    def test_resume_skips_completed(self, mock_get):
+        """Tests that a re-run only fetches articles without a final status."""
+        list(fetch_fulltext_bulk(ArticlesClient(), ['PMC1', 'PMC404'], self.directory))
+        mock_get.reset_mock()
+        results = list(fetch_fulltext_bulk(ArticlesClient(), ['PMC1', 'PMC404', 'PMC3'], self.directory))
+        self.assertEqual(results, [('PMC3', 'ok')])
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('requests.Session.get', side_effect=fake_get)
+    def test_duplicate_ids_fetched_once(self, mock_get):
+        """Tests that repeated IDs are submitted to a single worker."""
+        results = list(fetch_fulltext_bulk(ArticlesClient(), ['PMC1', 'PMC2', 'PMC1', 'PMC1'], self.directory,
+                                           max_workers=4))
+        self.assertEqual(results, [('PMC1', 'ok'), ('PMC2', 'ok')])
+        self.assertEqual(mock_get.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from unittest.mock import patch
+
+from europmc_dev_tool.api.grants import GrantsClient
+from europmc_dev_tool.api.pagination import iter_numbered_pages
+
+
+def grants_page(page, total=60, per_page=25):
+    start = (page - 1) * per_page
+    records = [{"Grant": {"Id": str(i)}} for i in range(start, min(start + per_page, total))]
+    return {"HitCount": str(total), "RecordList": {"Record": records[0] if len(records) == 1 else records}}
+
+
+class TestGrantsSearch(unittest.TestCase):
+
+    @patch.object(GrantsClient, '_get', return_value={})
+    def test_query_is_encoded(self, mock_get):
+        """Tests that the query is percent-encoded into the path."""
+        GrantsClient().search('ga:"Wellcome Trust" & cancer/leukaemia')
+        url = mock_get.call_args.args[0]
+        self.assertTrue(url.startswith(GrantsClient.BASE_URL + "query=ga%3A%22Wellcome%20Trust%22%20%26%20cancer%2Fleukaemia&"))
+        self.assertIn("&page=1&", url)
+
+    @patch.object(GrantsClient, 'search', side_effect=lambda query, page, page_size: grants_page(page, total=51))
+    def test_search_iter_fetches_all_pages_in_order(self, mock_search):
+        """Tests that all pages are fetched and records come back in order, including single-record pages."""
+        grants = list(GrantsClient().search_iter("cancer"))
+        self.assertEqual([g["Grant"]["Id"] for g in grants], [str(i) for i in range(51)])
+        self.assertEqual(sorted(c.args[1] for c in mock_search.call_args_list), [1, 2, 3])
+
+    def test_page_size_from_first_page(self):
+        """Tests that the server's page size is used when it differs from the requested one."""
+        fetched = []
+
+        def fetch(page):
+            fetched.append(page)
+            return grants_page(page, total=30, per_page=10)
+
+        items = list(iter_numbered_pages(fetch, GrantsClient._records, lambda d: int(d["HitCount"])))
+        self.assertEqual(len(items), 30)
+        self.assertEqual(sorted(fetched), [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
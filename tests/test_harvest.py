@@ -0,0 +1,93 @@
+import re
+import unittest
+from datetime import date, timedelta
+
+from europmc_dev_tool.api.harvest import HarvestPlanner, Partition, SeenKeys
+
+RANGE = re.compile(r"FIRST_PDATE:\[(\S+) TO (\S+)\]")
+
+
+class FakeArticlesClient:
+    """Answers date-restricted queries from an in-memory list of hits."""
+    def __init__(self, hits):
+        self.hits = hits
+
+    def _matching(self, query):
+        match = RANGE.search(query)
+        start, end = (date.fromisoformat(d) for d in match.groups())
+        inside = [h for h in self.hits if h['date'] and start <= h['date'] <= end]
+        if ' NOT FIRST_PDATE' in query:
+            return [h for h in self.hits if h not in inside]
+        return inside
+
+    def search(self, query, page_size=25, result_type="core", cursor_mark=None):
+        return {'hitCount': len(self._matching(query))}
+
+    def search_iter(self, query, result_type="core"):
+        yield from self._matching(query)
+
+
+class TestHarvestPlanner(unittest.TestCase):
+
+    def setUp(self):
+        start = date(2020, 1, 1)
+        self.hits = [
+            {'source': 'MED', 'id': str(i), 'date': start + timedelta(days=i % 365)}
+            for i in range(1000)
+        ]
+        self.hits.append({'source': 'PPR', 'id': 'undated', 'date': None})
+        self.client = FakeArticlesClient(self.hits)
+
+    def test_plan_partitions_below_threshold(self):
+        """Tests that partitions are disjoint, below the threshold and cover every hit."""
+        planner = HarvestPlanner(self.client, max_hits=100, start=date(2019, 1, 1), end=date(2021, 1, 1))
+        partitions = planner.plan("malaria")
+        self.assertTrue(all(p.hit_count <= 100 for p in partitions))
+        self.assertEqual(sum(p.hit_count for p in partitions), len(self.hits))
+        dated = [p for p in partitions if p.start is not None]
+        for before, after in zip(dated, dated[1:]):
+            self.assertLess(before.end, after.start)
+
+    def test_harvest_yields_each_hit_once(self):
+        """Tests that the merged harvest contains every hit exactly once."""
+        planner = HarvestPlanner(self.client, max_hits=200, start=date(2019, 1, 1), end=date(2021, 1, 1))
+        hits = list(planner.harvest("malaria"))
+        self.assertEqual(len(hits), len(self.hits))
+        self.assertEqual({h['id'] for h in hits}, {h['id'] for h in self.hits})
+
+    def test_harvest_dedup_is_global(self):
+        """Tests that duplicates are dropped within a partition and across any two partitions."""
+        def hit(i, day):
+            return {'source': 'MED', 'id': str(i), 'firstPublicationDate': day}
+
+        pages = {
+            'jan': [hit(1, '2020-01-05'), hit(2, '2020-01-15'), hit(1, '2020-01-05')],
+            # Hit 2's date was corrected to the middle of a later partition.
+            'mar': [hit(2, '2020-03-20'), hit(3, '2020-03-10')],
+        }
+
+        class Client:
+            def search_iter(self, query, result_type="core"):
+                yield from pages[query]
+
+        partitions = [
+            Partition('jan', 3, date(2020, 1, 1), date(2020, 1, 31)),
+            Partition('mar', 2, date(2020, 3, 1), date(2020, 3, 31)),
+        ]
+        for max_memory_keys in (100, 1):
+            hits = list(HarvestPlanner(Client()).harvest("q", partitions=partitions, max_memory_keys=max_memory_keys))
+            self.assertEqual(sorted(h['id'] for h in hits), ['1', '2', '3'])
+
+    def test_seen_keys_spills_to_disk(self):
+        """Tests that the seen set gives the same answers before and after moving to disk."""
+        seen = SeenKeys(max_memory_keys=3)
+        self.addCleanup(seen.close)
+        keys = [('MED', '123'), ('PMC', 'PMC123'), ('PPR', 'PPR123'), ('MED', '0123'), ('AGR', 'AGR:Z123')]
+        self.assertEqual([seen.add(k) for k in keys], [True] * len(keys))
+        self.assertIsNotNone(seen._db)
+        self.assertEqual([seen.add(k) for k in keys], [False] * len(keys))
+        self.assertTrue(seen.add(('MED', '124')))
+        self.assertFalse(seen.add(('MED', 123)))
+
+if __name__ == '__main__':
+    unittest.main()
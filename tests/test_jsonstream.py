@@ -0,0 +1,163 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from europmc_dev_tool.api import jsonstream
+from europmc_dev_tool.api.articles import ArticlesClient
+from europmc_dev_tool.api.client import RetryPolicy
+from europmc_dev_tool.api.jsonstream import JSONStream
+
+PAGE = {
+    "version": "6.9",
+    "hitCount": 3,
+    "nextCursorMark": "AoE=",
+    "request": {"query": "malaria", "pageSize": 3},
+    "resultList": {"result": [
+        {"id": "1", "title": "Café über \"quotes\"", "score": 1.5},
+        {"id": "2", "authors": [{"name": "A"}, {"name": "B"}], "citedByCount": 1234567},
+        {"id": "3", "isOpenAccess": "Y", "empty": {}, "none": None},
+    ]},
+    "trailing": True,
+}
+
+
+def chunked(data, size):
+    data = json.dumps(data, ensure_ascii=False, indent=1).encode("utf8")
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def broken(chunks, after):
+    """Yields the first ``after`` chunks, then fails like a reset connection."""
+    yield from chunks[:after]
+    raise requests.exceptions.ChunkedEncodingError("Connection broken")
+
+
+class JSONStreamTests:
+    """Runs against both the ijson and the standard library decoders."""
+
+    def test_items_and_fields(self):
+        """Tests that items and fields are decoded correctly whatever the chunk boundaries."""
+        for size in (1, 2, 7, 64, 100000):
+            stream = JSONStream(chunked(PAGE, size), "resultList.result")
+            self.assertEqual(stream.get("nextCursorMark"), "AoE=")
+            self.assertEqual(list(stream), PAGE["resultList"]["result"])
+            self.assertEqual(stream.fields["hitCount"], 3)
+            self.assertIs(stream.fields["trailing"], True)
+            self.assertNotIn("request", stream.fields)
+
+    def test_fields_after_array(self):
+        """Tests that a field after the array is still found, by buffering the items."""
+        page = {"articles": [{"pmcid": "PMC1"}, {"pmcid": "PMC2"}], "nextCursorMark": "b"}
+        stream = JSONStream(chunked(page, 5), "articles")
+        self.assertEqual(stream.get("nextCursorMark"), "b")
+        self.assertEqual([a["pmcid"] for a in stream], ["PMC1", "PMC2"])
+
+    def test_empty_and_missing(self):
+        """Tests that empty or absent arrays are falsy and yield nothing."""
+        self.assertFalse(JSONStream(chunked({"articles": []}, 3), "articles"))
+        self.assertEqual(list(JSONStream(chunked({"other": [1]}, 3), "articles")), [])
+        self.assertEqual(list(JSONStream(chunked([{"a": 1}], 3), "articles")), [])
+
+    def test_top_level_array(self):
+        """Tests that an empty path streams a top-level array."""
+        self.assertEqual(list(JSONStream(chunked([{"a": 1}, 2, "x"], 2))), [{"a": 1}, 2, "x"])
+
+    def test_truncated(self):
+        """Tests that a truncated document raises ValueError."""
+        data = b''.join(chunked(PAGE, 1000))[:-40]
+        with self.assertRaises(ValueError):
+            list(JSONStream([data], "resultList.result"))
+
+    def test_close(self):
+        """Tests that the source is released when iteration stops early."""
+        closed = []
+        stream = JSONStream(chunked(PAGE, 10), "resultList.result", close=lambda: closed.append(True))
+        for _ in stream:
+            break
+        self.assertEqual(closed, [True])
+
+    def test_resume_after_error(self):
+        """Tests that a reopened source continues after the items already produced."""
+        reopened, closed = [], []
+
+        def reopen(exc):
+            reopened.append(exc)
+            return chunked(PAGE, 7), lambda: closed.append("second")
+
+        # Fail part way through the results.
+        after = len(chunked(PAGE, 7)) - 10
+        stream = JSONStream(broken(chunked(PAGE, 7), after), "resultList.result",
+                            close=lambda: closed.append("first"), reopen=reopen)
+        self.assertEqual(list(stream), PAGE["resultList"]["result"])
+        self.assertEqual(len(reopened), 1)
+        self.assertEqual(closed, ["first", "second"])
+
+    def test_error_without_reopen(self):
+        """Tests that read errors propagate when the source cannot be reopened."""
+        stream = JSONStream(broken(chunked(PAGE, 7), 3), "resultList.result", reopen=lambda exc: None)
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            list(stream)
+
+
+def stream_response(chunks):
+    response = MagicMock(status_code=200, headers={})
+    response.iter_content.return_value = chunks
+    return response
+
+
+class TestClientStreamRetry(unittest.TestCase):
+
+    def test_page_retried_mid_stream(self):
+        """Tests that a page whose body breaks part way is re-requested and resumed."""
+        session = MagicMock()
+        session.get.side_effect = [
+            stream_response(broken(chunked(PAGE, 16), 20)),
+            stream_response(chunked(PAGE, 16)),
+        ]
+        policy = RetryPolicy(backoff=0, transient_exceptions=(requests.exceptions.ChunkedEncodingError,))
+        client = ArticlesClient(session=session, retry_policy=policy)
+        stream = client.search_stream("malaria")
+        self.assertEqual([r["id"] for r in stream], ["1", "2", "3"])
+        self.assertEqual(session.get.call_count, 2)
+        self.assertEqual(policy.retries, 1)
+
+    def test_first_item_read_on_fetch(self):
+        """Tests that a failure before the first item is retried while fetching the page."""
+        session = MagicMock()
+        session.get.side_effect = [
+            stream_response(broken(chunked(PAGE, 16), 1)),
+            stream_response(chunked(PAGE, 16)),
+        ]
+        policy = RetryPolicy(backoff=0, transient_exceptions=(requests.exceptions.ChunkedEncodingError,))
+        client = ArticlesClient(session=session, retry_policy=policy)
+        stream = client.search_stream("malaria")
+        self.assertEqual(session.get.call_count, 2)
+        self.assertEqual(len(list(stream)), 3)
+
+    def test_non_transient_error_raised(self):
+        session = MagicMock()
+        session.get.side_effect = [stream_response(broken(chunked(PAGE, 16), 20))]
+        client = ArticlesClient(session=session, retry_policy=RetryPolicy(backoff=0))
+        with patch.object(RetryPolicy, "transient_exceptions", (requests.Timeout,)):
+            stream = client.search_stream("malaria")
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                list(stream)
+
+
+class TestFallbackDecoder(JSONStreamTests, unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch.object(jsonstream, "ijson", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+@unittest.skipIf(jsonstream.ijson is None, "ijson is not installed")
+class TestIjsonDecoder(JSONStreamTests, unittest.TestCase):
+    pass
+
+
+if __name__ == '__main__':
+    unittest.main()
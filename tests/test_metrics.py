@@ -0,0 +1,134 @@
+import io
+import os
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import requests
+import urllib3
+from click.testing import CliRunner
+
+from europmc_dev_tool.cli import cli
+from europmc_dev_tool.api.client import BaseClient, RetryPolicy
+from europmc_dev_tool.api.articles import ArticlesClient
+from europmc_dev_tool.api.oai import OAIClient
+from europmc_dev_tool.api.metrics import RequestMetrics, LatencyHistogram, endpoint_name
+
+
+def make_response(status, payload=b'{"hitCount": 1}'):
+    response = requests.Response()
+    response.status_code = status
+    response._content = payload
+    return response
+
+
+def make_streamed_response(payload):
+    """Returns a gzip-encoded streamed response with no Content-Length."""
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = urllib3.HTTPResponse(
+        body=io.BytesIO(gzip.compress(payload)), headers={'Content-Encoding': 'gzip'},
+        status=200, preload_content=False, decode_content=False
+    )
+    return response
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_endpoint_name(self):
+        """Tests that identifiers are skipped when naming endpoints."""
+        base = "https://www.ebi.ac.uk/europepmc/webservices/rest"
+        self.assertEqual(endpoint_name(f"{base}/search"), "search")
+        self.assertEqual(endpoint_name(f"{base}/article/MED/12345"), "article")
+        self.assertEqual(endpoint_name(f"{base}/PMC12345/fullTextXML"), "fullTextXML")
+        self.assertEqual(endpoint_name(f"{base}/MED/12345/references"), "references")
+        self.assertEqual(endpoint_name("https://www.ebi.ac.uk/europepmc/GristAPI/rest/get/?query=x"), "GristAPI")
+
+    def test_histogram_quantiles(self):
+        """Tests that quantiles are estimated within the bucket resolution."""
+        histogram = LatencyHistogram()
+        for ms in range(1, 1001):
+            histogram.add(ms / 1000)
+        for q, expected in ((0.5, 0.5), (0.95, 0.95), (0.99, 0.99)):
+            self.assertAlmostEqual(histogram.quantile(q), expected, delta=expected * 0.06)
+        self.assertIsNone(LatencyHistogram().quantile(0.5))
+
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_client_records_requests_and_retries(self, mock_get, mock_sleep):
+        """Tests that each attempt, its status and the retries are recorded."""
+        mock_get.side_effect = [requests.ConnectionError("reset"), make_response(503), make_response(200)]
+        metrics = RequestMetrics()
+        client = BaseClient(metrics=metrics, retry_policy=RetryPolicy(jitter=False))
+        self.assertEqual(client._get("https://www.ebi.ac.uk/europepmc/webservices/rest/search"), {"hitCount": 1})
+        stats = metrics.to_dict()["search"]
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["statuses"], {"200": 1, "503": 1, "ConnectionError": 1})
+        self.assertEqual(stats["bytes"], 2 * len(b'{"hitCount": 1}'))
+        self.assertEqual(stats["latency_seconds"]["count"], 3)
+
+    def test_prometheus_and_json(self):
+        """Tests the Prometheus and JSON outputs."""
+        metrics = RequestMetrics()
+        metrics.record_request("https://example.org/rest/search", 200, 0.2, 0.05, 100)
+        metrics.record_request("https://example.org/rest/search", 500, 0.4)
+        text = metrics.to_prometheus()
+        self.assertIn('epmc_requests_total{endpoint="search",status="500"} 1', text)
+        self.assertIn('epmc_rate_limit_wait_seconds_total{endpoint="search"} 0.05', text)
+        self.assertIn('epmc_request_duration_seconds_count{endpoint="search"} 2', text)
+        self.assertIn('# TYPE epmc_request_duration_seconds summary', text)
+
+        path = os.path.join(self.directory, "metrics.prom")
+        metrics.write(path)
+        with open(path) as f:
+            self.assertEqual(f.read(), text)
+        path = os.path.join(self.directory, "metrics.json")
+        metrics.write(path)
+        with open(path) as f:
+            self.assertEqual(json.load(f)["endpoints"]["search"]["bytes"], 100)
+
+    @patch('requests.Session.get')
+    def test_streamed_bytes(self, mock_get):
+        """Tests that streamed bodies are counted as read, after decoding, once they are closed."""
+        search = b'{"hitCount": 1, "resultList": {"result": [{"id": "1"}]}}'
+        xml = b"<article>" + b"x" * 100000 + b"</article>"
+        oai = (b"<OAI-PMH xmlns='http://www.openarchives.org/OAI/2.0/'><ListRecords><record><header>"
+               b"<identifier>oai:1</identifier><datestamp>2024-01-01</datestamp></header></record>"
+               b"</ListRecords></OAI-PMH>")
+        mock_get.side_effect = lambda *args, **kwargs: make_streamed_response(
+            {"search": search, "fullTextXML": xml}.get(args[0].rsplit("/", 1)[-1], oai)
+        )
+        metrics = RequestMetrics()
+        articles = ArticlesClient(metrics=metrics)
+        self.assertEqual([r["id"] for r in articles.search_iter("x")], ["1"])
+        articles.download_fulltext_xml("PMC1", os.path.join(self.directory, "PMC1.xml.gz"))
+        self.assertEqual([r.identifier for r in OAIClient(metrics=metrics).iter_records()], ["oai:1"])
+        stats = metrics.to_dict()
+        self.assertEqual(stats["search"]["bytes"], len(search))
+        self.assertEqual(stats["fullTextXML"]["bytes"], len(xml))
+        self.assertEqual(stats["oai.cgi"]["bytes"], len(oai))
+
+    @patch('requests.Session.get')
+    def test_cli_stats(self, mock_get):
+        """Tests that --stats prints a table and --stats-file writes metrics on exit."""
+        mock_get.return_value = make_response(200, b'{"hitCount": 0, "resultList": {"result": []}}')
+        path = os.path.join(self.directory, "stats.json")
+        result = CliRunner().invoke(cli, ["--stats", "--stats-file", path, "articles", "search", "malaria"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("p95 ms", result.output)
+        with open(path) as f:
+            self.assertEqual(json.load(f)["endpoints"]["search"]["requests"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
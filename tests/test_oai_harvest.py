@@ -0,0 +1,198 @@
+import io
+import os
+import gzip
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import requests
+from lxml import etree
+
+from click.testing import CliRunner
+
+from europmc_dev_tool.cli import cli
+from europmc_dev_tool.api.oai import OAIClient, OAIError, parse_oai_response, oai_identifier
+from europmc_dev_tool.commands.oai import harvest_to_shards, harvest_incremental, shard_records
+
+
+def oai_page(identifiers, token=None, date="2024-05-01"):
+    records = "".join(
+        f"<record><header><identifier>{i}</identifier><datestamp>{date}</datestamp>"
+        f"<setSpec>PMC</setSpec></header><metadata><article xmlns='https://jats.nlm.nih.gov/ns/archiving/1.3/'>"
+        f"<front>{i}</front></article></metadata></record>"
+        for i in identifiers
+    )
+    token_xml = f"<resumptionToken>{token or ''}</resumptionToken>"
+    return (
+        "<?xml version='1.0' encoding='UTF-8'?>"
+        "<OAI-PMH xmlns='http://www.openarchives.org/OAI/2.0/'>"
+        "<responseDate>2024-05-02T00:00:00Z</responseDate>"
+        f"<ListRecords>{records}{token_xml}</ListRecords></OAI-PMH>"
+    ).encode("utf8")
+
+
+PAGES = {
+    None: oai_page(["oai:europepmc.org:1", "oai:europepmc.org:2"], "t1"),
+    "t1": oai_page(["oai:europepmc.org:3"], "t2"),
+    "t2": oai_page(["oai:europepmc.org:4"]),
+}
+
+
+def make_response(body):
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    response.raw.decode_content = False
+    return response
+
+
+def fake_get(url, params=None, **kwargs):
+    return make_response(PAGES[params.get("resumptionToken")])
+
+
+class TestOAIHarvest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_parse_records(self):
+        """Tests that records, datestamps, sets and the token are parsed."""
+        events = list(parse_oai_response(io.BytesIO(PAGES[None])))
+        records = [value for kind, value in events if kind == "record"]
+        self.assertEqual([r.identifier for r in records], ["oai:europepmc.org:1", "oai:europepmc.org:2"])
+        self.assertEqual(records[0].datestamp, "2024-05-01")
+        self.assertEqual(records[0].sets, ["PMC"])
+        self.assertIn(b"<front>oai:europepmc.org:1</front>", records[0].metadata())
+        self.assertIn(("resumptionToken", "t1"), events)
+
+    def test_oai_error(self):
+        """Tests that OAI errors are raised, except noRecordsMatch."""
+        body = ("<OAI-PMH xmlns='http://www.openarchives.org/OAI/2.0/'><error code='{}'>x</error></OAI-PMH>")
+        self.assertEqual(list(parse_oai_response(io.BytesIO(body.format("noRecordsMatch").encode()))), [])
+        with self.assertRaises(OAIError):
+            list(parse_oai_response(io.BytesIO(body.format("badResumptionToken").encode())))
+
+    @patch("requests.Session.get", side_effect=fake_get)
+    def test_follows_resumption_tokens(self, mock_get):
+        """Tests that the harvester follows tokens to the end."""
+        records = list(OAIClient().iter_records("pmc"))
+        self.assertEqual(len(records), 4)
+        self.assertEqual(mock_get.call_count, 3)
+
+    @patch("requests.Session.get", side_effect=fake_get)
+    def test_resume_into_shards(self, mock_get):
+        """Tests that an interrupted harvest resumes from the checkpointed token."""
+        query = {"metadata_prefix": "pmc", "from_date": None, "until": None, "set_spec": None}
+        real_pages = OAIClient.iter_records
+
+        def interrupted(self, *args, **kwargs):
+            harvester = real_pages(self, *args, **kwargs)
+            pages = harvester.pages
+
+            def two_pages():
+                for n, page in enumerate(pages()):
+                    if n == 1:
+                        next(page)
+                        raise KeyboardInterrupt
+                    yield page
+            harvester.pages = two_pages
+            return harvester
+
+        with patch.object(OAIClient, "iter_records", interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                harvest_to_shards(OAIClient(), self.directory, 3, **query)
+
+        state = harvest_to_shards(OAIClient(), self.directory, 3, **query)
+        self.assertTrue(state["complete"])
+        self.assertEqual(state["records"], 4)
+        self.assertEqual(mock_get.call_args_list[-2].kwargs["params"]["resumptionToken"], "t1")
+
+        self.assertEqual(self.shard_identifiers(), [f"oai:europepmc.org:{n}" for n in range(1, 5)])
+
+    def shard_identifiers(self):
+        identifiers = []
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".xml.gz"):
+                with gzip.open(os.path.join(self.directory, name)) as f:
+                    root = etree.fromstring(f.read())
+                identifiers += root.xpath("//oai:identifier/text()", namespaces={"oai": "http://www.openarchives.org/OAI/2.0/"})
+        return identifiers
+
+    @patch("requests.Session.get", side_effect=fake_get)
+    def test_stopped_after_last_page(self, mock_get):
+        """Tests that a run stopped after checkpointing its last page is complete, not restarted."""
+        query = {"metadata_prefix": "pmc", "from_date": None, "until": None, "set_spec": None}
+        with patch("europmc_dev_tool.commands.oai.ShardWriter.close", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                harvest_to_shards(OAIClient(), self.directory, 3, **query)
+        self.assertEqual(mock_get.call_count, 3)
+
+        state = harvest_to_shards(OAIClient(), self.directory, 3, **query)
+        self.assertTrue(state["complete"])
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertFalse([name for name in os.listdir(self.directory) if name.endswith(".part")])
+        self.assertEqual(self.shard_identifiers(), [f"oai:europepmc.org:{n}" for n in range(1, 5)])
+
+
+    @patch("requests.Session.get")
+    def test_incremental_runs(self, mock_get):
+        """Tests that a second run starts before the high-water mark and skips seen records."""
+        query = {"metadata_prefix": "pmc", "from_date": None, "until": None, "set_spec": None}
+        mock_get.side_effect = lambda url, params=None, **kw: make_response(
+            oai_page(["oai:europepmc.org:1", "oai:europepmc.org:2"], date="2024-05-01")
+        )
+        entry = harvest_incremental(OAIClient(), self.directory, 100, 1, **dict(query))
+        self.assertEqual(entry["high_water"], "2024-05-02")
+        self.assertEqual(set(entry["boundary"]), {"oai:europepmc.org:1", "oai:europepmc.org:2"})
+
+        # Record 2 was updated; record 1 is unchanged and within the overlap.
+        mock_get.side_effect = lambda url, params=None, **kw: make_response(
+            oai_page(["oai:europepmc.org:1"], date="2024-05-01")[:-len("</ListRecords></OAI-PMH>")]
+            + oai_page(["oai:europepmc.org:2"], date="2024-05-02").split(b"<ListRecords>")[1]
+        )
+        entry = harvest_incremental(OAIClient(), self.directory, 100, 1, **dict(query))
+        self.assertEqual(mock_get.call_args.kwargs["params"]["from"], "2024-05-01")
+        records = list(shard_records(os.path.join(self.directory, entry["last_run"])))
+        self.assertEqual([(r.identifier, r.datestamp) for r in records], [("oai:europepmc.org:2", "2024-05-02")])
+        self.assertEqual(entry["boundary"]["oai:europepmc.org:1"], "2024-05-01")
+
+
+    def test_oai_identifier(self):
+        """Tests that PMCIDs are turned into OAI identifiers."""
+        self.assertEqual(oai_identifier("PMC123"), "oai:europepmc.org:PMC123")
+        self.assertEqual(oai_identifier("123"), "oai:europepmc.org:PMC123")
+        self.assertEqual(oai_identifier("oai:europepmc.org:PMC123"), "oai:europepmc.org:PMC123")
+
+    @patch("requests.Session.get")
+    def test_get_records_to_jats_directory(self, mock_get):
+        """Tests that GetRecord payloads are written as JATS files in input order."""
+        def get_record(url, params=None, **kwargs):
+            pmcid = params["identifier"].rsplit(":", 1)[1]
+            if pmcid == "PMC404":
+                body = ("<OAI-PMH xmlns='http://www.openarchives.org/OAI/2.0/'>"
+                        "<error code='idDoesNotExist'>missing</error></OAI-PMH>").encode()
+            else:
+                body = oai_page([pmcid]).replace(b"ListRecords", b"GetRecord")
+            response = make_response(body)
+            response._content = body
+            return response
+
+        mock_get.side_effect = get_record
+        results = list(OAIClient().get_records(["PMC1", "PMC404", "PMC2"]))
+        self.assertEqual([r[0] for r in results], ["PMC1", "PMC404", "PMC2"])
+        self.assertIsInstance(results[1][2], OAIError)
+
+        result = CliRunner().invoke(cli, ["oai", "get-records", self.directory], input="PMC1\nPMC404\n")
+        self.assertEqual(result.exit_code, 0, result.output)
+        with gzip.open(os.path.join(self.directory, "PMC1.xml.gz")) as f:
+            article = etree.fromstring(f.read())
+        self.assertEqual(etree.QName(article).localname, "article")
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "PMC404.xml.gz")))
+
+
+if __name__ == "__main__":
+    unittest.main()
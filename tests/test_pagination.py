@@ -0,0 +1,69 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from europmc_dev_tool.api.articles import ArticlesClient
+from europmc_dev_tool.api.jsonstream import JSONStream
+from europmc_dev_tool.api.pagination import CursorPaginator
+
+
+def search_pages(*pages):
+    """Builds search responses chained by cursorMark."""
+    responses = {}
+    cursor = '*'
+    for i, hits in enumerate(pages):
+        next_cursor = f"c{i + 1}" if hits else cursor
+        responses[cursor] = {
+            'hitCount': sum(len(p) for p in pages),
+            'nextCursorMark': next_cursor,
+            'resultList': {'result': [{'id': hit} for hit in hits]},
+        }
+        cursor = next_cursor
+    return responses
+
+
+class TestCursorPaginator(unittest.TestCase):
+
+    def test_follows_cursor_until_it_stops(self):
+        """Tests that all pages are fetched in order and iteration stops at the end."""
+        responses = search_pages(['1', '2'], ['3'], [])
+        fetched = []
+
+        def fetch(cursor):
+            fetched.append(cursor)
+            return responses[cursor]
+
+        for prefetch in (True, False):
+            fetched.clear()
+            paginator = CursorPaginator(
+                fetch, lambda p: p['resultList']['result'], lambda p: p['nextCursorMark'], prefetch=prefetch
+            )
+            self.assertEqual([hit['id'] for hit in paginator], ['1', '2', '3'])
+            self.assertEqual(fetched, ['*', 'c1', 'c2'])
+            self.assertIsNone(paginator.next_cursor)
+
+    def test_resume_cursor(self):
+        """Tests that next_cursor points at the page after the one just consumed."""
+        responses = search_pages(['1'], ['2'], [])
+        paginator = CursorPaginator(
+            responses.__getitem__, lambda p: p['resultList']['result'], lambda p: p['nextCursorMark']
+        )
+        pages = paginator.pages()
+        next(pages)
+        self.assertEqual(paginator.next_cursor, 'c1')
+        pages.close()
+
+    @patch('europmc_dev_tool.api.articles.ArticlesClient.search_stream')
+    def test_search_iter(self, mock_search):
+        """Tests that search_iter pages with cursorMark at the maximum page size."""
+        responses = search_pages(['1', '2'], ['3'], [])
+        mock_search.side_effect = lambda query, page_size, result_type, cursor_mark: JSONStream(
+            [json.dumps(responses[cursor_mark])], "resultList.result"
+        )
+        hits = list(ArticlesClient().search_iter("malaria"))
+        self.assertEqual([hit['id'] for hit in hits], ['1', '2', '3'])
+        self.assertEqual(mock_search.call_args.kwargs['page_size'], ArticlesClient.MAX_PAGE_SIZE)
+
+
+if __name__ == '__main__':
+    unittest.main()
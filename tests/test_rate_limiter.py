@@ -0,0 +1,61 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from europmc_dev_tool.api.client import RateLimiter, SharedRateLimiter, fcntl
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_thread_safe(self):
+        """Tests that threads sharing a limiter do not overshoot the rate."""
+        limiter = RateLimiter(rate=5, per=0.1)
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: limiter.acquire(), range(25)))
+        # 5 tokens are available immediately; the other 20 take 0.4s.
+        self.assertGreaterEqual(time.monotonic() - start, 0.35)
+
+    def test_burst_within_capacity_does_not_wait(self):
+        """Tests that requests within the bucket capacity are not delayed."""
+        limiter = RateLimiter(rate=10, per=1)
+        self.assertEqual([limiter.acquire() for _ in range(10)], [0.0] * 10)
+        self.assertGreater(limiter.acquire(), 0)
+
+
+@unittest.skipIf(fcntl is None, "fcntl is not available")
+class TestSharedRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'bucket')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_budget_is_shared(self):
+        """Tests that two limiters on the same file draw from one budget."""
+        first = SharedRateLimiter(rate=4, per=1, path=self.path)
+        second = SharedRateLimiter(rate=4, per=1, path=self.path)
+        self.assertEqual(first.acquire(), 0.0)
+        self.assertEqual(second.acquire(), 0.0)
+        self.assertEqual(first._reserve(), 0.0)
+        self.assertEqual(second._reserve(), 0.0)
+        self.assertGreater(first._reserve(), 0.2)
+
+    def test_rate_from_file_is_clamped(self):
+        """Tests that a faster rate left in the file does not override a lower limit."""
+        fast = SharedRateLimiter(rate=100, per=1, path=self.path)
+        fast.acquire()
+        self.assertEqual(fast.rate, 100)
+        slow = SharedRateLimiter(rate=2, per=1, path=self.path)
+        waits = [slow._reserve() for _ in range(4)]
+        self.assertEqual(slow.rate, 2)
+        self.assertGreater(waits[-1], 0.4)
+
+
+if __name__ == '__main__':
+    unittest.main()
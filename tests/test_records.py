@@ -0,0 +1,100 @@
+import json
+import unittest
+import tracemalloc
+from unittest.mock import patch
+
+from europmc_dev_tool.jats_processor import XMLProcessor
+from europmc_dev_tool.records import Sentence, Extraction, article_records, to_serializable
+from europmc_dev_tool import xml_processor
+
+LABELS = ['INTRO', 'METHODS']
+
+
+def processed_article(sentences=20000):
+    texts = [f"Sentence number {i} of a long article." for i in range(sentences)]
+    return {
+        'article_ids': {'pmcid': 'PMC1'}, 'open_status': 'O', 'article_type': 'research-article',
+        'keywords': [], 'sections': {'INTRO': texts[:sentences // 2], 'METHODS': texts[sentences // 2:]},
+    }
+
+
+def retained_size(func, *args):
+    """Returns the number of bytes still allocated by ``func(*args)`` while its result is alive."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func(*args)
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+class TestRecords(unittest.TestCase):
+
+    def test_extraction_to_dict(self):
+        """Tests that extraction records serialise to the extract_with_spacy format."""
+        accession = Extraction('accession', 'pxd', 'PXD053361', 8, 17,
+                               uri_base='http://identifiers.org/pride.project',
+                               uri_with_exact=True, sentence_id=3, section='METHODS')
+        resource = Extraction('resource', 'RESOURCE', 'UniProt', 0, 7,
+                              uri_base='https://www.uniprot.org', sentence_id=3)
+        self.assertEqual(accession.to_dict(), {
+            'type': 'accession', 'name': 'pxd', 'exact': 'PXD053361', 'span': [8, 17],
+            'uri': 'http://identifiers.org/pride.project/PXD053361', 'sentence_id': 3
+        })
+        self.assertEqual(resource.uri, 'https://www.uniprot.org')
+        self.assertEqual(Extraction.from_dict(accession.to_dict()).to_dict(), accession.to_dict())
+
+    def test_records_are_slotted_and_interned(self):
+        """Tests that records have no instance dict and share section strings."""
+        a = Sentence("One.", 1, ''.join(['MET', 'HODS']))
+        b = Sentence("Two.", 2, ''.join(['METH', 'ODS']))
+        self.assertFalse(hasattr(a, '__dict__'))
+        self.assertIs(a.section, b.section)
+
+    def test_to_serializable(self):
+        """Tests that records can be passed straight to json.dumps."""
+        data = {'INTRO': [Sentence("One.", 1, 'INTRO')]}
+        self.assertEqual(json.loads(json.dumps(data, default=to_serializable)),
+                         {'INTRO': [{'text': 'One.', 'sentence_id': 1}]})
+
+    def test_article_records(self):
+        """Tests that loaded jats2json output is converted to records and serialises back unchanged."""
+        data = {'article_ids': {}, 'sections': {'INTRO': [{'text': 'One.', 'sentence_id': 1}]}}
+        original = json.loads(json.dumps(data))
+        article = article_records(data)
+        self.assertEqual(article['sections']['INTRO'], [Sentence('One.', 1, 'INTRO')])
+        self.assertEqual(json.loads(json.dumps(article, default=to_serializable)), original)
+
+    def test_records_use_less_memory(self):
+        """Tests that an article held as records is much smaller than the same article as dicts."""
+        processor = XMLProcessor(sentenciser=False)
+        as_dicts = retained_size(processor.process_json, processed_article(), LABELS)
+        as_records = retained_size(processor.process_records, processed_article(), LABELS)
+        # Measured at about 45% of the dict version on CPython 3.11.
+        self.assertLess(as_records, as_dicts * 0.6)
+        self.assertEqual(
+            json.dumps(processor.process_records(processed_article(), LABELS), default=to_serializable),
+            json.dumps(processor.process_json(processed_article(), LABELS))
+        )
+
+    @patch('europmc_dev_tool.xml_processor.spacy.load')
+    def test_jatx_processor_records(self, _):
+        """Tests that the jatx2json processor holds records and serialises them in its own format."""
+        processor = xml_processor.XMLProcessor(sentenciser=False)
+        accessions = [[Extraction('accession', 'pxd', 'PXD1', 0, 4, sentence_id=1)]]
+        articles = [processed_article(4), processed_article(4)]
+        for article in articles:
+            article['accession_numbers'] = accessions
+        result = processor.process_records(articles[0], LABELS)
+        self.assertEqual(result['sections']['INTRO'][1], Sentence('Sentence number 1 of a long article.', 2, 'INTRO'))
+        as_json = processor.process_json(articles[1], LABELS)
+        self.assertEqual(as_json['sections']['INTRO'][0],
+                         {'text': 'Sentence number 0 of a long article.', 'sent_id': 1})
+        self.assertEqual(json.loads(json.dumps(result, default=xml_processor.to_serializable)), as_json)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from europmc_dev_tool.api.articles import ArticlesClient, split_article_id
+
+
+def references_page(source, article_id, page, page_size, total=2500):
+    if article_id == "broken":
+        raise requests.HTTPError("500 Server Error")
+    start = (page - 1) * page_size
+    refs = [{"id": f"{article_id}-{i}"} for i in range(start, min(start + page_size, total))]
+    return {"hitCount": total, "referenceList": {"reference": refs}}
+
+
+class TestReferences(unittest.TestCase):
+
+    def test_split_article_id(self):
+        """Tests that SOURCE:ID, PMCIDs and PMIDs are split into source and ID."""
+        self.assertEqual(split_article_id("MED:123"), ("MED", "123"))
+        self.assertEqual(split_article_id("pmc:123"), ("PMC", "PMC123"))
+        self.assertEqual(split_article_id("PMC123"), ("PMC", "PMC123"))
+        self.assertEqual(split_article_id("123"), ("MED", "123"))
+
+    @patch.object(ArticlesClient, 'get_references', side_effect=references_page)
+    def test_all_references_in_order(self, mock_refs):
+        """Tests that every page is fetched and references are merged in order."""
+        refs = list(ArticlesClient().get_all_references("MED", "1"))
+        self.assertEqual([r["id"] for r in refs], [f"1-{i}" for i in range(2500)])
+        self.assertEqual(sorted(c.args[2] for c in mock_refs.call_args_list), [1, 2, 3])
+
+    @patch.object(ArticlesClient, 'get_references', side_effect=references_page)
+    def test_batch(self, mock_refs):
+        """Tests that the batch variant keeps input order and reports failures."""
+        results = list(ArticlesClient().get_references_batch([("MED", "1"), ("MED", "broken"), ("PMC", "PMC2")]))
+        self.assertEqual([(r[0], r[1]) for r in results], [("MED", "1"), ("MED", "broken"), ("PMC", "PMC2")])
+        self.assertEqual(len(results[0][2]), 2500)
+        self.assertIsNone(results[1][2])
+        self.assertIsInstance(results[1][3], requests.HTTPError)
+
+
+if __name__ == '__main__':
+    unittest.main()
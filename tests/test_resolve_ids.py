@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from europmc_dev_tool.api.articles import ArticlesClient, id_query
+
+ARTICLES = [
+    {"id": "111", "source": "MED", "pmid": "111", "pmcid": "PMC1", "doi": "10.1000/ABC", "isOpenAccess": "Y"},
+    {"id": "222", "source": "MED", "pmid": "222", "isOpenAccess": "N"},
+]
+
+
+def search(query, page=1, page_size=25, result_type="core", cursor_mark=None):
+    if "broken" in query:
+        raise requests.HTTPError("500 Server Error")
+    hits = [a for a in ARTICLES if any(
+        term in query for term in (f"EXT_ID:{a['id']} ", f"PMCID:{a.get('pmcid')}", f'DOI:"{a.get("doi", "").lower()}"')
+    )]
+    return {"hitCount": len(hits), "resultList": {"result": hits}}
+
+
+class TestResolveIds(unittest.TestCase):
+
+    def test_id_query(self):
+        """Tests that PMIDs, PMCIDs and DOIs map to the right search fields."""
+        self.assertEqual(id_query("123"), ("EXT_ID", "MED:123", "(EXT_ID:123 AND SRC:MED)"))
+        self.assertEqual(id_query("pmc45"), ("PMCID", "PMC45", "PMCID:PMC45"))
+        self.assertEqual(id_query("https://doi.org/10.1000/X"), ("DOI", "10.1000/x", 'DOI:"10.1000/X"'))
+        self.assertEqual(id_query('doi:10.1/a"b')[2], 'DOI:"10.1/a\\"b"')
+
+    @patch.object(ArticlesClient, 'search', side_effect=search)
+    def test_resolve_in_input_order(self, mock_search):
+        """Tests that every ID gets its result, in input order, from few requests."""
+        ids = ["PMC1", "222", "999", "10.1000/abc", "111"] * 100
+        results = list(ArticlesClient().resolve_ids(ids))
+        self.assertEqual([r[0] for r in results], ids)
+        self.assertEqual([r[1]["id"] if r[1] else None for r in results[:5]], ["111", "222", None, "111", "111"])
+        self.assertEqual(results[0][1]["isOpenAccess"], "Y")
+        self.assertEqual(mock_search.call_count, 3)
+
+    @patch.object(ArticlesClient, 'search', side_effect=search)
+    def test_query_length_limit(self, mock_search):
+        """Tests that long DOIs start a new query before the length limit is reached."""
+        client = ArticlesClient()
+        dois = [f"10.1000/{'x' * 500}{i}" for i in range(20)]
+        list(client.resolve_ids(dois))
+        for call in mock_search.call_args_list:
+            self.assertLessEqual(len(call.args[0]), client.MAX_QUERY_LENGTH)
+        self.assertGreater(mock_search.call_count, 1)
+
+    @patch.object(ArticlesClient, 'search', side_effect=search)
+    def test_failed_query(self, mock_search):
+        """Tests that a failed query reports an error for each of its IDs."""
+        results = list(ArticlesClient().resolve_ids(["10.1/broken", "222"]))
+        self.assertIsInstance(results[0][2], requests.HTTPError)
+        self.assertIsInstance(results[1][2], requests.HTTPError)
+        self.assertIsNone(results[1][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from europmc_dev_tool.api.articles import ArticlesClient
+from europmc_dev_tool.api.cache import ResponseCache, OfflineCacheMiss
+from europmc_dev_tool.api.oai import OAIClient
+
+
+def make_response(status, body=b'{}', headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = body
+    return response
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_key_ignores_identification_and_order(self):
+        """Tests that keys ignore email/tool and parameter order."""
+        cache = ResponseCache(self.directory)
+        url = "https://www.ebi.ac.uk/europepmc/webservices/rest/search"
+        self.assertEqual(
+            cache.key(url, {'query': 'malaria', 'format': 'json', 'email': 'a@b.c'}),
+            cache.key(url, {'format': 'json', 'query': 'malaria', 'tool': 'x'})
+        )
+        self.assertNotEqual(cache.key(url, {'query': 'malaria'}), cache.key(url, {'query': 'dengue'}))
+
+    def test_endpoint_ttls(self):
+        """Tests that TTLs are looked up by endpoint."""
+        cache = ResponseCache(self.directory, ttl=5, ttls={'search': 60})
+        base = "https://www.ebi.ac.uk/europepmc/webservices/rest"
+        self.assertEqual(cache.ttl_for(f"{base}/search"), 60)
+        self.assertEqual(cache.ttl_for(f"{base}/MED/123/references/1/25/json"), cache.DEFAULT_TTLS['references'])
+        self.assertEqual(cache.ttl_for("https://www.ebi.ac.uk/europepmc/oai.cgi"), 5)
+
+    @patch('requests.Session.get')
+    def test_fresh_hit_skips_network(self, mock_get):
+        """Tests that a fresh cached response is served without a request."""
+        mock_get.return_value = make_response(200, b'{"hitCount": 1}')
+        client = ArticlesClient(cache=ResponseCache(self.directory))
+        self.assertEqual(client.search("malaria"), {"hitCount": 1})
+        self.assertEqual(client.search("malaria"), {"hitCount": 1})
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('requests.Session.get')
+    def test_stale_entry_is_revalidated(self, mock_get):
+        """Tests that a stale entry is revalidated and reused on 304."""
+        mock_get.side_effect = [
+            make_response(200, b'{"hitCount": 1}', {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}),
+            make_response(304, b''),
+        ]
+        client = ArticlesClient(cache=ResponseCache(self.directory, ttls={'search': 0}))
+        client.search("malaria")
+        self.assertEqual(client.search("malaria"), {"hitCount": 1})
+        headers = mock_get.call_args.kwargs['headers']
+        self.assertEqual(headers['If-None-Match'], '"v1"')
+        self.assertEqual(headers['If-Modified-Since'], 'Mon, 01 Jan 2024 00:00:00 GMT')
+
+    @patch('requests.Session.get')
+    def test_offline_mode(self, mock_get):
+        """Tests that offline mode serves cached responses and fails on a miss."""
+        mock_get.return_value = make_response(200, b'{"hitCount": 1}')
+        ArticlesClient(cache=ResponseCache(self.directory, ttls={'search': 0})).search("malaria")
+        offline = ArticlesClient(cache=ResponseCache(self.directory, offline=True))
+        self.assertEqual(offline.search("malaria"), {"hitCount": 1})
+        with self.assertRaises(OfflineCacheMiss):
+            offline.search("dengue")
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('requests.Session.get')
+    def test_offline_mode_blocks_streamed_requests(self, mock_get):
+        """Tests that offline mode never sends the uncached, streamed requests."""
+        cache = ResponseCache(self.directory, offline=True)
+        path = os.path.join(self.directory, "PMC1.xml.gz")
+        with self.assertRaises(OfflineCacheMiss):
+            ArticlesClient(cache=cache).download_fulltext_xml("PMC1", path)
+        self.assertFalse(os.path.exists(path))
+        with self.assertRaises(OfflineCacheMiss):
+            list(OAIClient(cache=cache).iter_records(from_date="2024-01-01"))
+        mock_get.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from europmc_dev_tool.api.client import BaseClient, RateLimiter, RetryPolicy, RetryBudgetExhausted
+
+
+def make_response(status, headers=None, payload=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = b'{}' if payload is None else payload
+    return response
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_classification(self):
+        """Tests that only connection errors, 5xx and 429 are transient."""
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_transient(requests.ConnectionError()))
+        self.assertTrue(policy.is_transient(requests.exceptions.ChunkedEncodingError()))
+        self.assertTrue(policy.is_transient(requests.exceptions.ContentDecodingError()))
+        self.assertTrue(policy.is_transient(requests.HTTPError(response=make_response(503))))
+        self.assertTrue(policy.is_transient(requests.HTTPError(response=make_response(429))))
+        self.assertFalse(policy.is_transient(requests.HTTPError(response=make_response(404))))
+
+    def test_retry_after_and_jitter(self):
+        """Tests that Retry-After is obeyed and backoff is jittered below its ceiling."""
+        policy = RetryPolicy(backoff=1.0, max_backoff=8.0)
+        throttled = requests.HTTPError(response=make_response(429, {'Retry-After': '7'}))
+        self.assertEqual(policy.delay(1, throttled), 7.0)
+        too_long = requests.HTTPError(response=make_response(503, {'Retry-After': '86400'}))
+        self.assertEqual(policy.delay(1, too_long), 8.0)
+        for attempt in range(1, 6):
+            self.assertLessEqual(policy.delay(attempt), min(8.0, 2 ** (attempt - 1)))
+
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_client_does_not_retry_client_errors(self, mock_get, mock_sleep):
+        """Tests that a 404 is raised immediately."""
+        mock_get.return_value = make_response(404)
+        client = BaseClient()
+        with self.assertRaises(requests.HTTPError):
+            client._get("https://example.org/x")
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_throttling_reduces_rate(self, mock_get, mock_sleep):
+        """Tests that 429 responses are retried and slow the rate limiter down."""
+        mock_get.side_effect = [
+            make_response(429, {'Retry-After': '2'}),
+            make_response(200, payload=b'{"ok": true}'),
+        ]
+        limiter = RateLimiter(10, 1)
+        client = BaseClient(rate_limiter=limiter)
+        self.assertEqual(client._get("https://example.org/x"), {"ok": True})
+        mock_sleep.assert_any_call(2.0)
+        self.assertLess(limiter.rate, 10)
+
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_retry_budget(self, mock_get, mock_sleep):
+        """Tests that retries stop once the shared budget is used up."""
+        mock_get.return_value = make_response(500)
+        client = BaseClient(retry_policy=RetryPolicy(max_attempts=10, budget=2))
+        with self.assertRaises(RetryBudgetExhausted):
+            client._get("https://example.org/x")
+        self.assertEqual(mock_get.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from europmc_dev_tool.api.client import BaseClient
+from europmc_dev_tool.api.concurrency import SingleFlight
+
+
+def run_threads(target, count=8):
+    results = [None] * count
+
+    def run(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_coalesces_concurrent_calls(self):
+        """Tests that concurrent calls with one key run once and share the result."""
+        flight = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return "result"
+
+        results = run_threads(lambda: flight.do("key", slow))
+        self.assertEqual(results, ["result"] * 8)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.saved, 7)
+        # Completed calls are not cached.
+        self.assertEqual(flight.do("key", lambda: "again"), "again")
+
+    def test_shares_errors(self):
+        """Tests that waiting callers receive the exception of the shared call."""
+        flight = SingleFlight()
+
+        def failing():
+            time.sleep(0.2)
+            raise ValueError("boom")
+
+        results = run_threads(lambda: flight.do("key", failing), count=3)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+
+    def test_different_keys(self):
+        """Tests that calls with different keys are not coalesced."""
+        flight = SingleFlight()
+        keys = iter(range(4))
+        lock = threading.Lock()
+
+        def call():
+            with lock:
+                key = next(keys)
+            return flight.do(key, lambda: time.sleep(0.05) or key)
+
+        self.assertEqual(sorted(run_threads(call, count=4)), [0, 1, 2, 3])
+        self.assertEqual(flight.saved, 0)
+
+    def test_client_coalesces_requests(self):
+        """Tests that identical concurrent client requests are sent once."""
+        client = BaseClient()
+        sent = []
+
+        def request(url, params=None, **kwargs):
+            sent.append(url)
+            time.sleep(0.2)
+            return type("Response", (), {"text": '{"ok": true}'})()
+
+        with patch.object(client, "_request", side_effect=request):
+            results = run_threads(lambda: client._get("https://example.org/a", {"format": "json", "q": 1}))
+        self.assertEqual(results, [{"ok": True}] * 8)
+        self.assertEqual(sent, ["https://example.org/a"])
+        self.assertEqual(client.flight.saved, 7)
+
+    def test_uri_validation_coalesces_requests(self):
+        """Tests that concurrent validations of one URI send a single request."""
+        from europmc_dev_tool import spacy_extractor
+
+        class Response:
+            status_code = 200
+
+            def __enter__(self):
+                time.sleep(0.2)
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+        saved = spacy_extractor.validation_flight.saved
+        with patch.object(spacy_extractor, "get_session") as get_session:
+            get_session.return_value.get.return_value = Response()
+            results = run_threads(lambda: spacy_extractor.validate_uri("https://identifiers.org/uniprot/P12345"))
+        self.assertEqual(results, [True] * 8)
+        self.assertEqual(get_session.return_value.get.call_count, 1)
+        self.assertEqual(spacy_extractor.validation_flight.saved - saved, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import patch
+
+import spacy
+
+from europmc_dev_tool import spacy_extractor
+from europmc_dev_tool.spacy_extractor import extract_from_span, extract_with_spacy
+
+TEXT = ("Intro sentence here.   Data were deposited to ProteomeXchange with identifier "
+        "PXD053361 and GSE12345 in GEO. We used UniProt and PDB 1ABC.")
+
+
+class TestExtractFromSpan(unittest.TestCase):
+    """Checks that matching on sentence spans gives the same results as re-tokenising each sentence."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Both functions get the same pipeline, so a blank English one is
+        # enough and needs no model download.
+        cls.nlp = spacy.blank("en")
+        cls.nlp.add_pipe("sentencizer")
+
+    def setUp(self):
+        for name in ("load_cache", "save_cache"):
+            patcher = patch.object(spacy_extractor, name, return_value={})
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def compare(self, sent):
+        from_span = extract_from_span(self.nlp, sent, "METHODS", 3, offline=True, cache={})
+        from_text = extract_with_spacy(self.nlp, sent.text.strip(), "METHODS", 3, offline=True)
+        self.assertEqual(from_span, from_text)
+        return from_span
+
+    def test_same_as_extract_with_spacy(self):
+        """Tests identical extractions and offsets for every sentence of a document."""
+        sents = list(self.nlp(TEXT).sents)
+        self.assertEqual(len(sents), 3)
+        results = [self.compare(sent) for sent in sents]
+        self.assertEqual(results[0], [])
+        self.assertEqual([(r['exact'], r['span']) for r in results[2]],
+                         [('UniProt', [8, 15]), ('PDB', [20, 23]), ('1ABC', [24, 28])])
+
+    def test_offsets_relative_to_stripped_sentence(self):
+        """Tests that offsets skip the whitespace a sentence starts with."""
+        sent = list(self.nlp(TEXT).sents)[1]
+        self.assertTrue(sent.text.startswith("  "))
+        stripped = sent.text.strip()
+        for result in self.compare(sent):
+            start, end = result['span']
+            self.assertEqual(stripped[start:end], result['exact'])
+
+    def test_overlapping_matches_deduplicated(self):
+        """Tests that a token matched by several patterns is extracted once."""
+        sent = list(self.nlp(TEXT).sents)[1]
+        matched = [self.nlp.vocab.strings[m] for m, start, end in spacy_extractor.get_matcher(self.nlp)(sent)
+                   if sent[start:end].text == "PXD053361"]
+        self.assertGreater(len(matched), 1)
+        results = self.compare(sent)
+        self.assertEqual([r['exact'] for r in results], ["PXD053361", "GSE12345"])
+        self.assertEqual(results[0]['name'], 'pxd')
+
+
+if __name__ == '__main__':
+    unittest.main()
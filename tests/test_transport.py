@@ -0,0 +1,85 @@
+import unittest
+
+import requests
+
+from europmc_dev_tool.api import transport
+from europmc_dev_tool.api.articles import ArticlesClient
+from europmc_dev_tool.api.grants import GrantsClient
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+
+class TestTransport(unittest.TestCase):
+
+    def tearDown(self):
+        transport.configure_transport(pool_size=transport.DEFAULT_POOL_SIZE, keep_alive=True, http2=False)
+
+    def test_clients_share_session(self):
+        """Tests that clients reuse the process-wide session."""
+        self.assertIs(ArticlesClient().session, GrantsClient().session)
+        self.assertIs(ArticlesClient().session, transport.get_session())
+
+    def test_configure_transport(self):
+        """Tests that reconfiguring creates a session with the new pool size."""
+        before = transport.get_session()
+        transport.configure_transport(pool_size=64, keep_alive=False)
+        session = transport.get_session()
+        self.assertIsNot(session, before)
+        self.assertEqual(session.get_adapter('https://www.ebi.ac.uk')._pool_maxsize, 64)
+        self.assertEqual(session.headers['Connection'], 'close')
+        self.assertIn('gzip', session.headers['Accept-Encoding'])
+
+    @unittest.skipIf(httpx is None, "httpx is not installed")
+    def test_http2_adapter(self):
+        """Tests that the HTTP/2 adapter converts httpx responses and errors."""
+        def handler(request):
+            if request.url.path == '/fail':
+                raise httpx.ConnectError("refused", request=request)
+            return httpx.Response(200, json={'hitCount': 3}, headers={'ETag': '"x"'})
+
+        session = requests.Session()
+        session.mount('https://', transport.HTTP2Adapter(client=httpx.Client(transport=httpx.MockTransport(handler))))
+        response = session.get('https://www.ebi.ac.uk/search', params={'query': 'a'})
+        self.assertEqual(response.json(), {'hitCount': 3})
+        self.assertEqual(response.headers['etag'], '"x"')
+        with self.assertRaises(requests.ConnectionError):
+            session.get('https://www.ebi.ac.uk/fail')
+
+    @unittest.skipIf(httpx is None, "httpx is not installed")
+    def test_http2_adapter_drops_hop_by_hop_headers(self):
+        """Tests that connection-specific headers, which HTTP/2 forbids, are not sent."""
+        sent = []
+
+        def handler(request):
+            sent.append(request.headers)
+            return httpx.Response(200, json={})
+
+        transport.configure_transport(keep_alive=False)
+        session = transport.get_session()
+        session.mount('https://', transport.HTTP2Adapter(client=httpx.Client(transport=httpx.MockTransport(handler))))
+        session.get('https://www.ebi.ac.uk/search', headers={'Keep-Alive': '5', 'Upgrade': 'h2c'})
+        for header in transport.HOP_BY_HOP_HEADERS:
+            self.assertNotIn(header, sent[0])
+        self.assertEqual(sent[0]['user-agent'], transport.USER_AGENT)
+
+    @unittest.skipIf(httpx is None, "httpx is not installed")
+    def test_http2_adapter_streams(self):
+        """Tests that stream=True reads the body on demand through response.raw."""
+        body = b'<records>' + b'x' * 100000 + b'</records>'
+
+        def handler(request):
+            return httpx.Response(200, content=body)
+
+        session = requests.Session()
+        session.mount('https://', transport.HTTP2Adapter(client=httpx.Client(transport=httpx.MockTransport(handler))))
+        with session.get('https://www.ebi.ac.uk/oai.cgi', stream=True) as response:
+            response.raw.decode_content = True
+            self.assertEqual(response.raw.read(9), b'<records>')
+            self.assertEqual(b''.join(response.iter_content(4096)), body[9:])
+
+
+if __name__ == '__main__':
+    unittest.main()